@@ -38,10 +38,12 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "core.metrics.ViewMetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.activity.ActivityMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -73,6 +75,29 @@ DATABASES = {
         ),
     )
 }
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # Bursty writers (e.g. a class self-checking in): WAL lets reads proceed
+    # during writes, IMMEDIATE takes the write lock up front instead of failing
+    # on upgrade, and the longer timeout queues writers rather than erroring.
+    DATABASES["default"].setdefault("OPTIONS", {}).update({
+        "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;",
+        "transaction_mode": "IMMEDIATE",
+        "timeout": 20,
+    })
+
+# ── Cache (shared by every worker) ─────────────────────────────────────────────
+# Dashboard cards, the class catalog and their invalidations must reach every
+# gunicorn worker, so production defaults to the database cache (its table is
+# created after migrate). Point CACHE_BACKEND/CACHE_LOCATION at Redis or
+# Memcached to take that load off the database. A single runserver process
+# (DEBUG) keeps it in memory.
+CACHE_BACKEND = os.environ.get(
+    "CACHE_BACKEND",
+    "django.core.cache.backends.locmem.LocMemCache" if DEBUG else "django.core.cache.backends.db.DatabaseCache",
+)
+CACHES = {"default": {"BACKEND": CACHE_BACKEND, "LOCATION": os.environ.get("CACHE_LOCATION", "sis_cache")}}
+if CACHE_BACKEND == "django.core.cache.backends.db.DatabaseCache":
+    CACHES["default"]["OPTIONS"] = {"MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", "50000"))}
 
 # ── Auth ───────────────────────────────────────────────────────────────────────
 AUTH_USER_MODEL = "accounts.CustomUser"
@@ -133,6 +158,51 @@ EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
 EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS", "true").lower() == "true"
 
+# ── Per-view request metrics (core.metrics; shown at adminportal:view_metrics) ──
+VIEW_METRICS_SAMPLE_RATE = float(os.environ.get("VIEW_METRICS_SAMPLE_RATE", "1.0"))
+VIEW_METRICS_FLUSH_SECONDS = int(os.environ.get("VIEW_METRICS_FLUSH_SECONDS", "30"))
+# Workers silent this long (e.g. restarted) are folded into one "retired" row per view.
+VIEW_METRICS_RETIRE_SECONDS = int(os.environ.get("VIEW_METRICS_RETIRE_SECONDS", "3600"))
+
+# ── Coalesced latest_activity writes (core.activity) ──
+ACTIVITY_FLUSH_SECONDS = int(os.environ.get("ACTIVITY_FLUSH_SECONDS", "30"))
+ACTIVITY_RESOLUTION_SECONDS = int(os.environ.get("ACTIVITY_RESOLUTION_SECONDS", "60"))
+# Touches still queued at exit are flushed (atexit); the runner drops test ones first.
+TEST_RUNNER = "core.test_runner.TestRunner"
+
+# ── Dashboard card cache (dashboard.fragments; invalidated by dashboard.signals) ──
+# Backstop TTL only; entries live in the shared cache (CACHES above).
+DASHBOARD_CACHE_SECONDS = int(os.environ.get("DASHBOARD_CACHE_SECONDS", "600"))
+# Threads pre-computing a user's cards after login (dashboard.warmup); 0 = inline.
+# Only used with a shared cache backend; skipped for LocMemCache/DummyCache.
+DASHBOARD_WARMUP_THREADS = int(os.environ.get("DASHBOARD_WARMUP_THREADS", "2"))
+
+# ── Class catalog cache (core.catalog; invalidated by core.signals) ──
+CATALOG_CACHE_SECONDS = int(os.environ.get("CATALOG_CACHE_SECONDS", "3600"))
+
+# ── Attendance policy (core.attendance.AttendanceReport) ──
+# Statuses that count as attended in every percentage and streak; comma-separated.
+# Stored streaks keep the old policy until `manage.py rebuild_attendance_summary` runs.
+ATTENDANCE_ATTENDED_STATUSES = tuple(
+    s.strip() for s in os.environ.get("ATTENDANCE_ATTENDED_STATUSES", "present,late,excused").split(",") if s.strip()
+)
+
+# ── List page search (core.search) ──
+# "auto" picks FTS5 on SQLite and pg_trgm on Postgres; or "fts5", "trigram", "like".
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "auto")
+
+# ── Student typeahead (core.typeahead; per-process index) ──
+TYPEAHEAD_LIMIT = int(os.environ.get("TYPEAHEAD_LIMIT", "10"))
+# Rebuild a stale index on a background thread and keep serving the old one meanwhile.
+TYPEAHEAD_BACKGROUND_REBUILD = os.environ.get("TYPEAHEAD_BACKGROUND_REBUILD", "True").lower() == "true"
+
+# ── Shared version stamps for in-memory data (core.versions) ──
+# How long a process trusts its copy of the stamps; other workers see a change within this.
+VERSION_STAMP_SECONDS = float(os.environ.get("VERSION_STAMP_SECONDS", "1"))
+
+# ── Admin list pages (core.pagination.KeysetPaginator) ──
+ADMIN_LIST_PAGE_SIZE = int(os.environ.get("ADMIN_LIST_PAGE_SIZE", "50"))
+
 # ── Production security hardening (only when DEBUG=False) ──────────────────────
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
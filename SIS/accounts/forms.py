@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm, ReadOnlyPasswordHashField
 from .models import CustomUser
 from core.models import Department
+from core.refdata import ReferenceChoiceField
 
 # ---------- Custom User Creation Form for Admin ----------
 class CustomUserCreationForm(UserCreationForm):
@@ -62,7 +63,7 @@ class LecturerCreationForm(forms.ModelForm):
         widget=forms.DateInput(attrs={'type': 'date'}),
         required=True
     )
-    department = forms.ModelChoiceField(
+    department = ReferenceChoiceField(
         queryset=Department.objects.all(),
         empty_label="Select Department",
         required=True,
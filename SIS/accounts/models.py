@@ -71,12 +71,18 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     date_joined = models.DateTimeField(default=timezone.now, blank=True, null=True)
+    # Coalesced by core.activity; accurate to ACTIVITY_RESOLUTION_SECONDS.
+    latest_activity = models.DateTimeField(blank=True, null=True)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['identity_card_number', 'full_name', 'short_name']
 
     objects = CustomUserManager()
 
+    class Meta:
+        # Admin list pages seek by (full_name, id) within a role.
+        indexes = [models.Index(fields=['role', 'full_name', 'id'], name='user_role_name_idx')]
+
     def __str__(self):
         return f"{self.full_name} ({self.identity_card_number}) - {self.email} [{self.role}]"
 
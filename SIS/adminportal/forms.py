@@ -1,9 +1,12 @@
 from django import forms
+from django.urls import reverse_lazy
 from accounts.models import CustomUser
 from core.models import (
     Department, Student, Course, ClassGroup, Lecturer, Subject,
     StudentFeePlan, StudentFeeInstallment
 )
+from core.refdata import ReferenceChoiceField
+from core.widgets import TypeaheadSelect
 
 # A single place to control select styling (white bg + black text)
 SELECT_WHITE_ATTRS = {
@@ -34,7 +37,7 @@ class LecturerCreationForm(forms.ModelForm):
         }),
         required=False
     )
-    department = forms.ModelChoiceField(
+    department = ReferenceChoiceField(
         queryset=Department.objects.all(),
         required=True,
         empty_label="Select Department",
@@ -110,6 +113,7 @@ class StudentUpdateForm(forms.ModelForm):
     class Meta:
         model = CustomUser
         fields = ['full_name', 'short_name', 'email', 'department']
+        field_classes = {'department': ReferenceChoiceField}
         widgets = {
             'full_name': forms.TextInput(attrs={'class': 'form-input'}),
             'short_name': forms.TextInput(attrs={'class': 'form-input'}),
@@ -149,6 +153,7 @@ class CourseForm(forms.ModelForm):
     class Meta:
         model = Course
         fields = ['name', 'code', 'department', 'description']
+        field_classes = {'department': ReferenceChoiceField}
         widgets = {
             'name': forms.TextInput(attrs={
                 'class': 'w-full p-2 rounded bg-white/10 text-white border border-white/20',
@@ -244,12 +249,12 @@ class AddStudentForm(forms.Form):
         label="Confirm Password",
         required=False
     )
-    department = forms.ModelChoiceField(
+    department = ReferenceChoiceField(
         queryset=Department.objects.all(),
         label="Department",
         widget=forms.Select(attrs={**SELECT_WHITE_ATTRS, "class": base_select_class, "style": "background-color:#fff; color:#000;"})
     )
-    class_group = forms.ModelChoiceField(
+    class_group = ReferenceChoiceField(
         queryset=ClassGroup.objects.all(),
         label="Assign to Class Group",
         widget=forms.Select(attrs={**SELECT_WHITE_ATTRS, "class": base_select_class, "style": "background-color:#fff; color:#000;"})
@@ -323,6 +328,7 @@ class ClassGroupForm(forms.ModelForm):
     class Meta:
         model = ClassGroup
         fields = ['name', 'course', 'department', 'year', 'classroom', 'lecturers']
+        field_classes = {'course': ReferenceChoiceField, 'department': ReferenceChoiceField}
         widgets = {
             'course': forms.Select(attrs=SELECT_WHITE_ATTRS),
             'department': forms.Select(attrs=SELECT_WHITE_ATTRS),
@@ -338,6 +344,7 @@ class SubjectForm(forms.ModelForm):
     class Meta:
         model = Subject
         fields = ['name', 'code', 'course', 'description']
+        field_classes = {'course': ReferenceChoiceField}
         widgets = {
             'course': forms.Select(attrs=SELECT_WHITE_ATTRS),
         }
@@ -437,11 +444,16 @@ class FeePlanCreateForm(forms.ModelForm):
         model = StudentFeePlan
         fields = ["student", "description", "total_amount", "months", "start_date", "status"]
         widgets = {
-            "student": forms.Select(attrs=SELECT_WHITE_ATTRS),
+            "student": TypeaheadSelect(reverse_lazy("adminportal:student_typeahead"), attrs={"placeholder": "Student name, email or IC"}),
             "status": forms.Select(attrs=SELECT_WHITE_ATTRS),
             "start_date": forms.DateInput(attrs={"type": "date", "class": "w-full border border-gray-300 rounded px-4 py-2"}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Students are picked by typeahead; this only validates the picked id.
+        self.fields["student"].queryset = Student.objects.select_related("user")
+
 
 class FeePlanCreateForStudentForm(forms.ModelForm):
     """Same as above, but 'student' is fixed and hidden."""
@@ -1,3 +1,285 @@
-from django.test import TestCase
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from core import departments, metrics, refdata, versions
+from core.models import ClassGroup, Enrollment, ViewMetric
+from core.tests import FAST_HASHERS, enroll_students, make_classgroup
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, VIEW_METRICS_SAMPLE_RATE=1.0, VIEW_METRICS_FLUSH_SECONDS=0)
+class ViewMetricsTests(TestCase):
+    def setUp(self):
+        metrics._store.clear()
+        self.admin = CustomUser.objects.create_user(
+            email="admin@example.com", password="pw", identity_card_number="A-1",
+            full_name="Admin", role=CustomUser.Role.ADMIN,
+        )
+        self.client.force_login(self.admin)
+        self.url = reverse("adminportal:view_metrics")
+
+    def test_requests_are_recorded_and_merged_across_workers(self):
+        self.client.get(reverse("adminportal:staff_list"))
+        self.client.get(reverse("adminportal:staff_list"))
+        # Another worker's snapshot for the same view.
+        other = metrics._empty_series()
+        other.update(count=3, latency_ms_sum=30, queries_sum=6, sql_ms_sum=3)
+        ViewMetric.objects.create(worker="other:1", url_name="adminportal:staff_list", data=other)
+
+        rows = {r["url_name"]: r for r in self.client.get(self.url, {"format": "json"}).json()["views"]}
+        staff = rows["adminportal:staff_list"]
+        self.assertEqual(staff["count"], 5)
+        self.assertGreater(staff["mean_queries"], 0)
+
+        only_lecturer = self.client.get(self.url, {"format": "json", "app": "lecturer"}).json()["views"]
+        self.assertEqual(only_lecturer, [])
+
+    def test_sampling_off_records_nothing_and_reset_clears(self):
+        with self.settings(VIEW_METRICS_SAMPLE_RATE=0):
+            self.client.get(reverse("adminportal:staff_list"))
+        self.assertFalse(ViewMetric.objects.exists())
+
+        self.client.get(reverse("adminportal:staff_list"))
+        self.assertTrue(ViewMetric.objects.exists())
+        self.client.post(self.url)
+        self.assertFalse(ViewMetric.objects.filter(url_name="adminportal:staff_list").exists())
+
+    def test_silent_workers_are_folded_into_retired_rows(self):
+        self.client.get(reverse("adminportal:staff_list"))
+        metrics.flush()
+        restarted = metrics._empty_series()
+        restarted.update(count=4, latency_ms_sum=40)
+        ViewMetric.objects.create(worker="gone:1", url_name="adminportal:staff_list", data=restarted)
+        ViewMetric.objects.create(worker="gone:2", url_name="adminportal:staff_list", data=restarted)
+        ViewMetric.objects.exclude(worker=metrics._store.worker).update(updated_at=timezone.now() - timedelta(hours=2))
+        before = metrics.merged()["adminportal:staff_list"]["count"]
+
+        self.client.get(reverse("adminportal:staff_list"))
+        metrics.flush()
+        self.assertEqual(
+            sorted(ViewMetric.objects.values_list("worker", flat=True)), sorted([metrics.RETIRED, metrics._store.worker])
+        )
+        self.assertEqual(metrics.merged()["adminportal:staff_list"]["count"], before + 1)
+
+    def test_admin_only(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, VIEW_METRICS_SAMPLE_RATE=0)
+class StudentListFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_dropdowns_show_counter_totals(self):
+        admin = CustomUser.objects.create_user(
+            email="admin@example.com", identity_card_number="A-1", full_name="Admin", role=CustomUser.Role.ADMIN,
+        )
+        classgroup = make_classgroup()
+        enroll_students(classgroup, 2)
+        self.client.force_login(admin)
+
+        response = self.client.get(reverse("adminportal:student_list"))
+        counts = {cg.pk: cg.student_count for cg in response.context["classgroups"]}
+        self.assertEqual(counts, {classgroup.pk: 2})
+        self.assertContains(response, f"{classgroup.name} (2)")
+
+    def test_rows_come_from_one_query(self):
+        admin = CustomUser.objects.create_user(
+            email="admin@example.com", identity_card_number="A-1", full_name="Admin", role=CustomUser.Role.ADMIN,
+        )
+        first, second = make_classgroup(), make_classgroup("CG2")
+        enroll_students(first, 3)
+        extra = enroll_students(second, 2, prefix="t")
+        enroll_students(make_classgroup("CG3"), 2, prefix="u")
+        Enrollment.objects.create(student=extra[0].student, class_group=first)
+        self.client.force_login(admin)
+        url = reverse("adminportal:student_list")
+
+        self.client.get(url)  # session and counters settle
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"classgroup": first.pk})
+        rows = [q["sql"] for q in queries if "accounts_customuser" in q["sql"] and "student" in q["sql"]]
+        self.assertEqual(len(rows), 1, rows)
+        self.assertNotIn("DISTINCT", rows[0])
+        self.assertIn("EXISTS", rows[0])
+
+        names = {user.full_name: user.classgroup_names for user in response.context["students"]}
+        self.assertEqual(len(names), 4)
+        self.assertEqual(sorted(names[extra[0].student.user.full_name].split(", ")), ["CG1", "CG2"])
+        self.assertContains(response, "Computer Science, Computer Science")
+
+        # Session, user, the two facet lists' counters, the rows; the lists
+        # themselves come from core.refdata.
+        self.assertEqual(len(queries), 5)
+        with self.assertNumQueries(5):
+            self.client.get(url)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, VIEW_METRICS_SAMPLE_RATE=0, ADMIN_LIST_PAGE_SIZE=2)
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        admin = CustomUser.objects.create_user(
+            email="admin@example.com", identity_card_number="A-1", full_name="Admin", role=CustomUser.Role.ADMIN,
+        )
+        self.classgroup = make_classgroup()
+        enroll_students(self.classgroup, 4)
+        # Same name as an enrolled student: the id breaks the tie.
+        CustomUser.objects.create_user(
+            email="twin@example.com", identity_card_number="T-1", full_name="Student s1", role=CustomUser.Role.STUDENT,
+        )
+        enroll_students(make_classgroup("CG2"), 1, prefix="other")
+        self.client.force_login(admin)
+
+    def _names(self, response):
+        return [user.full_name for user in response.context["students"]]
+
+    def test_pages_forward_and_back_keeping_filters(self):
+        url = reverse("adminportal:student_list")
+        response = self.client.get(url, {"classgroup": self.classgroup.pk, "q": "Student s"})
+        page = response.context["students"]
+        self.assertEqual(self._names(response), ["Student s0", "Student s1"])
+        self.assertFalse(page.has_previous)
+
+        seen = self._names(response)
+        while page.has_next:
+            response = self.client.get(url + page.next_query)
+            page = response.context["students"]
+            self.assertIn(f"classgroup={self.classgroup.pk}", page.next_query or page.previous_query)
+            seen += self._names(response)
+        self.assertEqual(seen, ["Student s0", "Student s1", "Student s2", "Student s3"])
+        self.assertEqual((page.start_index, page.end_index), (3, 4))
+
+        response = self.client.get(url + page.previous_query)
+        page = response.context["students"]
+        self.assertEqual(self._names(response), ["Student s0", "Student s1"])
+        self.assertEqual(page.start_index, 1)
+        self.assertFalse(page.has_previous)
+        self.assertTrue(page.has_next)
+
+    def test_ties_on_name_are_neither_skipped_nor_repeated(self):
+        url = reverse("adminportal:student_list")
+        response = self.client.get(url)
+        ids = [user.pk for user in response.context["students"]]
+        page = response.context["students"]
+        while page.has_next:
+            response = self.client.get(url + page.next_query)
+            page = response.context["students"]
+            ids += [user.pk for user in page]
+        expected = CustomUser.objects.filter(role=CustomUser.Role.STUDENT).order_by("full_name", "pk")
+        self.assertEqual(ids, list(expected.values_list("pk", flat=True)))
+
+    def test_no_count_query(self):
+        url = reverse("adminportal:student_list")
+        first = self.client.get(url).context["students"]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url + first.next_query)
+        self.assertFalse([q["sql"] for q in queries if "COUNT(" in q["sql"].upper()])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse("adminportal:student_list"), {"after": "not-a-cursor"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["students"].start_index, 1)
+        self.assertFalse(response.context["students"].has_previous)
+
+    def test_other_lists_page(self):
+        for name, var in (
+            ("adminportal:lecturer_list", "lecturers"),
+            ("adminportal:staff_list", "staff_users"),
+            ("adminportal:course_list", "courses"),
+            ("adminportal:fee_plan_list", "plans"),
+        ):
+            for params in ({}, {"q": "student"}):
+                response = self.client.get(reverse(name), params)
+                self.assertEqual(response.status_code, 200, name)
+                self.assertEqual(response.context[var].start_index, 1, name)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, VIEW_METRICS_SAMPLE_RATE=0)
+class FeePlanFormTests(TestCase):
+    def test_student_is_picked_by_typeahead_not_a_full_select(self):
+        admin = CustomUser.objects.create_user(
+            email="admin@example.com", identity_card_number="A-1", full_name="Admin", role=CustomUser.Role.ADMIN,
+        )
+        student = enroll_students(make_classgroup(), 3)[0].student
+        self.client.force_login(admin)
+        url = reverse("adminportal:fee_plan_create")
+
+        response = self.client.get(url)
+        self.assertNotContains(response, "<option value=\"%s\"" % student.pk)
+        self.assertContains(response, reverse("adminportal:student_typeahead"))
+
+        data = {"student": student.pk, "description": "", "total_amount": "600", "months": "3",
+                "start_date": "2025-01-01", "status": "draft"}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(student.fee_plans.get().months, 3)
+
+        # A re-rendered form labels the picked student without listing the rest.
+        response = self.client.post(url, {**data, "months": ""})
+        self.assertContains(response, f'value="{student.pk}"')
+        self.assertContains(response, f'value="{student}"')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, VIEW_METRICS_SAMPLE_RATE=0)
+class ClassGroupsByDepartmentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        versions.clear()
+        admin = CustomUser.objects.create_user(
+            email="admin@example.com", identity_card_number="A-1", full_name="Admin", role=CustomUser.Role.ADMIN,
+        )
+        self.first, self.second = make_classgroup("CG2"), make_classgroup("CG1")
+        self.client.force_login(admin)
+        self.url = reverse("adminportal:get_classgroups_by_department")
+
+    def test_map_and_single_department(self):
+        department = str(self.first.department_id)
+        data = self.client.get(self.url).json()
+        self.assertEqual([cg["name"] for cg in data["departments"][department]], ["CG1", "CG2"])
+        self.assertEqual(data["departments"][department][0]["label"], str(self.second))
+
+        data = self.client.get(self.url, {"department": department}).json()
+        self.assertEqual([cg["id"] for cg in data["classgroups"]], [self.second.pk, self.first.pk])
+        self.assertEqual(self.client.get(self.url, {"department": "999"}).json(), {"classgroups": []})
+
+    def test_cached_until_a_classgroup_is_saved(self):
+        response = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse([q["sql"] for q in queries if "core_classgroup" in q["sql"]])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.name = "CG0"
+            self.first.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+        names = [cg["name"] for cg in response.json()["departments"][str(self.first.department_id)]]
+        self.assertEqual(names, ["CG0", "CG1"])
+
+    def test_etag_is_the_same_from_every_worker(self):
+        etag = self.client.get(self.url)["ETag"]
+        # Another worker: nothing in memory, the same database.
+        refdata._loaded.clear()
+        departments._map = None
+        versions.clear()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # A rename made by any worker moves it for all of them.
+        ClassGroup.objects.filter(pk=self.first.pk).update(name="CG0")
+        refdata.bump(["classgroups"])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_add_student_page_points_at_the_map(self):
+        response = self.client.get(reverse("adminportal:add_student"))
+        self.assertContains(response, f'data-classgroups-src="{self.url}"')
 
-# Create your tests here.
@@ -21,7 +21,8 @@ urlpatterns = [
     # Student management pages
     path('students/', views.student_list, name='student_list'),
     path('students/add/', views.add_student, name='add_student'),
-    path('students/classgroups_by_department/', views.get_classgroups_by_department, name='get_classgroups_by_department'),
+    path('students/typeahead/', views.student_typeahead, name='student_typeahead'),
+    path('students/classgroups.json', views.get_classgroups_by_department, name='get_classgroups_by_department'),
 
 
     #Enroll students in courses
@@ -66,5 +67,8 @@ path('classgroup/<int:pk>/assign-lecturers/', views.assign_lecturer_classgroup,
     path("fees/plan/<int:plan_id>/generate/", views.fee_plan_generate_installments, name="fee_plan_generate_installments"),
     path("fees/installment/<int:pk>/toggle/", views.installment_toggle_paid, name="installment_toggle_paid"),
 
+    # View metrics (latency / query counts per URL name)
+    path("metrics/", views.view_metrics, name="view_metrics"),
+
 
 ]
@@ -1,10 +1,16 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login
 from django.contrib import messages
-from django.db.models import Q
-from django.http import HttpResponse
+from django.db.models import Exists, OuterRef, Subquery
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import etag
 from accounts.decorators import role_required
 from accounts.models import CustomUser
+from core import counters, departments, metrics, refdata, search, typeahead
+from core.aggregates import GroupConcat
+from core.pagination import KeysetPaginator
+from dashboard import fragments
 from .forms import (
     LecturerCreationForm, StudentUpdateForm, StudentProfileUpdateForm,
     CourseForm, DepartmentForm, AddStudentForm, AssignLecturersToClassGroupForm,
@@ -12,17 +18,21 @@ from .forms import (
 )
 from core.models import Department, Course, Lecturer, Student, Enrollment, ClassGroup
 import csv
-from django.template.loader import render_to_string
 from .forms import CustomUserCreationForm
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Q, Sum, Count
+from django.db.models import Sum, Count
 from django.utils import timezone
 from accounts.decorators import role_required
 from accounts.models import CustomUser
 from core.models import Student, StudentFeePlan, StudentFeeInstallment
 from .forms import FeePlanCreateForm, FeePlanCreateForStudentForm, InstallmentUpdateForm
 
+def _page(request, queryset, keys):
+    """One keyset page of an admin list, addressed by ?after= / ?before=."""
+    per_page = getattr(settings, "ADMIN_LIST_PAGE_SIZE", 50)
+    return KeysetPaginator(queryset, keys, per_page=per_page).page(request.GET)
+
 # ---------- LECTURERS ----------
 
 def lecturer_list(request):
@@ -32,18 +42,14 @@ def lecturer_list(request):
     lecturers = Lecturer.objects.select_related('user', 'department').prefetch_related('subjects', 'classgroups')
 
     if query:
-        lecturers = lecturers.filter(
-            Q(user__full_name__icontains=query) |
-            Q(user__short_name__icontains=query) |
-            Q(user__email__icontains=query)
-        )
+        lecturers = search.search(lecturers, 'users', query, path='user')
     if department_id:
         lecturers = lecturers.filter(department_id=department_id)
 
-    departments = Department.objects.all()
+    keys = ('user__full_name', 'pk')
     return render(request, 'adminportal/lecturer_part/lecturer_list.html', {
-        'lecturers': lecturers,
-        'departments': departments,
+        'lecturers': _page(request, lecturers, ('-search_rank', *keys) if query else keys),
+        'departments': refdata.rows('departments'),
     })
 
 @role_required(CustomUser.Role.ADMIN)
@@ -63,8 +69,8 @@ def add_lecturer(request):
         form = LecturerCreationForm()
     return render(request, 'adminportal/lecturer_part/add_lecturer.html', {
         'lecturer_form': form,
-        'departments': Department.objects.all(),
-        'courses': Course.objects.all(),
+        'departments': refdata.rows('departments'),
+        'courses': refdata.rows('courses'),
     })
 
 def export_lecturers(request):
@@ -87,9 +93,25 @@ def export_lecturers(request):
 
 # ---------- STUDENTS ----------
 
+def _enrollment_names(field):
+    """A student user's enrollments' `field` values, comma-joined, as a subquery."""
+    return (
+        Enrollment.objects.filter(student__user=OuterRef('pk'))
+        .order_by().values('student')
+        .annotate(names=GroupConcat(field))
+        .values('names')
+    )
+
 @role_required(CustomUser.Role.ADMIN)
 def student_list(request):
-    students = CustomUser.objects.filter(role=CustomUser.Role.STUDENT).select_related('department').order_by('full_name')
+    students = (
+        CustomUser.objects.filter(role=CustomUser.Role.STUDENT)
+        .select_related('department', 'student')
+        .annotate(
+            course_names=Subquery(_enrollment_names('class_group__course__name')),
+            classgroup_names=Subquery(_enrollment_names('class_group__name')),
+        )
+    )
 
     # GET parameters for filtering
     department_id = request.GET.get('department')
@@ -102,22 +124,22 @@ def student_list(request):
 
     # Filter by class group (through Enrollment relationship)
     if classgroup_id:
-        students = students.filter(student__enrollment__class_group_id=classgroup_id).distinct()
+        students = students.filter(Exists(
+            Enrollment.objects.filter(student__user=OuterRef('pk'), class_group_id=classgroup_id)
+        ))
 
-    # Search by name or email
+    # Search by name or email, best matches first
     if query:
-        students = students.filter(
-            Q(full_name__icontains=query) |
-            Q(short_name__icontains=query) |
-            Q(email__icontains=query)
-        )
+        students = search.search(students, 'users', query)
 
-    # Get filter dropdown values
-    departments = Department.objects.all()
-    classgroups = ClassGroup.objects.all()
+    # Get filter dropdown values, with facet counts from the counters table
+    departments = counters.attach(
+        refdata.rows('departments'), 'student_count', lambda pk: counters.department_key(pk, 'students')
+    )
+    classgroups = counters.attach(refdata.rows('classgroups'), 'student_count', counters.classgroup_key)
 
     return render(request, 'adminportal/student_part/student_list.html', {
-        'students': students,
+        'students': _page(request, students, ('-search_rank', 'full_name', 'pk') if query else ('full_name', 'pk')),
         'departments': departments,
         'classgroups': classgroups,
     })
@@ -206,7 +228,7 @@ def student_edit(request, pk):
 
 def enroll_student(request, pk):
     student = get_object_or_404(Student, user_id=pk)
-    classgroups = ClassGroup.objects.all()
+    classgroups = refdata.rows('classgroups')
 
     if request.method == "POST":
         classgroup_id = request.POST.get("class_group")
@@ -250,8 +272,10 @@ def export_students(request):
 
 @role_required(CustomUser.Role.ADMIN)
 def staff_list(request):
-    staff_users = CustomUser.objects.filter(role=CustomUser.Role.ADMIN).order_by('full_name', 'short_name')
-    return render(request, 'adminportal/staff_part/staff_list.html', {'staff_users': staff_users})
+    staff_users = CustomUser.objects.filter(role=CustomUser.Role.ADMIN)
+    return render(request, 'adminportal/staff_part/staff_list.html', {
+        'staff_users': _page(request, staff_users, ('full_name', 'pk')),
+    })
 
 @role_required(CustomUser.Role.ADMIN)
 def add_staff(request):
@@ -281,8 +305,10 @@ def add_staff(request):
 
 @role_required(CustomUser.Role.ADMIN)
 def course_list(request):
-    courses = Course.objects.all().order_by('name')
-    return render(request, 'adminportal/course_part/course_list.html', {'courses': courses})
+    courses = Course.objects.prefetch_related('classgroups__lecturers__user')
+    return render(request, 'adminportal/course_part/course_list.html', {
+        'courses': _page(request, courses, ('name', 'pk')),
+    })
 
 @role_required(CustomUser.Role.ADMIN)
 def add_course(request):
@@ -392,7 +418,10 @@ def export_courses(request):
 
 @role_required(CustomUser.Role.ADMIN)
 def department_list(request):
-    departments = Department.objects.all()
+    departments = counters.attach(
+        refdata.rows('departments'), 'student_count', lambda pk: counters.department_key(pk, 'students')
+    )
+    counters.attach(departments, 'lecturer_count', lambda pk: counters.department_key(pk, 'lecturers'))
     return render(request, 'adminportal/department_part/department_list.html', {'departments': departments})
 
 @role_required(CustomUser.Role.ADMIN)
@@ -452,20 +481,20 @@ def add_subject(request):
     return render(request, 'adminportal/course_part/add_subject.html', {'form': form})
 
 
+# ---------- STUDENT TYPEAHEAD ----------
+@role_required(CustomUser.Role.ADMIN)
+def student_typeahead(request):
+    return JsonResponse({"results": typeahead.lookup(request.GET.get("q", ""))})
+
 # ---------- CLASSGROUPS BY DEPARTMENT ----------
 @role_required(CustomUser.Role.ADMIN)
+@etag(lambda request: str(departments.version()))
 def get_classgroups_by_department(request):
+    """One department's class groups with ?department=, else the whole map."""
     department_id = request.GET.get("department")
-    from core.models import ClassGroup
     if department_id:
-        classgroups = ClassGroup.objects.filter(department_id=department_id)
-    else:
-        classgroups = ClassGroup.objects.none()
-    # Use the same form, but re-render just the class_group widget
-    form = AddStudentForm(initial={"department": department_id})
-    form.fields['class_group'].queryset = classgroups
-    html = render_to_string('adminportal/student_part/_classgroup_dropdown.html', {'form': form})
-    return HttpResponse(html)
+        return JsonResponse({"classgroups": departments.classgroups(department_id)})
+    return JsonResponse({"departments": departments.classgroup_map()})
 
 
 
@@ -499,22 +528,21 @@ def fee_plan_list(request):
         .all()
     )
     if q:
-        plans = plans.filter(
-            Q(student__user__full_name__icontains=q) |
-            Q(student__user__email__icontains=q) |
-            Q(description__icontains=q)
-        )
+        plans = search.search(plans, "fee_plans", q)
     if status:
         plans = plans.filter(status=status)
 
-    # quick aggregates for the page header
-    aggregates = plans.aggregate(
-        total=Sum("total_amount"),
-        count=Count("id"),
-    )
+    # quick aggregates for the page header; only on the first page, so
+    # paging through a long list doesn't re-scan every matching plan
+    aggregates = None
+    if not (request.GET.get("after") or request.GET.get("before")):
+        aggregates = plans.aggregate(
+            total=Sum("total_amount"),
+            count=Count("id"),
+        )
 
     context = {
-        "plans": plans.order_by("-created_at"),
+        "plans": _page(request, plans, ("-search_rank", "-created_at", "-pk") if q else ("-created_at", "-pk")),
         "q": q,
         "status": status,
         "aggregates": aggregates,
@@ -600,4 +628,60 @@ def installment_toggle_paid(request, pk):
     inst.paid_date = timezone.localdate() if inst.is_paid else None
     inst.save(update_fields=["is_paid", "paid_date"])
     messages.success(request, f"Installment #{inst.sequence_no} is now {'PAID' if inst.is_paid else 'UNPAID'}.")
-    return redirect("adminportal:fee_plan_detail", plan_id=inst.plan_id)
\ No newline at end of file
+    return redirect("adminportal:fee_plan_detail", plan_id=inst.plan_id)
+
+
+# ---------- VIEW METRICS ----------
+METRIC_SORTS = {
+    "total": lambda r: r["total_ms"],
+    "mean": lambda r: r["mean_ms"],
+    "queries": lambda r: r["mean_queries"],
+    "sql": lambda r: r["mean_sql_ms"],
+    "count": lambda r: r["count"],
+}
+
+
+@role_required(CustomUser.Role.ADMIN)
+def view_metrics(request):
+    """Per-URL-name latency / query histograms merged across workers (core.metrics)."""
+    if request.method == "POST":
+        metrics.reset()
+        fragments.reset_stats()
+        messages.success(request, "View metrics reset.")
+        return redirect("adminportal:view_metrics")
+
+    metrics.flush()  # include this worker's latest numbers
+    app = request.GET.get("app", "")
+    rows = []
+    for url_name, series in metrics.merged().items():
+        if app and not url_name.startswith(f"{app}:"):
+            continue
+        count = series["count"] or 1
+        rows.append({
+            "url_name": url_name,
+            "count": series["count"],
+            "total_ms": round(series["latency_ms_sum"]),
+            "mean_ms": round(series["latency_ms_sum"] / count, 1),
+            "p50_ms": metrics.percentile(series, "latency_ms", 0.5),
+            "p95_ms": metrics.percentile(series, "latency_ms", 0.95),
+            "p99_ms": metrics.percentile(series, "latency_ms", 0.99),
+            "mean_queries": round(series["queries_sum"] / count, 1),
+            "p95_queries": metrics.percentile(series, "queries", 0.95),
+            "mean_sql_ms": round(series["sql_ms_sum"] / count, 1),
+            "p95_sql_ms": metrics.percentile(series, "sql_ms", 0.95),
+        })
+    sort = request.GET.get("sort", "total")
+    rows.sort(key=METRIC_SORTS.get(sort, METRIC_SORTS["total"]), reverse=True)
+
+    dashboard_cache = fragments.stats()
+    if request.GET.get("format") == "json":
+        return JsonResponse({"views": rows, "dashboard_cache": dashboard_cache})
+    return render(request, "adminportal/metrics_part/view_metrics.html", {
+        "rows": rows,
+        "dashboard_cache": dashboard_cache,
+        "app": app,
+        "apps": ["lecturer", "adminportal", "dashboard", "student"],
+        "sort": sort,
+        "sample_rate": settings.VIEW_METRICS_SAMPLE_RATE,
+        "flush_seconds": settings.VIEW_METRICS_FLUSH_SECONDS,
+    })
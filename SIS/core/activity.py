@@ -0,0 +1,139 @@
+# core/activity.py
+"""
+Coalesced "latest activity" tracking.
+
+touch(user) only notes the user id in memory. Every ACTIVITY_FLUSH_SECONDS
+a worker writes all pending touches with one bulk UPDATE on
+CustomUser.latest_activity, the one place activity is stored for every
+role. A touch is dropped if this worker wrote that user within
+ACTIVITY_RESOLUTION_SECONDS. The UPDATEs also skip rows whose stored value
+is already that recent, for example when another worker wrote them. The
+stored value is therefore accurate to roughly the flush interval, and
+reading a page never writes.
+
+ActivityMiddleware touches every authenticated request, for all roles.
+Pending touches are also flushed when the worker exits normally (atexit).
+write(user) records one user's activity at once, for explicit actions that
+must be visible immediately.
+
+Settings (all optional):
+    ACTIVITY_FLUSH_SECONDS       seconds between flushes per worker (default 30)
+    ACTIVITY_RESOLUTION_SECONDS  minimum age before a stored value is rewritten (default 60)
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+
+
+def _resolution():
+    return getattr(settings, "ACTIVITY_RESOLUTION_SECONDS", 60)
+
+
+class _Tracker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Called again after a fork so workers don't inherit the parent's touches.
+        self.pid = os.getpid()
+        self.pending = set()  # user ids
+        self.written = {}  # user id -> monotonic time of our last write
+        self.last_flush = time.monotonic()
+
+    def touch(self, user):
+        now = time.monotonic()
+        with self.lock:
+            if self.pid != os.getpid():
+                self._reset()
+            if now - self.written.get(user.pk, float("-inf")) < _resolution():
+                return
+            self.pending.add(user.pk)
+
+    def due(self):
+        interval = getattr(settings, "ACTIVITY_FLUSH_SECONDS", 30)
+        return bool(self.pending) and time.monotonic() - self.last_flush >= interval
+
+    def flush(self):
+        """Write pending touches; returns how many user rows were updated."""
+        with self.lock:
+            pending, self.pending = self.pending, set()
+            self.last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        now = timezone.now()
+        stale = Q(latest_activity__isnull=True) | Q(latest_activity__lt=now - timedelta(seconds=_resolution()))
+        user_ids = list(pending)
+        updated = 0
+        try:
+            for i in range(0, len(user_ids), CHUNK_SIZE):
+                updated += CustomUser.objects.filter(stale, pk__in=user_ids[i:i + CHUNK_SIZE]).update(latest_activity=now)
+        except DatabaseError:
+            logger.warning("Could not flush activity touches", exc_info=True)
+            with self.lock:
+                self.pending |= pending
+            return 0
+
+        written_at = time.monotonic()
+        with self.lock:
+            cutoff = written_at - _resolution()
+            self.written = {pk: t for pk, t in self.written.items() if t > cutoff}
+            self.written.update(dict.fromkeys(user_ids, written_at))
+        return updated
+
+    def write(self, user):
+        """Write one user's activity now, bypassing the queue."""
+        CustomUser.objects.filter(pk=user.pk).update(latest_activity=timezone.now())
+        with self.lock:
+            self.pending.discard(user.pk)
+            self.written[user.pk] = time.monotonic()
+
+    def clear(self):
+        with self.lock:
+            self.pending, self.written = set(), {}
+
+
+_tracker = _Tracker()
+touch = _tracker.touch
+flush = _tracker.flush
+write = _tracker.write
+
+
+@atexit.register
+def _flush_at_exit():
+    # A recycled or stopped worker would otherwise drop its queued touches.
+    if _tracker.pending and _tracker.pid == os.getpid():
+        _tracker.flush()
+
+
+def maybe_flush():
+    if _tracker.due():
+        _tracker.flush()
+
+
+class ActivityMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            touch(user)
+            maybe_flush()
+        return response
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Lecturer, Student, Course, Subject, ClassGroup,
-    Enrollment, Attendance,
+    Enrollment, Attendance, AttendanceSummary,
     StudentAchievement, DisciplinaryAction, Department, Parent, StudentFeePlan, StudentFeeInstallment,
 )
 
@@ -25,7 +25,7 @@ class LecturerAdmin(admin.ModelAdmin):
 # ---------- Student ----------
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
-    list_display = ('user', 'class_group', 'profile_picture_display', 'latest_activity')
+    list_display = ('user', 'class_group', 'profile_picture_display', 'user__latest_activity')
     readonly_fields = ('profile_picture_display',)
 
     def profile_picture_display(self, obj):
@@ -80,6 +80,15 @@ class AttendanceAdmin(admin.ModelAdmin):
         'enrollment__student__user__short_name',
     )
 
+# ---------- Attendance Summary ----------
+@admin.register(AttendanceSummary)
+class AttendanceSummaryAdmin(admin.ModelAdmin):
+    list_display = (
+        'enrollment', 'present_count', 'absent_count', 'late_count', 'excused_count',
+        'last_marked_date', 'current_streak', 'updated_at',
+    )
+    readonly_fields = list_display
+
 # ---------- Student Achievement ----------
 @admin.register(StudentAchievement)
 class StudentAchievementAdmin(admin.ModelAdmin):
@@ -0,0 +1,36 @@
+# core/aggregates.py
+"""
+Database aggregates Django doesn't ship for every backend.
+
+GroupConcat joins a column's values into one string per group:
+GROUP_CONCAT on SQLite and MySQL, STRING_AGG on Postgres. Used as a
+correlated subquery it lets a list page carry a per-row summary of a
+reverse relation without a query per row:
+
+    names = (Enrollment.objects.filter(student__user=OuterRef("pk"))
+             .values("student").annotate(names=GroupConcat("class_group__name"))
+             .values("names"))
+    CustomUser.objects.annotate(classgroup_names=Subquery(names))
+
+Values come out in the order the database reads them (no ORDER BY inside the
+aggregate), and NULL when the group is empty.
+"""
+from django.db.models import Aggregate, CharField, Value
+
+
+class GroupConcat(Aggregate):
+    function = "GROUP_CONCAT"
+    template = "%(function)s(%(expressions)s)"
+    output_field = CharField()
+
+    def __init__(self, expression, separator=", ", **extra):
+        super().__init__(expression, Value(separator), **extra)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function="STRING_AGG", **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        expression, separator = self.get_source_expressions()
+        sql, params = compiler.compile(expression)
+        sep_sql, sep_params = compiler.compile(separator)
+        return f"GROUP_CONCAT({sql} SEPARATOR {sep_sql})", (*params, *sep_params)
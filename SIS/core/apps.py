@@ -1,4 +1,43 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def reconcile_counters(sender, using="default", **kwargs):
+    from django.db import connections
+
+    from core import counters
+    from core.models import Counter
+
+    # A partial migrate (e.g. another app only) may run before the table exists.
+    if Counter._meta.db_table in connections[using].introspection.table_names():
+        counters.reconcile()
+
+
+def backfill_attendance(sender, using="default", **kwargs):
+    from django.db import connections
+
+    from core import attendance
+    from core.models import AttendanceBitmap
+
+    # Existing marks get their summary/streak/bitmap rows on the first migrate
+    # that creates those tables; afterwards this finds nothing to do.
+    if AttendanceBitmap._meta.db_table in connections[using].introspection.table_names():
+        attendance.backfill()
+
+
+def create_cache_table(sender, using="default", **kwargs):
+    from django.core.management import call_command
+
+    # The shared DatabaseCache (settings.CACHES) needs its table; a no-op for other backends.
+    call_command("createcachetable", database=using, verbosity=0)
+
+
+def install_search(sender, using="default", **kwargs):
+    from core import search
+
+    # Create the search tables/indexes if missing and re-index every row.
+    search.install()
+    search.rebuild()
 
 
 class CoreConfig(AppConfig):
@@ -6,4 +45,9 @@ class CoreConfig(AppConfig):
     name = 'core'
 
     def ready(self):
-        import core.signals
\ No newline at end of file
+        import core.signals
+        # Seed/repair the counters table whenever the schema is (re)built.
+        post_migrate.connect(reconcile_counters, sender=self)
+        post_migrate.connect(install_search, sender=self)
+        post_migrate.connect(backfill_attendance, sender=self)
+        post_migrate.connect(create_cache_table, sender=self)
@@ -0,0 +1,285 @@
+# core/attendance.py
+"""
+Attendance helpers shared by the lecturer and student views.
+
+- AttendanceMatrix: counts come from one conditional-aggregation query; day
+  cells are streamed as plain tuples instead of Attendance instances.
+- AttendanceReport: per-enrollment and overall figures under the attendance
+  policy (ATTENDANCE_ATTENDED_STATUSES), from one query.
+- Self check-in: signed class codes and the staging-table flush.
+- backfill(): missing summary, streak and bitmap rows for existing marks.
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count, Q
+from django.db.models.functions import Length
+
+from .models import Attendance, AttendanceBitmap, AttendanceCheckIn, AttendanceStreak, AttendanceSummary
+
+STATUSES = ("present", "absent", "late", "excused")
+SESSIONS = ("morning", "evening")
+NOT_MARKED = "not marked"
+
+# One character per (day, session) cell in packed() rows.
+STATUS_CODES = {"present": "P", "absent": "A", "late": "L", "excused": "E", NOT_MARKED: "-"}
+
+
+def period_days(ref_date, period):
+    """Dates covered by a 'day', 'week' (Mon-Sun) or 'month' period around ref_date."""
+    if period == "week":
+        start = ref_date - timedelta(days=ref_date.weekday())
+        return [start + timedelta(days=i) for i in range(7)]
+    if period == "month":
+        m1 = ref_date.replace(day=1)
+        m2 = m1.replace(year=m1.year + 1, month=1) if m1.month == 12 else m1.replace(month=m1.month + 1)
+        return [m1 + timedelta(days=i) for i in range((m2 - m1).days)]
+    return [ref_date]
+
+
+class AttendanceMatrix:
+    """Students x days x sessions view over the Attendance table."""
+
+    def __init__(self, enrollments, days):
+        self.enrollments = enrollments
+        self.days = list(days)
+
+    def records(self):
+        return Attendance.objects.filter(
+            enrollment__in=self.enrollments,
+            date__range=(self.days[0], self.days[-1]),
+        )
+
+    def counts(self):
+        """{enrollment_id: {"present": n, "absent": n, "late": n, "excused": n, "total": n}}"""
+        rows = (
+            self.records()
+            .order_by()
+            .values("enrollment_id")
+            .annotate(
+                total=Count("id", filter=Q(status__in=STATUSES)),
+                **{status: Count("id", filter=Q(status=status)) for status in STATUSES},
+            )
+        )
+        return {row.pop("enrollment_id"): row for row in rows}
+
+    def cells(self, *extra_fields):
+        """Stream (enrollment_id, date, session, status, *extra_fields) tuples."""
+        return (
+            self.records()
+            .values_list("enrollment_id", "date", "session", "status", *extra_fields)
+            .iterator()
+        )
+
+    def rows(self):
+        """Per-enrollment rows in the shape lecturer/attendance_history.html expects."""
+        grid = {(e, d, s): status for e, d, s, status in self.cells()}
+        counts = self.counts()
+        policy = attended_statuses()
+        empty = dict.fromkeys((*STATUSES, "total"), 0)
+
+        result = []
+        for enrollment in self.enrollments:
+            c = counts.get(enrollment.id, empty)
+            result.append({
+                "student": enrollment.student,
+                "statuses": [
+                    {
+                        "date": d,
+                        "morning": grid.get((enrollment.id, d, "morning"), NOT_MARKED),
+                        "evening": grid.get((enrollment.id, d, "evening"), NOT_MARKED),
+                    }
+                    for d in self.days
+                ],
+                "present_count": c["present"],
+                "absent_count": c["absent"],
+                "late_count": c["late"],
+                "excused_count": c["excused"],
+                "total_marked": c["total"],
+                "attendance_percentage": AttendanceFigures(c, policy).percentage,
+            })
+        return result
+
+    def packed(self, describe):
+        """
+        Compact encoding for client-side grids:
+        {"dates": [...], "sessions": [...], "codes": {...}, "students": [...], "rows": ["PA-L", ...]}
+        Row i belongs to students[i] (describe(enrollment)); cell day*len(SESSIONS) + session.
+        """
+        enrollments = list(self.enrollments)
+        row_of = {e.id: i for i, e in enumerate(enrollments)}
+        day_of = {d: i for i, d in enumerate(self.days)}
+        session_of = {s: i for i, s in enumerate(SESSIONS)}
+        blank = STATUS_CODES[NOT_MARKED]
+
+        rows = [[blank] * (len(self.days) * len(SESSIONS)) for _ in enrollments]
+        for e, d, s, status in self.cells():
+            if d in day_of and s in session_of:
+                rows[row_of[e]][day_of[d] * len(SESSIONS) + session_of[s]] = STATUS_CODES.get(status, blank)
+
+        return {
+            "dates": [d.isoformat() for d in self.days],
+            "sessions": list(SESSIONS),
+            "codes": {code: status for status, code in STATUS_CODES.items()},
+            "students": [describe(e) for e in enrollments],
+            "rows": ["".join(r) for r in rows],
+        }
+
+
+# ---------- Attendance reports ----------
+def attended_statuses():
+    """Statuses that count as attended, from ATTENDANCE_ATTENDED_STATUSES."""
+    statuses = tuple(getattr(settings, "ATTENDANCE_ATTENDED_STATUSES", ("present", "late", "excused")))
+    unknown = set(statuses) - set(STATUSES)
+    if unknown:
+        raise ImproperlyConfigured(f"ATTENDANCE_ATTENDED_STATUSES has unknown statuses: {sorted(unknown)}")
+    return statuses
+
+
+class AttendanceFigures:
+    """Marked sessions per status for one enrollment (or a sum of them)."""
+
+    def __init__(self, counts=None, policy=None):
+        self.counts = dict.fromkeys(STATUSES, 0)
+        for status in STATUSES:
+            self.counts[status] += (counts or {}).get(status, 0)
+        self.policy = policy or attended_statuses()
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    @property
+    def attended(self):
+        return sum(self.counts[status] for status in self.policy)
+
+    @property
+    def missed(self):
+        return self.total - self.attended
+
+    @property
+    def percentage(self):
+        """Attended share of marked sessions, 2 places; None when nothing is marked."""
+        return round(self.attended / self.total * 100, 2) if self.total else None
+
+    def __add__(self, other):
+        return AttendanceFigures(
+            {status: self.counts[status] + other.counts[status] for status in STATUSES}, self.policy,
+        )
+
+
+class AttendanceReport:
+    """
+    Attendance figures for a set of enrollments, from one query: a
+    GROUP BY enrollment, status over Attendance when limited to ``days``,
+    otherwise the maintained AttendanceSummary rows (the same counts over
+    the whole history).
+
+        report = AttendanceReport(enrollments)
+        report[enrollment.id].percentage, report.overall.attended
+    """
+
+    def __init__(self, enrollments, days=None, policy=None):
+        self.policy = tuple(policy or attended_statuses())
+        counts = {}
+        if days is not None:
+            days = list(days)
+            rows = (
+                Attendance.objects
+                .filter(enrollment__in=enrollments, date__range=(min(days), max(days)), status__in=STATUSES)
+                .order_by()
+                .values_list("enrollment_id", "status")
+                .annotate(n=Count("id"))
+            ) if days else ()
+            for enrollment_id, status, n in rows:
+                counts.setdefault(enrollment_id, {})[status] = n
+        else:
+            fields = [f"{status}_count" for status in STATUSES]
+            for enrollment_id, *values in (
+                AttendanceSummary.objects.filter(enrollment__in=enrollments).values_list("enrollment_id", *fields)
+            ):
+                counts[enrollment_id] = dict(zip(STATUSES, values))
+        self.by_enrollment = {eid: AttendanceFigures(c, self.policy) for eid, c in counts.items()}
+
+    def __getitem__(self, enrollment_id):
+        return self.by_enrollment.get(enrollment_id) or AttendanceFigures(policy=self.policy)
+
+    @property
+    def overall(self):
+        total = AttendanceFigures(policy=self.policy)
+        for figures in self.by_enrollment.values():
+            total += figures
+        return total
+
+
+# ---------- Self check-in ----------
+CHECKIN_CODE_SALT = "core.attendance.checkin"
+
+
+def checkin_code(classgroup, day, session):
+    """Signed code students scan/enter to check in to one class session."""
+    return signing.dumps([classgroup.id, day.isoformat(), session], salt=CHECKIN_CODE_SALT)
+
+
+def read_checkin_code(code):
+    """(classgroup_id, date, session) for a valid, unexpired code, else None."""
+    max_age = getattr(settings, "ATTENDANCE_CHECKIN_CODE_MAX_AGE", 3 * 60 * 60)
+    try:
+        classgroup_id, day, session = signing.loads(code or "", salt=CHECKIN_CODE_SALT, max_age=max_age)
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+    if session not in SESSIONS:
+        return None
+    return classgroup_id, date.fromisoformat(day), session
+
+
+def flush_checkins(classgroups):
+    """
+    Record these class groups' staged check-ins before a lecturer reads
+    their attendance. Everything else is drained by the
+    flush_attendance_checkins job; student requests only stage.
+    """
+    return AttendanceCheckIn.objects.flush(classgroups=classgroups)
+
+
+# ---------- Derived stores ----------
+def backfill(chunk_size=500):
+    """
+    Write the AttendanceSummary, AttendanceStreak and AttendanceBitmap rows
+    missing for existing marks, e.g. after the tables were added to a
+    populated database (core.apps runs this after every migrate). Bitmaps
+    still in an older, differently sized layout are rebuilt too. Other
+    existing rows are left alone; rebuild_attendance_summary and
+    check_attendance_bitmaps --fix rewrite those. Returns {store: rows written}.
+    """
+    marked = Attendance.objects.order_by()
+    targets = {
+        "summaries": (
+            AttendanceSummary.objects, AttendanceSummary.objects.compute,
+            marked.filter(enrollment__attendance_summary__isnull=True).values_list("enrollment_id", flat=True),
+        ),
+        "streaks": (
+            AttendanceStreak.objects, AttendanceStreak.objects.compute,
+            marked.filter(enrollment__student__attendance_streak__isnull=True)
+            .values_list("enrollment__student_id", flat=True),
+        ),
+        "bitmaps": (
+            AttendanceBitmap.objects, lambda ids: list(AttendanceBitmap.objects.compute(ids).values()),
+            marked.filter(
+                Q(enrollment__attendance_bitmaps__isnull=True)
+                | Q(enrollment__attendance_bitmaps__in=AttendanceBitmap.objects
+                    .annotate(size=Length("bits")).exclude(size=AttendanceBitmap.SIZE))
+            ).values_list("enrollment_id", flat=True),
+        ),
+    }
+    written = {}
+    for store, (manager, compute, missing) in targets.items():
+        ids = sorted(set(missing))
+        written[store] = 0
+        for i in range(0, len(ids), chunk_size):
+            rows = compute(ids[i:i + chunk_size])
+            manager.upsert(rows)
+            written[store] += len(rows)
+    return written
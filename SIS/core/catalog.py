@@ -0,0 +1,106 @@
+# core/catalog.py
+"""
+Cached class catalog: what a class group is taught and by whom.
+
+For one class group, catalog() returns its course, the course's subjects
+(with their lecturers) and the lecturers assigned to the class, flattened
+to plain dicts with names, emails and avatar URLs:
+
+    {"course": {"name", "code"} | None,
+     "subjects": [{"id", "name", "code", "lecturers": [lecturer, ...]}, ...],
+     "lecturers": [lecturer, ...]}
+    lecturer = {"id", "name", "email", "initial", "avatar_url", "department"}
+
+Built in four queries and cached under catalog:classgroup:<id> in the
+default cache, which is shared between workers in production (CACHES), so
+a deletion reaches every process. The receivers in core.signals delete
+entries, after commit, when a subject, course, class group, lecturer,
+lecturer's user or lecturer's department changes, or when
+Lecturer.subjects / ClassGroup.lecturers links move. CATALOG_CACHE_SECONDS
+(default 3600) is only a backstop.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch, Q
+
+from .models import ClassGroup, Lecturer, Subject
+
+
+def key(classgroup_id):
+    return f"catalog:classgroup:{classgroup_id}"
+
+
+def _lecturer(lecturer):
+    user = lecturer.user
+    picture = lecturer.profile_picture or user.profile_picture
+    name = user.get_full_name()
+    return {
+        "id": lecturer.pk,
+        "name": name,
+        "email": user.email,
+        "initial": (name or user.email)[:1].upper(),
+        "avatar_url": picture.url if picture else None,
+        "department": lecturer.department.name if lecturer.department else None,
+    }
+
+
+def build(classgroup_id):
+    lecturers = Lecturer.objects.select_related("user", "department").order_by("user__full_name", "pk")
+    classgroup = (
+        ClassGroup.objects.filter(pk=classgroup_id)
+        .select_related("course")
+        .prefetch_related(Prefetch("lecturers", queryset=lecturers))
+        .first()
+    )
+    if classgroup is None:
+        return None
+    subjects = (
+        Subject.objects.filter(course_id=classgroup.course_id)
+        .prefetch_related(Prefetch("lecturers", queryset=lecturers))
+        .order_by("code")
+    )
+    course = classgroup.course
+    return {
+        "course": {"name": course.name, "code": course.code} if course else None,
+        "subjects": [
+            {
+                "id": s.pk,
+                "name": s.name,
+                "code": s.code,
+                "lecturers": [_lecturer(lecturer) for lecturer in s.lecturers.all()],
+            }
+            for s in subjects
+        ],
+        "lecturers": [_lecturer(lecturer) for lecturer in classgroup.lecturers.all()],
+    }
+
+
+def catalog(classgroup_id):
+    """The catalog for one class group (None if it doesn't exist)."""
+    value = cache.get(key(classgroup_id))
+    if value is None:
+        value = build(classgroup_id)
+        if value is not None:
+            cache.set(key(classgroup_id), value, getattr(settings, "CATALOG_CACHE_SECONDS", 3600))
+    return value
+
+
+def classgroup_ids(courses=(), lecturers=()):
+    """Class groups whose catalog shows any of these courses or lecturers."""
+    courses, lecturers = list(courses), list(lecturers)
+    if not courses and not lecturers:
+        return []
+    taught = Subject.objects.filter(lecturers__in=lecturers).values("course_id")
+    return list(
+        ClassGroup.objects
+        .filter(Q(course_id__in=courses) | Q(lecturers__in=lecturers) | Q(course_id__in=taught))
+        .values_list("pk", flat=True).distinct()
+    )
+
+
+def invalidate(classgroup_ids):
+    """Delete catalog entries once the current transaction (if any) commits."""
+    keys = [key(pk) for pk in classgroup_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
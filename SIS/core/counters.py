@@ -0,0 +1,132 @@
+# core/counters.py
+"""
+Denormalised totals for the admin dashboard and the admin list facets.
+
+Counter rows are keyed by strings:
+    users                       every user
+    users:<ROLE>                users per role
+    courses                     every course
+    department:<id>:students    student users per department (CustomUser.department)
+    department:<id>:lecturers   lecturer profiles per department (Lecturer.department)
+    classgroup:<id>:students    enrollments per class group
+
+core.signals keeps them current for single-row saves and deletes. Bulk paths
+(bulk_create, queryset.update) skip those signals and must call count_users()
+/ count_enrollments() themselves. reconcile() recomputes every counter from
+the source tables; it runs after migrate and periodically through the
+reconcile_counters command, which catches anything the hooks missed.
+"""
+from collections import Counter as Tally
+
+from django.db import transaction
+from django.db.models import Count
+
+from accounts.models import CustomUser
+
+from .models import Counter, Course, Enrollment, Lecturer
+
+USERS = "users"
+COURSES = "courses"
+
+
+def role_key(role):
+    return f"users:{role}"
+
+
+def department_key(department_id, what):
+    return f"department:{department_id}:{what}"
+
+
+def classgroup_key(classgroup_id):
+    return f"classgroup:{classgroup_id}:students"
+
+
+def user_keys(role, department_id):
+    keys = [USERS, role_key(role)]
+    if role == CustomUser.Role.STUDENT and department_id:
+        keys.append(department_key(department_id, "students"))
+    return keys
+
+
+def lecturer_keys(department_id):
+    return [department_key(department_id, "lecturers")] if department_id else []
+
+
+def enrollment_keys(classgroup_id):
+    return [classgroup_key(classgroup_id)]
+
+
+def shift(old_keys, new_keys):
+    """Move one row's contribution from old_keys to new_keys."""
+    deltas = Tally(new_keys)
+    deltas.subtract(old_keys)
+    Counter.objects.adjust(deltas)
+
+
+def count_users(users, sign=1):
+    """Counter upkeep for users written in bulk (signals don't fire)."""
+    deltas = Tally()
+    for user in users:
+        for key in user_keys(user.role, user.department_id):
+            deltas[key] += sign
+    Counter.objects.adjust(deltas)
+
+
+def count_enrollments(enrollments, sign=1):
+    deltas = Tally()
+    for enrollment in enrollments:
+        for key in enrollment_keys(enrollment.class_group_id):
+            deltas[key] += sign
+    Counter.objects.adjust(deltas)
+
+
+def attach(objects, attr, key_for):
+    """Set obj.<attr> to the counter key_for(obj.pk) on each object, in one query."""
+    objects = list(objects)
+    values = Counter.objects.get_many(key_for(obj.pk) for obj in objects)
+    for obj in objects:
+        setattr(obj, attr, values[key_for(obj.pk)])
+    return objects
+
+
+def forget(prefix):
+    """Drop the counters of a deleted department or class group."""
+    Counter.objects.filter(key__startswith=prefix).delete()
+
+
+def expected():
+    """Every counter's true value, counted from the source tables."""
+    users = CustomUser.objects.all()
+    values = {USERS: users.count(), COURSES: Course.objects.count()}
+    values.update({role_key(role): 0 for role in CustomUser.Role.values})
+    for role, n in users.values_list("role").annotate(n=Count("id")).order_by():
+        values[role_key(role)] = n
+    students = users.filter(role=CustomUser.Role.STUDENT, department__isnull=False)
+    for department_id, n in students.values_list("department_id").annotate(n=Count("id")).order_by():
+        values[department_key(department_id, "students")] = n
+    lecturers = Lecturer.objects.filter(department__isnull=False)
+    for department_id, n in lecturers.values_list("department_id").annotate(n=Count("id")).order_by():
+        values[department_key(department_id, "lecturers")] = n
+    for classgroup_id, n in Enrollment.objects.values_list("class_group_id").annotate(n=Count("id")).order_by():
+        values[classgroup_key(classgroup_id)] = n
+    return values
+
+
+def reconcile():
+    """Rewrite drifted counters from expected(); returns {key: (stored, actual)}."""
+    with transaction.atomic():
+        stored = dict(Counter.objects.values_list("key", "value"))
+        actual = expected()
+        drift = {
+            key: (stored.get(key, 0), actual.get(key, 0))
+            for key in stored.keys() | actual.keys()
+            if stored.get(key, 0) != actual.get(key, 0)
+        }
+        Counter.objects.bulk_create(
+            [Counter(key=key, value=value) for key, value in actual.items() if stored.get(key) != value],
+            update_conflicts=True,
+            unique_fields=["key"],
+            update_fields=["value"],
+        )
+        Counter.objects.filter(key__in=stored.keys() - actual.keys()).delete()
+    return drift
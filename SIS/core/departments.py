@@ -0,0 +1,44 @@
+# core/departments.py
+"""
+Department -> class group map for the admin dropdowns.
+
+classgroup_map() returns every class group keyed by department id (as a
+string, so it serialises to JSON unchanged), in name order:
+
+    {"<department_id>": [{"id", "name", "label"}, ...], ...}
+
+label is the class group's str(), e.g. "CS1A (CS, 2025)". The map is built
+from core.refdata's class groups and kept per process until their version
+moves, so it costs no query in the steady state. The version is a
+core.versions stamp shared by every worker, so it doubles as an ETag for
+the JSON endpoint: a client gets the same one whichever worker answers.
+"""
+from . import refdata
+
+_map, _map_version = None, None
+
+
+def version():
+    return refdata.version("classgroups")
+
+
+def build():
+    result = {}
+    for classgroup in sorted(refdata.rows("classgroups"), key=lambda cg: (cg.name, cg.pk)):
+        result.setdefault(str(classgroup.department_id), []).append(
+            {"id": classgroup.pk, "name": classgroup.name, "label": str(classgroup)}
+        )
+    return result
+
+
+def classgroup_map():
+    global _map, _map_version
+    current = version()
+    if _map is None or _map_version != current:
+        _map, _map_version = build(), current
+    return _map
+
+
+def classgroups(department_id):
+    """One department's class groups ([] for an unknown id)."""
+    return classgroup_map().get(str(department_id), [])
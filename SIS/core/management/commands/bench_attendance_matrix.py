@@ -0,0 +1,117 @@
+import random
+import time
+import tracemalloc
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import CustomUser
+from core import counters
+from core.attendance import STATUSES, AttendanceMatrix, period_days
+from core.models import Attendance, ClassGroup, Course, Department, Enrollment, Student
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _legacy_rows(enrollments, days):
+    """The pre-matrix attendance_history loop: model instances + per-cell counting in Python."""
+    records = (
+        Attendance.objects
+        .filter(enrollment__in=enrollments, date__range=[days[0], days[-1]])
+        .select_related("enrollment__student__user")
+        .only("enrollment_id", "date", "session", "status")
+    )
+    att = {(r.enrollment_id, r.date, r.session): r.status for r in records}
+    rows = []
+    for e in enrollments:
+        row, counts = [], dict.fromkeys((*STATUSES, "total"), 0)
+        for d in days:
+            m = att.get((e.id, d, "morning"), "not marked")
+            v = att.get((e.id, d, "evening"), "not marked")
+            for s in (m, v):
+                if s in counts:
+                    counts[s] += 1
+                    counts["total"] += 1
+            row.append({"date": d, "morning": m, "evening": v})
+        rows.append({"student": e.student, "statuses": row, **counts})
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the attendance_history matrix against the old per-instance loop. "
+        "Seeds a throwaway class inside a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=500, help="Class size (default 500).")
+        parser.add_argument("--month", default="2025-03", help="Month to fill, YYYY-MM (default 2025-03).")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per variant; best is reported (default 3).")
+
+    def handle(self, *args, **options):
+        year, month = (int(part) for part in options["month"].split("-"))
+        days = period_days(date(year, month, 1), "month")
+        try:
+            with transaction.atomic():
+                enrollments = self._seed(options["students"], days)
+                for label, build in (("legacy", _legacy_rows), ("matrix", self._matrix_rows)):
+                    seconds, peak = self._measure(build, enrollments, days, max(options["repeat"], 1))
+                    self.stdout.write(f"{label:>6}: {seconds * 1000:8.1f} ms  peak {peak / 1024:8.0f} KiB")
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    @staticmethod
+    def _matrix_rows(enrollments, days):
+        return AttendanceMatrix(enrollments, days).rows()
+
+    def _measure(self, build, enrollments, days, repeat):
+        best_time, best_peak = float("inf"), float("inf")
+        for _ in range(repeat):
+            tracemalloc.start()
+            started = time.perf_counter()
+            build(enrollments.all(), days)  # fresh queryset: no shared result cache
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            best_time, best_peak = min(best_time, elapsed), min(best_peak, peak)
+        return best_time, best_peak
+
+    def _seed(self, count, days):
+        department = Department.objects.create(name="Benchmark")
+        course = Course.objects.create(code="BENCH", name="Benchmark", department=department)
+        classgroup = ClassGroup.objects.create(name="BENCH-1", department=department, course=course)
+
+        # bulk_create skips the profile signal, so students are created explicitly.
+        users = CustomUser.objects.bulk_create([
+            CustomUser(
+                email=f"bench{i}@example.com", identity_card_number=f"BENCH-{i}",
+                full_name=f"Bench Student {i}", short_name="Bench", role=CustomUser.Role.STUDENT,
+            )
+            for i in range(count)
+        ])
+        students = Student.objects.bulk_create([Student(user=u, class_group=classgroup) for u in users])
+        counters.count_users(users)
+        counters.count_enrollments(
+            Enrollment.objects.bulk_create([Enrollment(student=s, class_group=classgroup) for s in students])
+        )
+
+        enrollments = (
+            Enrollment.objects
+            .filter(class_group=classgroup)
+            .select_related("student__user", "class_group")
+            .order_by("student__user__full_name", "student__user__id")
+        )
+        rng = random.Random(0)
+        weights = (85, 8, 5, 2)
+        Attendance.objects.bulk_create([
+            Attendance(enrollment_id=eid, date=d, session=session,
+                       status=rng.choices(STATUSES, weights)[0], description="")
+            for eid in enrollments.values_list("id", flat=True)
+            for d in days if d.weekday() < 5
+            for session in ("morning", "evening")
+        ], batch_size=2000)
+        return enrollments
@@ -0,0 +1,117 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from core.models import (
+    Attendance, ClassGroup, Course, Department, DisciplinaryAction, Enrollment, Student, StudentAchievement,
+)
+
+EMAIL_DOMAIN = "dashbench.invalid"
+CODE = "DASHBENCH"
+
+
+PANELS = ("classes_panel", "achievements_panel", "disciplinary_panel")
+
+
+def _summary(label, seconds):
+    ordered = sorted(seconds)
+    pct = lambda p: ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000
+    return (
+        f"{label:>18}: mean {statistics.mean(seconds) * 1000:7.1f} ms  "
+        f"p50 {pct(.5):7.1f}  p95 {pct(.95):7.1f}  min {ordered[0] * 1000:7.1f}"
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the student dashboard shell (dashboard:main_dashboard) and each deferred panel "
+        "it loads, on a seeded student. The data is committed and removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--classes", type=int, default=8, help="Enrollments for the student (default 8).")
+        parser.add_argument("--records", type=int, default=200, help="Achievements and disciplinary actions each (default 200).")
+        parser.add_argument("--requests", type=int, default=50, help="Requests per variant (default 50).")
+        parser.add_argument("--warm", action="store_true", help="Keep the dashboard card cache between requests.")
+
+    def handle(self, *args, **options):
+        self._cleanup()
+        user = self._seed(options["classes"], options["records"])
+        try:
+            # The test clients send Host: testserver.
+            with override_settings(VIEW_METRICS_SAMPLE_RATE=0, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                count, warm = max(options["requests"], 1), options["warm"]
+                client = Client()
+                client.force_login(user)
+                results = [("shell", self._measure_sync(client, "dashboard:main_dashboard", count, warm))]
+                results += [(name, self._measure_sync(client, f"dashboard:{name}", count, warm)) for name in PANELS]
+        finally:
+            self._cleanup()
+
+        self.stdout.write(f"{options['classes']} classes, {options['records']} achievements/actions, "
+                          f"{'warm' if warm else 'cold'} card cache, {count} requests each")
+        for label, times in results:
+            self.stdout.write(_summary(label, times))
+
+    def _measure_sync(self, client, url_name, count, warm):
+        url, times = reverse(url_name), []
+        for _ in range(count):
+            if not warm:
+                cache.clear()
+            started = time.perf_counter()
+            response = client.get(url)
+            times.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f"{url} answered HTTP {response.status_code}")
+        return times
+
+    def _seed(self, classes, records):
+        department = Department.objects.create(name=CODE)
+        course = Course.objects.create(code=CODE, name="Dashboard Benchmark", department=department)
+        lecturer_user = CustomUser.objects.create_user(
+            email=f"lecturer@{EMAIL_DOMAIN}", identity_card_number=f"{CODE}-L",
+            full_name="Bench Lecturer", role=CustomUser.Role.LECTURER,
+        )
+        user = CustomUser.objects.create_user(
+            email=f"student@{EMAIL_DOMAIN}", identity_card_number=f"{CODE}-S",
+            full_name="Bench Student", role=CustomUser.Role.STUDENT,
+        )
+        student = Student.objects.get(user=user)
+
+        enrollments = []
+        for i in range(max(classes, 1)):
+            classgroup = ClassGroup.objects.create(name=f"{CODE}-{i}", department=department, course=course)
+            classgroup.lecturers.add(lecturer_user.lecturer)
+            enrollments.append(Enrollment.objects.create(student=student, class_group=classgroup))
+        student.class_group = enrollments[0].class_group
+        student.save(update_fields=["class_group"])
+
+        start = date.today() - timedelta(days=60)
+        Attendance.objects.record_sheet([
+            Attendance(enrollment=e, date=start + timedelta(days=d), session=session,
+                       status="present" if (d + i) % 7 else "absent")
+            for i, e in enumerate(enrollments)
+            for d in range(60)
+            for session in ("morning", "evening")
+        ])
+        StudentAchievement.objects.bulk_create([
+            StudentAchievement(student=student, title=f"Award {i}", date_awarded=start + timedelta(days=i % 60))
+            for i in range(records)
+        ])
+        DisciplinaryAction.objects.bulk_create([
+            DisciplinaryAction(student=student, action=f"Note {i}", date=start + timedelta(days=i % 60))
+            for i in range(records)
+        ])
+        return user
+
+    def _cleanup(self):
+        CustomUser.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").delete()
+        Course.objects.filter(code=CODE).delete()
+        Department.objects.filter(name=CODE).delete()
@@ -0,0 +1,72 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import CustomUser
+from core import search
+from core.search import LikeBackend
+
+GIVEN = ("Ahmad", "Siti", "Wei Ling", "Ravi", "Nur", "Jun Hao", "Priya", "Farah", "Daniel", "Mei Xin", "Arjun", "Aisyah")
+FAMILY = ("Tan", "Lim", "Abdullah", "Kumar", "Wong", "Ismail", "Lee", "Rahman", "Chong", "Nair", "Hassan", "Ong")
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark list page search (core.search) against the icontains LIKE scans it replaced. "
+        "Seeds throwaway users inside a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50000, help="Users to seed (default 50000).")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per query; best is reported (default 5).")
+        parser.add_argument("--limit", type=int, default=50, help="Rows fetched, i.e. one list page (default 50).")
+
+    def handle(self, *args, **options):
+        backend = search.backend()
+        try:
+            with transaction.atomic():
+                queries = self._seed(options["users"])
+                self.stdout.write(f"{options['users']} users, {backend.name} backend vs like")
+                for query in queries:
+                    results = {}
+                    for label, variant in (("like", LikeBackend()), (backend.name, backend)):
+                        results[label] = self._measure(variant, query, options["limit"], max(options["repeat"], 1))
+                    like_ms, like_rows = results["like"]
+                    ms, rows = results[backend.name]
+                    self.stdout.write(
+                        f"{query!r:>24}: like {like_ms:7.2f} ms ({like_rows} rows)   "
+                        f"{backend.name} {ms:7.2f} ms ({rows} rows)"
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _measure(self, variant, query, limit, repeat):
+        best, rows = float("inf"), 0
+        users = CustomUser.objects.filter(role=CustomUser.Role.STUDENT)
+        for _ in range(repeat):
+            started = time.perf_counter()
+            page = list(variant.search(users, "users", query).order_by("-search_rank", "full_name", "pk")[:limit])
+            best, rows = min(best, time.perf_counter() - started), len(page)
+        return best * 1000, rows
+
+    def _seed(self, count):
+        rng = random.Random(0)
+        names = [f"{rng.choice(GIVEN)} {rng.choice(FAMILY)} {rng.choice(FAMILY)}" for _ in range(count)]
+        # bulk_create skips the save signals, so the index is rebuilt below.
+        users = CustomUser.objects.bulk_create([
+            CustomUser(
+                email=f"bench{i}@example.com", identity_card_number=f"BENCH-{i}",
+                full_name=name, short_name=name.split(" ")[0], role=CustomUser.Role.STUDENT,
+            )
+            for i, name in enumerate(names)
+        ], batch_size=2000)
+        search.rebuild("users")
+        # A common name, a rarer combination, an email fragment and a single match.
+        return ("Tan", "Mei Xin Nair", "bench123", users[count // 2].email)
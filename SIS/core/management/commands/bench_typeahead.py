@@ -0,0 +1,73 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import CustomUser
+from core import typeahead
+from core.models import Student
+
+from .bench_search import FAMILY, GIVEN
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the student typeahead index: build time and per-lookup latency. "
+        "Seeds throwaway students inside a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=50000, help="Students to seed (default 50000).")
+        parser.add_argument("--lookups", type=int, default=2000, help="Lookups to time (default 2000).")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._seed(options["students"])
+                started = time.perf_counter()
+                index = typeahead.build()
+                self.stdout.write(f"build: {(time.perf_counter() - started) * 1000:.0f} ms for {len(index)} students")
+                self._time(index, options["students"], max(options["lookups"], 1))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _time(self, index, count, lookups):
+        rng = random.Random(1)
+        queries = [
+            rng.choice((
+                lambda: rng.choice(GIVEN)[:rng.randint(1, 4)],
+                lambda: f"{rng.choice(GIVEN)} {rng.choice(FAMILY)[:2]}",
+                lambda: f"bench{rng.randrange(count)}",
+                lambda: f"990101-{rng.randrange(count):06}"[:rng.randint(3, 13)],
+            ))()
+            for _ in range(lookups)
+        ]
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            index.lookup(query)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+        timings.sort()
+        self.stdout.write(
+            f"lookup: p50 {statistics.median(timings):.0f} us  p99 {timings[int(len(timings) * 0.99)]:.0f} us  "
+            f"max {timings[-1]:.0f} us over {lookups} queries"
+        )
+
+    def _seed(self, count):
+        rng = random.Random(0)
+        # bulk_create skips the profile signal, so students are created explicitly.
+        users = CustomUser.objects.bulk_create([
+            CustomUser(
+                email=f"bench{i}@example.com", identity_card_number=f"990101-{i:06}",
+                full_name=f"{rng.choice(GIVEN)} {rng.choice(FAMILY)} {rng.choice(FAMILY)}", role=CustomUser.Role.STUDENT,
+            )
+            for i in range(count)
+        ], batch_size=2000)
+        Student.objects.bulk_create([Student(user=u) for u in users], batch_size=2000)
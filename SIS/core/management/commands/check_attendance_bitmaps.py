@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import AttendanceBitmap, Enrollment
+
+
+class Command(BaseCommand):
+    help = (
+        "Check AttendanceBitmap rows against the Attendance table. "
+        "Use --fix to rewrite mismatched bitmaps (also backfills missing ones)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Rewrite bitmaps that don't match.")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Enrollments per chunk (default 500).")
+
+    def handle(self, *args, **options):
+        size = max(options["chunk_size"], 1)
+        ids = list(Enrollment.objects.order_by("id").values_list("id", flat=True))
+
+        mismatched = 0
+        for i in range(0, len(ids), size):
+            bad = AttendanceBitmap.objects.verify(ids[i:i + size])
+            mismatched += len(bad)
+            for bitmap in bad:
+                self.stdout.write(f"Mismatch: enrollment {bitmap.enrollment_id}, year {bitmap.year}")
+            if bad and options["fix"]:
+                AttendanceBitmap.objects.upsert(bad)
+
+        if mismatched and not options["fix"]:
+            raise CommandError(f"{mismatched} attendance bitmap(s) out of sync. Re-run with --fix.")
+        verb = "Fixed" if mismatched else "Checked"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} attendance bitmaps for {len(ids)} enrollment(s); {mismatched} mismatch(es)."
+        ))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import AttendanceCheckIn
+
+
+class Command(BaseCommand):
+    help = (
+        "Drain staged student self check-ins into Attendance in batched upserts. "
+        "Run with --loop as a worker process in production (see README); "
+        "several copies may run at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep running and flush on an interval.")
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds between flushes with --loop (default 2).")
+        parser.add_argument("--batch-size", type=int, default=2000, help="Check-ins per upsert (default 2000).")
+
+    def handle(self, *args, **options):
+        size = max(options["batch_size"], 1)
+        while True:
+            drained = 0
+            # Stop once a pass takes nothing: the queue is empty, or what's
+            # left is locked by another flusher and will be drained there.
+            while batch := AttendanceCheckIn.objects.flush(limit=size):
+                drained += batch
+            if drained or not options["loop"]:
+                self.stdout.write(self.style.SUCCESS(f"Flushed check-ins: {drained} check-in(s) recorded."))
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
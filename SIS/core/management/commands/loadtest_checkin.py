@@ -0,0 +1,169 @@
+import secrets
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from core import counters
+from core.attendance import checkin_code
+from core.models import Attendance, AttendanceCheckIn, ClassGroup, Course, Department, Enrollment, Student
+
+EMAIL_DOMAIN = "loadtest.invalid"
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A successful check-in answers 302; an invalid one re-renders the form (200).
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test student self check-in against a running dev server "
+        "(python manage.py runserver). Seeds --count students in a LOADTEST class, "
+        "fires one check-in each spread over --seconds, then reports latency and "
+        "how many marks reached Attendance. Use --cleanup to remove the seeded data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="Server base URL.")
+        parser.add_argument("--count", type=int, default=5000, help="Check-ins / students (default 5000).")
+        parser.add_argument("--seconds", type=float, default=60.0, help="Spread the burst over this long (default 60).")
+        parser.add_argument("--concurrency", type=int, default=64, help="Client threads (default 64).")
+        parser.add_argument("--session", default="morning", choices=["morning", "evening"])
+        parser.add_argument("--cleanup", action="store_true", help="Delete the seeded class, students and sessions, then exit.")
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            self._cleanup()
+            return
+
+        day = date.today()
+        classgroup, session_keys = self._seed(options["count"])
+        code = checkin_code(classgroup, day, options["session"])
+        url = options["url"].rstrip("/") + reverse("student:check_in")
+        self.stdout.write(f"Seeded {len(session_keys)} students; firing at {url}")
+
+        opener = urllib.request.build_opener(_NoRedirect)
+        latencies, failures, lock = [], [], threading.Lock()
+        started = time.perf_counter()
+        gap = options["seconds"] / max(len(session_keys), 1)
+
+        def fire(i, session_key):
+            delay = started + i * gap - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            csrf = secrets.token_hex(16)
+            request = urllib.request.Request(
+                url,
+                data=urllib.parse.urlencode({"code": code}).encode(),
+                headers={
+                    "Cookie": f"{settings.SESSION_COOKIE_NAME}={session_key}; {settings.CSRF_COOKIE_NAME}={csrf}",
+                    "X-CSRFToken": csrf,
+                    "Content-Type": "application/x-www-form-urlencoded",
+                },
+            )
+            t0 = time.perf_counter()
+            try:
+                with opener.open(request, timeout=30) as response:
+                    response.read()
+                    ok, outcome = False, f"HTTP {response.status}"
+            except urllib.error.HTTPError as exc:
+                ok, outcome = exc.code == 302, f"HTTP {exc.code}"
+            except urllib.error.URLError as exc:
+                ok, outcome = False, str(exc.reason)
+            except OSError as exc:  # reset / timed out mid-response
+                ok, outcome = False, repr(exc)
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    failures.append(outcome)
+
+        with ThreadPoolExecutor(max_workers=max(options["concurrency"], 1)) as pool:
+            list(pool.map(fire, range(len(session_keys)), session_keys))
+        wall = time.perf_counter() - started
+
+        # Drain whatever the opportunistic flush hasn't picked up yet.
+        while AttendanceCheckIn.objects.flush(classgroups=[classgroup]):
+            pass
+        landed = Attendance.objects.filter(
+            enrollment__class_group=classgroup, date=day, session=options["session"]
+        ).count()
+
+        ordered = sorted(latencies)
+        pct = lambda p: ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000
+        self.stdout.write(
+            f"{len(latencies)} check-ins in {wall:.1f}s ({len(latencies) / wall:.0f}/s), "
+            f"{len(failures)} failed\n"
+            f"latency ms: mean {statistics.mean(latencies) * 1000:.1f}  p50 {pct(.5):.1f}  "
+            f"p95 {pct(.95):.1f}  p99 {pct(.99):.1f}  max {ordered[-1] * 1000:.1f}\n"
+            f"attendance rows for the session: {landed}"
+        )
+        if failures:
+            raise CommandError(f"{len(failures)} check-in(s) failed, e.g. {failures[0]}")
+
+    def _seed(self, count):
+        self._cleanup(quiet=True)
+        department, _ = Department.objects.get_or_create(name="Load Test")
+        course, _ = Course.objects.get_or_create(code="LOADTEST", defaults={"name": "Load Test", "department": department})
+        classgroup = ClassGroup.objects.create(name="LOADTEST", department=department, course=course)
+
+        # bulk_create skips the profile signal, so students are created explicitly.
+        users = []
+        for i in range(count):
+            user = CustomUser(
+                email=f"checkin{i}@{EMAIL_DOMAIN}", identity_card_number=f"LOADTEST-{i}",
+                full_name=f"Load Test {i}", short_name="Load", role=CustomUser.Role.STUDENT,
+            )
+            user.set_unusable_password()
+            users.append(user)
+        users = CustomUser.objects.bulk_create(users, batch_size=1000)
+        students = Student.objects.bulk_create([Student(user=u, class_group=classgroup) for u in users], batch_size=1000)
+        enrollments = Enrollment.objects.bulk_create([Enrollment(student=s, class_group=classgroup) for s in students], batch_size=1000)
+        counters.count_users(users)
+        counters.count_enrollments(enrollments)
+
+        # Pre-authenticated sessions, so the test measures check-in rather than login.
+        store, expires = SessionStore(), timezone.now() + timedelta(hours=2)
+        sessions = [
+            Session(
+                session_key=store._get_new_session_key(),
+                session_data=store.encode({
+                    SESSION_KEY: str(u.pk),
+                    BACKEND_SESSION_KEY: settings.AUTHENTICATION_BACKENDS[0],
+                    HASH_SESSION_KEY: u.get_session_auth_hash(),
+                }),
+                expire_date=expires,
+            )
+            for u in users
+        ]
+        Session.objects.bulk_create(sessions, batch_size=1000)
+        return classgroup, [s.session_key for s in sessions]
+
+    def _cleanup(self, quiet=False):
+        users = CustomUser.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}")
+        user_ids = {str(pk) for pk in users.values_list("pk", flat=True)}
+        if user_ids:
+            stale = [
+                s.session_key for s in Session.objects.iterator()
+                if s.get_decoded().get(SESSION_KEY) in user_ids
+            ]
+            Session.objects.filter(session_key__in=stale).delete()
+        deleted, _ = users.delete()
+        ClassGroup.objects.filter(name="LOADTEST", course__code="LOADTEST").delete()
+        if not quiet:
+            self.stdout.write(self.style.SUCCESS(f"Removed load-test data ({deleted} objects)."))
@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.models import AttendanceStreak, AttendanceSummary, Enrollment, Student
+
+
+def _in_worker(compute):
+    def run(ids):
+        try:
+            return compute(ids)
+        finally:
+            # Each worker thread opens its own connection; don't leak it.
+            connection.close()
+    return run
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild AttendanceSummary (per enrollment) and AttendanceStreak (per student) "
+        "rows from the Attendance table in parallel chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500, help="Rows per chunk (default 500).")
+        parser.add_argument("--workers", type=int, default=4, help="Parallel reader threads (default 4).")
+
+    def handle(self, *args, **options):
+        size = max(options["chunk_size"], 1)
+        workers = max(options["workers"], 1)
+
+        targets = [
+            ("attendance summaries", AttendanceSummary.objects, Enrollment.objects),
+            ("student streaks", AttendanceStreak.objects, Student.objects),
+        ]
+        for label, manager, source in targets:
+            ids = list(source.order_by("id").values_list("id", flat=True))
+            chunks = [ids[i:i + size] for i in range(0, len(ids), size)]
+
+            # Chunks are computed in parallel; writes stay on this thread so
+            # SQLite never sees concurrent writers.
+            written = 0
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for rows in pool.map(_in_worker(manager.compute), chunks):
+                    manager.upsert(rows)
+                    written += len(rows)
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt {written} {label} in {len(chunks)} chunk(s)."
+            ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-index every user and fee plan for list page search. Run after bulk writes "
+        "(bulk_create, queryset.update) that skip the save signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--index", choices=sorted(search.INDEXES), help="Rebuild only this index.")
+
+    def handle(self, *args, **options):
+        search.install()
+        indexed = search.rebuild(options["index"])
+        backend = search.backend().name
+        for index, rows in sorted(indexed.items()):
+            self.stdout.write(f"{index}: {rows} rows")
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt ({backend} backend)."))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the admin dashboard/list counters from the source tables and fix any "
+        "that drifted. Use --loop to keep reconciling every --interval seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep running and reconcile on an interval.")
+        parser.add_argument("--interval", type=float, default=3600.0, help="Seconds between runs with --loop (default 3600).")
+
+    def handle(self, *args, **options):
+        while True:
+            drift = counters.reconcile()
+            for key, (stored, actual) in sorted(drift.items()):
+                self.stdout.write(f"{key}: {stored} -> {actual}")
+            if drift or not options["loop"]:
+                self.stdout.write(self.style.SUCCESS(f"Reconciled counters: {len(drift)} corrected."))
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
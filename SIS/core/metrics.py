@@ -0,0 +1,239 @@
+# core/metrics.py
+"""
+Per-view request metrics: latency, SQL query count and SQL time.
+
+ViewMetricsMiddleware records sampled requests into in-process histograms
+keyed by URL name. Every VIEW_METRICS_FLUSH_SECONDS each worker upserts its
+cumulative histograms as ViewMetric rows keyed by (worker, url_name), so a
+flush never read-modify-writes another worker's numbers; merged() sums the
+rows across workers.
+
+Worker ids change on every restart, so each flush also folds the rows of
+workers that haven't written for VIEW_METRICS_RETIRE_SECONDS into one
+"retired" row per URL name. The table stays at (live workers + 1) rows per
+URL name. A worker that was only idle finds its rows gone on its next flush
+and starts counting from zero, as after reset(), so nothing is counted twice.
+
+Settings (all optional):
+    VIEW_METRICS_SAMPLE_RATE     fraction of requests recorded, 0 disables (default 1.0)
+    VIEW_METRICS_FLUSH_SECONDS   seconds between flushes per worker (default 30)
+    VIEW_METRICS_RETIRE_SECONDS  silence after which a worker's rows are folded in (default 3600)
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .models import ViewMetric
+
+logger = logging.getLogger(__name__)
+
+RETIRED = "retired"
+
+# Upper bounds; each histogram has one extra overflow bucket at the end.
+HISTOGRAMS = {
+    "latency_ms": (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    "queries": (0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+    "sql_ms": (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+}
+
+
+def _empty_series():
+    series = {"count": 0}
+    for name, bounds in HISTOGRAMS.items():
+        series[name] = [0] * (len(bounds) + 1)
+        series[f"{name}_sum"] = 0
+    return series
+
+
+def _add(series, data):
+    for key, value in data.items():
+        if key not in series:
+            continue
+        if isinstance(value, list):
+            series[key] = [a + b for a, b in zip(series[key], value)]
+        else:
+            series[key] += value
+    return series
+
+
+def _bucket(bounds, value):
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            return i
+    return len(bounds)
+
+
+def percentile(series, name, q):
+    """Upper bound of the bucket holding the q-quantile (None if it overflowed)."""
+    bounds, counts = HISTOGRAMS[name], series[name]
+    target, seen = q * sum(counts), 0
+    for i, count in enumerate(counts):
+        seen += count
+        if count and seen >= target:
+            return bounds[i] if i < len(bounds) else None
+    return 0
+
+
+class _Store:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Called again after a fork so workers don't inherit the parent's numbers.
+        self.pid = os.getpid()
+        self.worker = f"{socket.gethostname()}:{self.pid}:{uuid.uuid4().hex[:6]}"
+        self.series = {}
+        self.dirty = self.flushed = False
+        self.last_flush = time.monotonic()
+
+    def record(self, url_name, latency_ms, queries, sql_ms):
+        values = {"latency_ms": latency_ms, "queries": queries, "sql_ms": sql_ms}
+        with self.lock:
+            if self.pid != os.getpid():
+                self._reset()
+            series = self.series.setdefault(url_name, _empty_series())
+            series["count"] += 1
+            for name, value in values.items():
+                series[name][_bucket(HISTOGRAMS[name], value)] += 1
+                series[f"{name}_sum"] += value
+            self.dirty = True
+
+    def due(self):
+        interval = getattr(settings, "VIEW_METRICS_FLUSH_SECONDS", 30)
+        return self.dirty and time.monotonic() - self.last_flush >= interval
+
+    def flush(self):
+        if not self.dirty:
+            return 0
+        try:
+            with transaction.atomic():
+                # Locking read: a concurrent retire() either finishes first
+                # (and we start over) or waits for this upsert.
+                if self.flushed and not ViewMetric.objects.select_for_update().filter(worker=self.worker).exists():
+                    # Our rows were deleted by reset() or retired: start over.
+                    self.clear()
+                    return 0
+                with self.lock:
+                    rows = [
+                        ViewMetric(worker=self.worker, url_name=url_name,
+                                   data={k: list(v) if isinstance(v, list) else v for k, v in series.items()})
+                        for url_name, series in self.series.items()
+                    ]
+                    self.dirty, self.last_flush = False, time.monotonic()
+                ViewMetric.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=["worker", "url_name"],
+                    update_fields=["data", "updated_at"],
+                )
+                retire()
+        except DatabaseError:
+            logger.warning("Could not flush view metrics", exc_info=True)
+            self.dirty = True
+            return 0
+        self.flushed = True
+        return len(rows)
+
+    def clear(self):
+        with self.lock:
+            self.series = {}
+            self.dirty = self.flushed = False
+
+
+_store = _Store()
+record = _store.record
+flush = _store.flush
+
+
+def maybe_flush():
+    if _store.due():
+        _store.flush()
+
+
+def reset():
+    """Drop all recorded metrics, in this worker and in the database."""
+    _store.clear()
+    ViewMetric.objects.all().delete()
+
+
+def retire():
+    """Fold the rows of workers silent for VIEW_METRICS_RETIRE_SECONDS into the "retired" rows."""
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, "VIEW_METRICS_RETIRE_SECONDS", 3600))
+    with transaction.atomic():
+        stale = list(
+            ViewMetric.objects.select_for_update()
+            .filter(updated_at__lt=cutoff).exclude(worker=RETIRED)
+            .values_list("pk", "url_name", "data")
+        )
+        if not stale:
+            return 0
+        totals = {
+            url_name: _add(_empty_series(), data)
+            for url_name, data in ViewMetric.objects.select_for_update()
+            .filter(worker=RETIRED, url_name__in={row[1] for row in stale}).values_list("url_name", "data")
+        }
+        for _, url_name, data in stale:
+            _add(totals.setdefault(url_name, _empty_series()), data)
+        ViewMetric.objects.bulk_create(
+            [ViewMetric(worker=RETIRED, url_name=url_name, data=data) for url_name, data in totals.items()],
+            update_conflicts=True,
+            unique_fields=["worker", "url_name"],
+            update_fields=["data", "updated_at"],
+        )
+        ViewMetric.objects.filter(pk__in=[row[0] for row in stale]).delete()
+    return len(stale)
+
+
+def merged():
+    """{url_name: series} summed over every worker's latest snapshot."""
+    totals = {}
+    for url_name, data in ViewMetric.objects.values_list("url_name", "data"):
+        _add(totals.setdefault(url_name, _empty_series()), data)
+    return totals
+
+
+class _SqlTimer:
+    """connection.execute_wrapper hook counting queries and their wall time."""
+
+    def __init__(self):
+        self.count, self.seconds = 0, 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class ViewMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = getattr(settings, "VIEW_METRICS_SAMPLE_RATE", 1.0)
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        timer = _SqlTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        url_name = match.view_name if match else "<unresolved>"
+        record(url_name, elapsed * 1000, timer.count, timer.seconds * 1000)
+        maybe_flush()
+        return response
@@ -1,10 +1,11 @@
 # core/models.py
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.dispatch import Signal
 from django.utils import timezone
 from decimal import Decimal, ROUND_DOWN
 from django.core.validators import MinValueValidator, MaxValueValidator
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal, ROUND_HALF_UP
 
 # ---------- Department ----------
@@ -21,6 +22,9 @@ class Course(models.Model):
     department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='courses')
     description = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['name', 'id'], name='course_name_idx')]
+
     def __str__(self):
         return f"{self.name} ({self.code})"
 
@@ -99,7 +103,6 @@ class Student(models.Model):
     date_of_birth = models.DateField(blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     phone_number = models.CharField(max_length=20, blank=True, null=True)
-    latest_activity = models.DateTimeField(blank=True, null=True)
 
     # Emergency Contact
     emergency_name = models.CharField("Emergency Contact Name", max_length=255, blank=True)
@@ -124,9 +127,12 @@ class Student(models.Model):
             'emergency_phone': self.emergency_phone,
         }
 
-    def update_latest_activity(self):
-        self.latest_activity = timezone.now()
-        self.save(update_fields=['latest_activity'])
+    @property
+    def current_streak(self):
+        try:
+            return self.attendance_streak.current_streak
+        except AttendanceStreak.DoesNotExist:
+            return 0
 
 # ---------- Enrollment ----------
 class Enrollment(models.Model):
@@ -140,7 +146,58 @@ class Enrollment(models.Model):
     def __str__(self):
         return f"{self.student} in {self.class_group}"
 
+    @property
+    def summary(self):
+        """Attendance summary for this enrollment (an empty one if never marked)."""
+        try:
+            return self.attendance_summary
+        except AttendanceSummary.DoesNotExist:
+            return AttendanceSummary(enrollment=self)
+
 # ---------- Attendance ----------
+class AttendanceManager(models.Manager):
+    def record_sheet(self, marks):
+        """
+        Upsert a batch of unsaved Attendance instances in one transaction.
+        Rows that already exist for (enrollment, date, session) get their
+        status and description overwritten; if the same key appears twice
+        the last mark wins. Returns the number of rows written.
+        """
+        by_key = {}
+        for mark in marks:
+            by_key[(mark.enrollment_id, mark.date, mark.session)] = mark
+        if not by_key:
+            return 0
+
+        with transaction.atomic(using=self.db):
+            # Lock the enrollments first so two writers to the same keys (two
+            # lecturers, a sync replay and a live save) can't both read "no
+            # previous mark" and both apply it to the derived stores. SQLite
+            # ignores FOR UPDATE; its IMMEDIATE transactions serialise instead.
+            list(
+                Enrollment.objects.using(self.db).select_for_update()
+                .filter(pk__in={key[0] for key in by_key}).order_by('pk').values_list('pk', flat=True)
+            )
+            previous = {
+                (enrollment_id, day, session): status
+                for enrollment_id, day, session, status in self.filter(
+                    enrollment_id__in={key[0] for key in by_key},
+                    date__in={key[1] for key in by_key},
+                    session__in={key[2] for key in by_key},
+                ).values_list('enrollment_id', 'date', 'session', 'status')
+            }
+            self.bulk_create(
+                list(by_key.values()),
+                update_conflicts=True,
+                unique_fields=['enrollment', 'date', 'session'],
+                update_fields=['status', 'description'],
+            )
+            apply_attendance_changes(
+                [(*key, previous.get(key), mark.status) for key, mark in by_key.items()]
+            )
+        return len(by_key)
+
+
 class Attendance(models.Model):
     SESSION_CHOICES = [
         ('morning', 'Morning'),
@@ -158,12 +215,545 @@ class Attendance(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
     description = models.TextField(blank=True, null=True)
 
+    objects = AttendanceManager()
+
     class Meta:
         unique_together = ('enrollment', 'date', 'session')
 
     def __str__(self):
         return f"{self.enrollment.student} - {self.enrollment.class_group} - {self.date} [{self.session}] - {self.status.capitalize()}"
 
+# ---------- Attendance Summary ----------
+def attended_statuses():
+    """
+    Statuses that count towards an attendance streak: the attendance policy
+    (ATTENDANCE_ATTENDED_STATUSES). Stored streaks are counted under the
+    policy in force when they were written; run rebuild_attendance_summary
+    after changing it.
+    """
+    from .attendance import attended_statuses  # core.attendance imports this module
+    return attended_statuses()
+
+
+SESSION_ORDER = {'morning': 0, 'evening': 1}
+
+
+def _mark_position(day, session):
+    return (day, SESSION_ORDER.get(session, 0))
+
+
+class AttendanceStreakFields(models.Model):
+    """Last marked session and the run of attended sessions ending there."""
+    last_marked_date = models.DateField(blank=True, null=True)
+    last_marked_session = models.CharField(max_length=10, blank=True)
+    current_streak = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    def push(self, day, session, old, new):
+        """
+        Advance last-marked/streak for one change in O(1). Returns False when
+        the change can't be applied without looking at older history.
+
+        Several marks can share the latest session (one per class group); the
+        streak only counts that session if none of them is an absence.
+        """
+        last = (
+            _mark_position(self.last_marked_date, self.last_marked_session)
+            if self.last_marked_date else None
+        )
+        position = _mark_position(day, session)
+        attended = attended_statuses()
+        if old is None and new and (last is None or position > last):
+            self.last_marked_date, self.last_marked_session = day, session
+            self.current_streak = self.current_streak + 1 if new in attended else 0
+            return True
+        if old is None and new and position == last:
+            if new not in attended:
+                self.current_streak = 0
+            elif self.current_streak:
+                self.current_streak += 1
+            return True
+        if old and new and (old in attended) == (new in attended):
+            return True
+        if old and new and position == last and new not in attended:
+            self.current_streak = 0
+            return True
+        return False
+
+
+class AttendanceSummaryManager(models.Manager):
+    def compute(self, enrollment_ids):
+        """
+        Build unsaved summaries for the given enrollments from their full
+        attendance history (one query). Used to rebuild or repair rows.
+        """
+        summaries = {eid: self.model(enrollment_id=eid) for eid in enrollment_ids}
+        streak_open = set(summaries)
+        attended = attended_statuses()
+        rows = (
+            Attendance.objects
+            .filter(enrollment_id__in=summaries)
+            # newest first: within a day 'evening' sorts before 'morning'
+            .order_by('enrollment_id', '-date', 'session')
+            .values_list('enrollment_id', 'date', 'session', 'status')
+        )
+        for enrollment_id, day, session, status in rows.iterator():
+            summary = summaries[enrollment_id]
+            summary.adjust(status, 1)
+            if summary.last_marked_date is None:
+                summary.last_marked_date, summary.last_marked_session = day, session
+            if enrollment_id in streak_open:
+                if status in attended:
+                    summary.current_streak += 1
+                else:
+                    streak_open.discard(enrollment_id)
+        return list(summaries.values())
+
+    def upsert(self, summaries):
+        return self.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=['enrollment'],
+            update_fields=[
+                'present_count', 'absent_count', 'late_count', 'excused_count',
+                'last_marked_date', 'last_marked_session', 'current_streak', 'updated_at',
+            ],
+        )
+
+    def rebuild(self, enrollment_ids):
+        return self.upsert(self.compute(enrollment_ids))
+
+    def apply_changes(self, changes):
+        """
+        Fold attendance writes into the summaries incrementally. Each change
+        is (enrollment_id, date, session, old_status, new_status); old_status
+        is None for a new row and new_status is None for a deleted one.
+
+        A new mark after the latest one only bumps counters and the streak.
+        Edits or deletions that could move the streak or the last marked
+        session fall back to a recompute of that enrollment.
+        """
+        changes = sorted(
+            (c for c in changes if c[3] != c[4]),
+            key=lambda c: _mark_position(c[1], c[2]),
+        )
+        if not changes:
+            return
+
+        with transaction.atomic(using=self.db):
+            summaries = {
+                s.enrollment_id: s
+                for s in self.select_for_update().filter(enrollment_id__in={c[0] for c in changes})
+            }
+            stale = set()
+            for enrollment_id, day, session, old, new in changes:
+                summary = summaries.setdefault(enrollment_id, self.model(enrollment_id=enrollment_id))
+                if old:
+                    summary.adjust(old, -1)
+                if new:
+                    summary.adjust(new, 1)
+                if not summary.push(day, session, old, new):
+                    stale.add(enrollment_id)
+
+            if stale:
+                summaries.update((s.enrollment_id, s) for s in self.compute(stale))
+            self.upsert(list(summaries.values()))
+
+
+class AttendanceSummary(AttendanceStreakFields):
+    enrollment = models.OneToOneField(
+        Enrollment, on_delete=models.CASCADE, primary_key=True, related_name='attendance_summary'
+    )
+    present_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    late_count = models.PositiveIntegerField(default=0)
+    excused_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = AttendanceSummaryManager()
+
+    def __str__(self):
+        return f"{self.enrollment_id}: {self.present_count}/{self.total_count} present"
+
+    @property
+    def total_count(self):
+        return self.present_count + self.absent_count + self.late_count + self.excused_count
+
+    @property
+    def attended_count(self):
+        return sum(getattr(self, f"{status}_count") for status in attended_statuses())
+
+    def adjust(self, status, delta):
+        field = f"{status}_count"
+        if hasattr(self, field):
+            setattr(self, field, max(getattr(self, field) + delta, 0))
+
+
+# ---------- Student Attendance Streak ----------
+class AttendanceStreakManager(models.Manager):
+    def compute(self, student_ids):
+        """
+        Recompute streaks by walking each student's marks newest first. Only
+        the current run is read, so the cost is the streak length, not the
+        length of the student's history.
+        """
+        streaks = []
+        attended = attended_statuses()
+        for student_id in student_ids:
+            streak = self.model(student_id=student_id)
+            rows = (
+                Attendance.objects
+                .filter(enrollment__student_id=student_id)
+                # newest first: within a day 'evening' sorts before 'morning'
+                .order_by('-date', 'session')
+                .values_list('date', 'session', 'status')
+            )
+            group, group_count = None, 0
+            for day, session, status in rows.iterator(chunk_size=100):
+                if streak.last_marked_date is None:
+                    streak.last_marked_date, streak.last_marked_session = day, session
+                if (day, session) != group:
+                    streak.current_streak += group_count
+                    group, group_count = (day, session), 0
+                if status not in attended:
+                    group_count = None
+                    break
+                group_count += 1
+            if group_count:
+                streak.current_streak += group_count
+            streaks.append(streak)
+        return streaks
+
+    def upsert(self, streaks):
+        return self.bulk_create(
+            streaks,
+            update_conflicts=True,
+            unique_fields=['student'],
+            update_fields=['last_marked_date', 'last_marked_session', 'current_streak'],
+        )
+
+    def apply_changes(self, changes):
+        """Same contract as AttendanceSummaryManager.apply_changes, keyed by student."""
+        if not changes:
+            return
+        student_of = dict(
+            Enrollment.objects.filter(id__in={c[0] for c in changes}).values_list('id', 'student_id')
+        )
+        with transaction.atomic(using=self.db):
+            streaks = {
+                s.student_id: s
+                for s in self.select_for_update().filter(student_id__in=set(student_of.values()))
+            }
+            stale = set()
+            for enrollment_id, day, session, old, new in sorted(
+                changes, key=lambda c: _mark_position(c[1], c[2])
+            ):
+                student_id = student_of.get(enrollment_id)
+                if student_id is None:
+                    continue
+                streak = streaks.setdefault(student_id, self.model(student_id=student_id))
+                if not streak.push(day, session, old, new):
+                    stale.add(student_id)
+
+            if stale:
+                streaks.update((s.student_id, s) for s in self.compute(stale))
+            self.upsert(list(streaks.values()))
+
+
+class AttendanceStreak(AttendanceStreakFields):
+    """A student's attendance streak across all of their class groups."""
+    student = models.OneToOneField(
+        Student, on_delete=models.CASCADE, primary_key=True, related_name='attendance_streak'
+    )
+
+    objects = AttendanceStreakManager()
+
+    def __str__(self):
+        return f"{self.student_id}: {self.current_streak}"
+
+# ---------- Attendance Bitmap ----------
+class AttendanceBitmapManager(models.Manager):
+    def compute(self, enrollment_ids):
+        """Build unsaved bitmaps for the given enrollments from the Attendance table."""
+        bitmaps = {}
+        rows = (
+            Attendance.objects
+            .filter(enrollment_id__in=list(enrollment_ids))
+            .values_list('enrollment_id', 'date', 'session', 'status')
+        )
+        for enrollment_id, day, session, status in rows.iterator():
+            bitmap = bitmaps.get((enrollment_id, day.year))
+            if bitmap is None:
+                bitmap = bitmaps[(enrollment_id, day.year)] = self.model(
+                    enrollment_id=enrollment_id, year=day.year
+                )
+            bitmap.set_status(day, session, status)
+        return bitmaps
+
+    def upsert(self, bitmaps):
+        # Fresh instances so conflicts resolve on (enrollment, year), not on the pk.
+        return self.bulk_create(
+            [self.model(enrollment_id=b.enrollment_id, year=b.year, bits=bytes(b.bits)) for b in bitmaps],
+            update_conflicts=True,
+            unique_fields=['enrollment', 'year'],
+            update_fields=['bits'],
+        )
+
+    def apply_changes(self, changes):
+        """Patch the bitmaps for (enrollment_id, date, session, old_status, new_status) changes."""
+        keys = {(c[0], c[1].year) for c in changes}
+        if not keys:
+            return
+        with transaction.atomic(using=self.db):
+            bitmaps = {
+                (b.enrollment_id, b.year): b
+                for b in self.select_for_update().filter(
+                    enrollment_id__in={k[0] for k in keys}, year__in={k[1] for k in keys}
+                )
+                if (b.enrollment_id, b.year) in keys
+            }
+            for enrollment_id, day, session, old, new in changes:
+                bitmap = bitmaps.setdefault(
+                    (enrollment_id, day.year), self.model(enrollment_id=enrollment_id, year=day.year)
+                )
+                bitmap.set_status(day, session, new)
+            self.upsert(bitmaps.values())
+
+    def verify(self, enrollment_ids):
+        """
+        Compare stored bitmaps with the Attendance rows for the given
+        enrollments. Returns the rebuilt bitmaps that differ from storage.
+        """
+        enrollment_ids = list(enrollment_ids)
+        expected = self.compute(enrollment_ids)
+        stored = {(b.enrollment_id, b.year): b for b in self.filter(enrollment_id__in=enrollment_ids)}
+        mismatched = []
+        for key in expected.keys() | stored.keys():
+            want = expected.get(key) or self.model(enrollment_id=key[0], year=key[1])
+            have = stored.get(key)
+            if have is None or bytes(have.bits) != bytes(want.bits):
+                mismatched.append(want)
+        return mismatched
+
+
+class AttendanceBitmap(models.Model):
+    """
+    Compact copy of one enrollment's attendance for one year: four bits
+    per session per day, indexed by day of year. The codes are 0 = not
+    marked, 1 = present, 2 = absent, 3 = late, 4 = excused.
+
+    Rows are keyed by calendar year rather than academic year: the tree has
+    no academic-year model to hang a term boundary on, and day-of-year
+    slots need a fixed January 1 origin.
+    """
+    STATUS_CODES = {'present': 1, 'absent': 2, 'late': 3, 'excused': 4}
+    CODE_STATUSES = {code: status for status, code in STATUS_CODES.items()}
+    SIZE = 366 * 2 * 4 // 8
+
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, related_name='attendance_bitmaps')
+    year = models.PositiveIntegerField()
+    bits = models.BinaryField(default=bytes(SIZE))
+
+    objects = AttendanceBitmapManager()
+
+    class Meta:
+        unique_together = ('enrollment', 'year')
+
+    def __str__(self):
+        return f"{self.enrollment_id} / {self.year}"
+
+    @staticmethod
+    def _slot(day, session):
+        return (day.timetuple().tm_yday - 1) * 2 + SESSION_ORDER.get(session, 0)
+
+    def _code(self, slot):
+        return (self.bits[slot // 2] >> (slot % 2) * 4) & 0b1111
+
+    def get_status(self, day, session):
+        return self.CODE_STATUSES.get(self._code(self._slot(day, session)))
+
+    def set_status(self, day, session, status):
+        """Set (or with status=None clear) one session's mark."""
+        bits = bytearray(self.bits)
+        slot = self._slot(day, session)
+        shift = (slot % 2) * 4
+        bits[slot // 2] = (bits[slot // 2] & ~(0b1111 << shift)) | (self.STATUS_CODES.get(status, 0) << shift)
+        self.bits = bits
+
+    def marks(self, newest_first=False):
+        """Yield (date, session, status) for every marked session, in date order."""
+        sessions = sorted(SESSION_ORDER, key=SESSION_ORDER.get)
+        jan1 = date(self.year, 1, 1)
+        slots = range(len(self.bits) * 2)
+        for slot in (reversed(slots) if newest_first else slots):
+            code = self._code(slot)
+            if code:
+                yield jan1 + timedelta(days=slot // 2), sessions[slot % 2], self.CODE_STATUSES[code]
+
+    @staticmethod
+    def streak(bitmaps):
+        """Consecutive attended sessions ending at the latest mark across the given bitmaps."""
+        streak = 0
+        attended = attended_statuses()
+        for bitmap in sorted(bitmaps, key=lambda b: b.year, reverse=True):
+            for _day, _session, status in bitmap.marks(newest_first=True):
+                if status not in attended:
+                    return streak
+                streak += 1
+        return streak
+
+
+# Sent with enrollment_ids={...} after every attendance write, bulk or single.
+attendance_changed = Signal()
+
+
+def apply_attendance_changes(changes):
+    """
+    Fold attendance writes into the derived stores (summaries, streaks, bitmaps).
+    ``changes`` holds (enrollment_id, date, session, old_status, new_status).
+    """
+    changes = [c for c in changes if c[3] != c[4]]
+    if changes:
+        AttendanceSummary.objects.apply_changes(changes)
+        AttendanceStreak.objects.apply_changes(changes)
+        AttendanceBitmap.objects.apply_changes(changes)
+        attendance_changed.send(sender=Attendance, enrollment_ids={c[0] for c in changes})
+
+# ---------- Attendance Check-in ----------
+class AttendanceCheckInManager(models.Manager):
+    def flush(self, limit=2000, classgroups=None):
+        """
+        Drain up to ``limit`` pending check-ins (only those for
+        ``classgroups``, if given) into Attendance with one record_sheet()
+        upsert. Repeated check-ins for the same (enrollment, date, session)
+        collapse into one mark, and keys that already have a mark (e.g. set
+        by the lecturer) are left alone. Returns the number of check-ins
+        drained, so 0 means nothing was left that this call could take.
+
+        Concurrent flushes (several workers, the flush_attendance_checkins
+        job) don't collide: the pending rows are locked in the database and
+        skipped by the others; SQLite's IMMEDIATE transactions run them one
+        at a time.
+        """
+        staged = self.all() if classgroups is None else self.filter(enrollment__class_group__in=classgroups)
+        with transaction.atomic(using=self.db):
+            pending = list(
+                staged.select_for_update(skip_locked=True)
+                .order_by('id')
+                .values_list('id', 'enrollment_id', 'date', 'session')[:limit]
+            )
+            if not pending:
+                return 0
+            keys = {(enrollment_id, day, session) for _, enrollment_id, day, session in pending}
+            existing = set(Attendance.objects.filter(
+                enrollment_id__in={key[0] for key in keys},
+                date__in={key[1] for key in keys},
+                session__in={key[2] for key in keys},
+            ).values_list('enrollment_id', 'date', 'session'))
+            Attendance.objects.record_sheet(
+                Attendance(enrollment_id=enrollment_id, date=day, session=session,
+                           status='present', description='Self check-in')
+                for enrollment_id, day, session in sorted(keys - existing)
+            )
+            self.filter(id__in=[row[0] for row in pending]).delete()
+        return len(pending)
+
+
+class AttendanceCheckIn(models.Model):
+    """Append-only staging row for student self check-ins; see AttendanceCheckInManager.flush()."""
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, related_name='check_ins')
+    date = models.DateField()
+    session = models.CharField(max_length=10, choices=Attendance.SESSION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = AttendanceCheckInManager()
+
+    def __str__(self):
+        return f"{self.enrollment} - {self.date} [{self.session}] check-in"
+
+# ---------- Attendance Sync ----------
+class AttendanceSyncOpManager(models.Manager):
+    def _parse(self, op):
+        """(op_id, unsaved Attendance or None, error or None) for one client op."""
+        if not isinstance(op, dict):
+            return None, None, 'Operation must be an object.'
+        op_id = op.get('id')
+        if not isinstance(op_id, str) or not 0 < len(op_id) <= 64:
+            return None, None, 'Missing or invalid operation id.'
+        try:
+            day = date.fromisoformat(op.get('date') or '')
+            enrollment_id = int(op.get('enrollment'))
+        except (TypeError, ValueError):
+            return op_id, None, 'Invalid date or enrollment.'
+        if day > timezone.localdate():
+            return op_id, None, 'Date is in the future.'
+        if op.get('session') not in dict(Attendance.SESSION_CHOICES):
+            return op_id, None, 'Invalid session.'
+        if op.get('status') not in dict(Attendance.STATUS_CHOICES):
+            return op_id, None, 'Invalid status.'
+        return op_id, Attendance(
+            enrollment_id=enrollment_id, date=day, session=op['session'],
+            status=op['status'], description=str(op.get('remarks') or ''),
+        ), None
+
+    def apply_batch(self, lecturer, ops):
+        """
+        Apply a batch of client attendance ops for ``lecturer`` in one
+        transaction and one record_sheet() upsert. Each op is
+        {"id", "enrollment", "date", "session", "status", "remarks"}; op ids
+        that were already applied are reported as duplicates and not
+        re-written, so clients can retry a whole batch safely.
+        Returns one {"id", "result", "error"?} dict per op, in order.
+        """
+        parsed = [self._parse(op) for op in ops]
+        allowed = set(Enrollment.objects.filter(
+            id__in={mark.enrollment_id for _, mark, _ in parsed if mark},
+            class_group__lecturers=lecturer,
+        ).values_list('id', flat=True))
+
+        results, marks, fresh = [], [], []
+        with transaction.atomic(using=self.db):
+            seen = set(self.filter(
+                lecturer=lecturer, op_id__in={op_id for op_id, _, _ in parsed if op_id},
+            ).values_list('op_id', flat=True))
+            for op_id, mark, error in parsed:
+                if not error and mark.enrollment_id not in allowed:
+                    error = 'Enrollment not found in your classes.'
+                if error:
+                    results.append({'id': op_id, 'result': 'rejected', 'error': error})
+                elif op_id in seen:
+                    results.append({'id': op_id, 'result': 'duplicate'})
+                else:
+                    seen.add(op_id)
+                    fresh.append(op_id)
+                    marks.append(mark)
+                    results.append({'id': op_id, 'result': 'applied'})
+            Attendance.objects.record_sheet(marks)
+            # A concurrent retry of the same batch may have logged these ids
+            # first; its writes were the same upserts, so ignore the conflict.
+            self.bulk_create(
+                [self.model(lecturer=lecturer, op_id=op_id) for op_id in fresh],
+                ignore_conflicts=True,
+            )
+        return results
+
+
+class AttendanceSyncOp(models.Model):
+    """Client operation ids already applied through the lecturer sync API."""
+    lecturer = models.ForeignKey(Lecturer, on_delete=models.CASCADE, related_name='sync_ops')
+    op_id = models.CharField(max_length=64)
+    applied_at = models.DateTimeField(auto_now_add=True)
+
+    objects = AttendanceSyncOpManager()
+
+    class Meta:
+        unique_together = ('lecturer', 'op_id')
+
+    def __str__(self):
+        return f"{self.lecturer} - {self.op_id}"
+
 # ---------- Student Achievement ----------
 class StudentAchievement(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='achievements')
@@ -200,6 +790,9 @@ class StudentFeePlan(models.Model):
     status = models.CharField(max_length=12, choices=Status.choices, default=Status.DRAFT)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['created_at', 'id'], name='feeplan_created_idx')]
+
     def __str__(self):
         return f"{self.student.user.get_full_name()} – {self.total_amount} over {self.months} mo"
 
@@ -253,4 +846,104 @@ class StudentFeeInstallment(models.Model):
 
     def __str__(self):
         status = "Paid" if self.is_paid else "Unpaid"
-        return f"{self.plan} – #{self.sequence_no} ({self.amount}) [{status}]"
\ No newline at end of file
+        return f"{self.plan} – #{self.sequence_no} ({self.amount}) [{status}]"
+
+
+# ---------- View Metrics ----------
+class ViewMetric(models.Model):
+    """One worker's cumulative request histograms for one URL name (see core.metrics)."""
+    worker = models.CharField(max_length=100)
+    url_name = models.CharField(max_length=200)
+    data = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('worker', 'url_name')
+
+    def __str__(self):
+        return f"{self.url_name} @ {self.worker}"
+
+
+# ---------- Counters ----------
+class CounterManager(models.Manager):
+    def adjust(self, deltas):
+        """Add {key: delta} to the counters, creating missing rows at zero."""
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        by_delta = {}
+        for key, delta in deltas.items():
+            by_delta.setdefault(delta, []).append(key)
+        with transaction.atomic():
+            self.bulk_create([Counter(key=key) for key in deltas], ignore_conflicts=True)
+            for delta, keys in by_delta.items():
+                self.filter(key__in=keys).update(value=models.F('value') + delta)
+
+    def get_many(self, keys):
+        """{key: value} for the given keys; missing counters read as 0."""
+        keys = list(keys)
+        found = dict(self.filter(key__in=keys).values_list('key', 'value'))
+        return {key: found.get(key, 0) for key in keys}
+
+
+class Counter(models.Model):
+    """A denormalised row count, e.g. 'users:STUDENT' (see core.counters)."""
+    key = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    objects = CounterManager()
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+class VersionStamp(models.Model):
+    """A stamp for data processes hold in memory, e.g. 'typeahead' (see core.versions)."""
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+# ---------- Search index (SQLite FTS5 tables; see core.search) ----------
+class SearchDocumentField(models.TextField):
+    """An FTS5 table's hidden column named after the table; `__match` runs a full-text query."""
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", (*lhs_params, *rhs_params)
+
+
+class UserSearchEntry(models.Model):
+    """Read side of core_search_users; rowid is the user's id and `rank` its bm25 score."""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, primary_key=True, db_column='rowid', db_constraint=False,
+        on_delete=models.DO_NOTHING, related_name='search_entry',
+    )
+    document = SearchDocumentField(db_column='core_search_users')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'core_search_users'
+
+
+class FeePlanSearchEntry(models.Model):
+    """Read side of core_search_fee_plans; rowid is the fee plan's id."""
+    plan = models.OneToOneField(
+        StudentFeePlan, primary_key=True, db_column='rowid', db_constraint=False,
+        on_delete=models.DO_NOTHING, related_name='search_entry',
+    )
+    document = SearchDocumentField(db_column='core_search_fee_plans')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'core_search_fee_plans'
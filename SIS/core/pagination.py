@@ -0,0 +1,142 @@
+# core/pagination.py
+"""
+Keyset (seek) pagination for long admin lists.
+
+Pages are addressed by the sort key of a neighbouring row instead of an
+offset. Each page is one query ordered by the keys and filtered past the
+cursor, so fetching page 500 costs the same as page 1 and no COUNT(*) is
+run. Keys must be non-null and end in a unique column (normally "pk"),
+e.g. ("full_name", "pk") or ("-created_at", "-pk"); an index on them
+makes each page an index range scan.
+
+    page = KeysetPaginator(queryset, ("full_name", "pk"), per_page=50).page(request.GET)
+
+The cursor travels in ?after= / ?before=; page.next_query and
+page.previous_query rebuild the current querystring with only the cursor
+swapped, so search and filter parameters keep working.
+"""
+import base64
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, object_list, params, has_next, has_previous, next_cursor, previous_cursor, start_index):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.start_index = start_index  # 1-based position of the first row
+        self._params = params
+
+    @property
+    def end_index(self):
+        return self.start_index + len(self.object_list) - 1
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def _query(self, name, cursor):
+        params = self._params.copy()
+        params.pop("after", None)
+        params.pop("before", None)
+        params[name] = cursor
+        return "?" + params.urlencode()
+
+    @property
+    def next_query(self):
+        return self._query("after", self.next_cursor) if self.has_next else None
+
+    @property
+    def previous_query(self):
+        return self._query("before", self.previous_cursor) if self.has_previous else None
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, keys, per_page=50):
+        self.queryset = queryset
+        self.keys = [(key.lstrip("-"), key.startswith("-")) for key in keys]
+        self.per_page = per_page
+
+    def _field(self, path):
+        if path in self.queryset.query.annotations:
+            return self.queryset.query.annotations[path].output_field
+        model, field = self.queryset.model, None
+        for part in path.split("__"):
+            field = model._meta.pk if part == "pk" else model._meta.get_field(part)
+            model = field.related_model or model
+        return field
+
+    def _encode(self, obj, position):
+        values = [getattr(obj, f"_keyset_{i}") for i in range(len(self.keys))]
+        raw = json.dumps({"k": values, "n": position}, cls=DjangoJSONEncoder).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def _decode(self, cursor):
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            values = [self._field(path).to_python(v) for (path, _), v in zip(self.keys, data["k"], strict=True)]
+            return values, int(data["n"])
+        except (ValueError, TypeError, KeyError) as exc:
+            raise InvalidCursor(cursor) from exc
+
+    def _seek(self, values, forward):
+        """Rows after (forward) or before the given key values in list order."""
+        condition = Q()
+        for i, ((path, descending), value) in enumerate(zip(self.keys, values)):
+            step = Q(**{f"{path}__{'lt' if descending == forward else 'gt'}": value})
+            for prior_path, prior_value in zip([p for p, _ in self.keys[:i]], values[:i]):
+                step &= Q(**{prior_path: prior_value})
+            condition |= step
+        return condition
+
+    def _ordered(self, forward):
+        return [
+            F(path).desc() if descending == forward else F(path).asc()
+            for path, descending in self.keys
+        ]
+
+    def page(self, params):
+        """The page addressed by params["after"] / params["before"] (a QueryDict)."""
+        after, before = params.get("after"), params.get("before")
+        forward = not before
+        qs = self.queryset.annotate(**{f"_keyset_{i}": F(path) for i, (path, _) in enumerate(self.keys)})
+        position = 0
+        try:
+            if after or before:
+                values, position = self._decode(after or before)
+                qs = qs.filter(self._seek(values, forward))
+        except InvalidCursor:
+            after = before = None
+            forward = True
+
+        rows = list(qs.order_by(*self._ordered(forward))[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if forward:
+            start = position + 1 if after else 1
+            has_next, has_previous = more, bool(after)
+        else:
+            rows.reverse()
+            start = max(position - len(rows), 1)
+            has_next, has_previous = True, more
+
+        return KeysetPage(
+            rows,
+            params,
+            has_next=has_next and bool(rows),
+            has_previous=has_previous and bool(rows),
+            next_cursor=self._encode(rows[-1], start + len(rows) - 1) if rows else None,
+            previous_cursor=self._encode(rows[0], start) if rows else None,
+            start_index=start,
+        )
@@ -0,0 +1,114 @@
+# core/refdata.py
+"""
+Reference data held in process memory: departments, courses, subjects and
+class groups, for form choices and filter dropdowns.
+
+    rows("departments")        every department, in pk order
+    get("classgroups", pk)     one class group, or None
+
+Class groups come with their course and department, courses with their
+department, subjects with their course, so labels render without queries.
+Callers get copies and may set attributes on them freely.
+
+Each table has a version stamp in core.versions, shared by every process
+through the database. core.signals bumps it, in the writing transaction, on
+writes to the table or to a table its rows carry, e.g. a renamed course
+bumps courses, subjects and classgroups. A read compares the stamp with the
+one its copy was loaded under and reloads on mismatch. Stamps are checked
+at most every VERSION_STAMP_SECONDS per process, so the steady state is no
+query per read and other processes catch up within that time; validating
+a submitted choice always checks the stamp first.
+
+ReferenceChoiceField is a ModelChoiceField that draws its choices and
+validates its input from here. It also works as a ModelForm field_classes
+entry. Assigning a different queryset is not supported; use a plain
+ModelChoiceField for per-user choices.
+"""
+import copy
+
+from django import forms
+from django.core.exceptions import ValidationError
+
+from . import versions
+from .models import ClassGroup, Course, Department, Subject
+
+TABLES = {
+    "departments": lambda: Department.objects.order_by("pk"),
+    "courses": lambda: Course.objects.select_related("department").order_by("pk"),
+    "subjects": lambda: Subject.objects.select_related("course").order_by("pk"),
+    "classgroups": lambda: ClassGroup.objects.select_related("course", "department").order_by("pk"),
+}
+# Tables whose rows show (or carry) each model.
+AFFECTED = {
+    Department: ("departments", "courses", "classgroups"),
+    Course: ("courses", "subjects", "classgroups"),
+    Subject: ("subjects",),
+    ClassGroup: ("classgroups",),
+}
+MODEL_TABLES = {Department: "departments", Course: "courses", Subject: "subjects", ClassGroup: "classgroups"}
+
+_loaded = {}  # table -> (version, rows, {str(pk): row})
+
+
+def _name(table):
+    return f"refdata:{table}"
+
+
+def version(table, fresh=False):
+    return versions.get(_name(table), fresh)
+
+
+def bump(tables):
+    """Have every process reload these tables on next read, once the transaction commits."""
+    versions.bump([_name(table) for table in tables])
+
+
+def _load(table, fresh=False):
+    current = version(table, fresh)
+    loaded = _loaded.get(table)
+    if loaded is None or loaded[0] != current:
+        rows = list(TABLES[table]())
+        loaded = _loaded[table] = (current, rows, {str(row.pk): row for row in rows})
+    return loaded
+
+
+def rows(table):
+    return [copy.copy(row) for row in _load(table)[1]]
+
+
+def get(table, pk, fresh=False):
+    row = _load(table, fresh)[2].get(str(pk))
+    return copy.copy(row) if row is not None else None
+
+
+class ReferenceChoiceIterator(forms.models.ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for row in rows(self.field.table):
+            yield self.choice(row)
+
+    def __len__(self):
+        return len(_load(self.field.table)[1]) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(_load(self.field.table)[1])
+
+
+class ReferenceChoiceField(forms.ModelChoiceField):
+    iterator = ReferenceChoiceIterator
+
+    def __init__(self, queryset, **kwargs):
+        super().__init__(queryset, **kwargs)
+        self.table = MODEL_TABLES[queryset.model]
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        # Submitted data: don't accept a row another process just deleted.
+        row = get(self.table, value.pk if isinstance(value, self.queryset.model) else value, fresh=True)
+        if row is None:
+            raise ValidationError(
+                self.error_messages["invalid_choice"], code="invalid_choice", params={"value": value},
+            )
+        return row
@@ -0,0 +1,209 @@
+# core/search.py
+"""
+Ranked search for the admin and lecturer list pages.
+
+Two indexes are searched:
+
+    users       CustomUser full_name, short_name, email
+    fee_plans   StudentFeePlan student name and email, description
+
+search(queryset, index, query, path="") filters a queryset to the matches
+and annotates search_rank (higher is better). `path` leads from the
+queryset's model to the indexed one, e.g. "user" for Lecturer or
+"student__user" for Enrollment. Matching is case-insensitive substring
+matching, as with the icontains filters it replaces.
+
+The backend follows the database (SEARCH_BACKEND = "auto"), or is forced
+with "fts5", "trigram" or "like":
+
+    fts5     SQLite FTS5 tables with the trigram tokenizer, ranked by bm25.
+             Kept current by core.signals on single-row saves and deletes;
+             bulk paths call rebuild() (or the rebuild_search_index command).
+             The table is joined in through the unmanaged *SearchEntry
+             models. Queries under three characters, which trigrams can't
+             match, fall back to a LIKE scan.
+    trigram  Postgres pg_trgm GIN indexes on the searched columns, which
+             the ILIKE filters use; ranked by word similarity.
+    like     icontains filters and no ranking; the fallback elsewhere.
+
+install() creates the tables or indexes after migrate (core.apps).
+"""
+import sqlite3
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, IntegerField, Q, Value
+from django.db.models.functions import Greatest
+
+from accounts.models import CustomUser
+
+from .models import StudentFeePlan
+
+INDEXES = {
+    "users": (CustomUser, ("full_name", "short_name", "email")),
+    "fee_plans": (StudentFeePlan, ("student__user__full_name", "student__user__email", "description")),
+}
+
+
+def _table(index):
+    return f"core_search_{index}"
+
+
+def _prefixed(path, field):
+    return f"{path}__{field}" if path else field
+
+
+class LikeBackend:
+    name = "like"
+
+    def install(self):
+        pass
+
+    def update(self, index, pks):
+        pass
+
+    def delete(self, index, pks):
+        pass
+
+    def rebuild(self, index):
+        return 0
+
+    def _contains(self, index, query, path):
+        condition = Q()
+        for field in INDEXES[index][1]:
+            condition |= Q(**{f"{_prefixed(path, field)}__icontains": query})
+        return condition
+
+    def search(self, queryset, index, query, path=""):
+        return queryset.filter(self._contains(index, query, path)).annotate(
+            search_rank=Value(0, output_field=IntegerField())
+        )
+
+
+class FTS5Backend(LikeBackend):
+    name = "fts5"
+
+    def install(self):
+        with connection.cursor() as cursor:
+            for index, (_, fields) in INDEXES.items():
+                columns = ", ".join(f"c{i}" for i in range(len(fields)))
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {_table(index)} USING fts5({columns}, tokenize='trigram')"
+                )
+
+    def delete(self, index, pks):
+        pks = list(pks)
+        if pks:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {_table(index)} WHERE rowid IN ({', '.join(['%s'] * len(pks))})", pks
+                )
+
+    def _insert(self, index, rows):
+        columns = ", ".join(f"c{i}" for i in range(len(INDEXES[index][1])))
+        placeholders = ", ".join(["%s"] * (len(INDEXES[index][1]) + 1))
+        rows, written = iter(rows), 0
+        with connection.cursor() as cursor:
+            while batch := list(islice(rows, 2000)):
+                cursor.executemany(
+                    f"INSERT INTO {_table(index)} (rowid, {columns}) VALUES ({placeholders})",
+                    [[value or "" for value in row] for row in batch],
+                )
+                written += len(batch)
+        return written
+
+    def update(self, index, pks):
+        pks = list(pks)
+        model, fields = INDEXES[index]
+        self.delete(index, pks)
+        self._insert(index, model.objects.filter(pk__in=pks).values_list("pk", *fields))
+
+    def rebuild(self, index):
+        model, fields = INDEXES[index]
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {_table(index)}")
+        rows = model.objects.order_by("pk").values_list("pk", *fields)
+        return self._insert(index, rows.iterator(chunk_size=2000))
+
+    def search(self, queryset, index, query, path=""):
+        if len(query) < 3:
+            return super().search(queryset, index, query, path)
+        # One quoted phrase: a substring match under the trigram tokenizer.
+        phrase = '"' + query.replace('"', '""') + '"'
+        entry = _prefixed(path, "search_entry")
+        return queryset.filter(**{f"{entry}__document__match": phrase}).annotate(
+            search_rank=-F(f"{entry}__rank")  # FTS5 rank is bm25 negated: lower is better
+        )
+
+
+class TrigramBackend(LikeBackend):
+    name = "trigram"
+
+    def install(self):
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for model, columns in ((CustomUser, INDEXES["users"][1]), (StudentFeePlan, ("description",))):
+                table = model._meta.db_table
+                for column in columns:
+                    # Matches the UPPER(col::text) LIKE UPPER(%s) that icontains compiles to.
+                    cursor.execute(
+                        f'CREATE INDEX IF NOT EXISTS {table}_{column}_trgm '
+                        f'ON {table} USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+                    )
+
+    def search(self, queryset, index, query, path=""):
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        similarities = [TrigramWordSimilarity(query, _prefixed(path, field)) for field in INDEXES[index][1]]
+        return queryset.filter(self._contains(index, query, path)).annotate(search_rank=Greatest(*similarities))
+
+
+BACKENDS = {backend.name: backend for backend in (LikeBackend, FTS5Backend, TrigramBackend)}
+
+
+@lru_cache(maxsize=1)
+def _fts5_available():
+    try:
+        db = sqlite3.connect(":memory:")
+        db.execute("CREATE VIRTUAL TABLE probe USING fts5(c, tokenize='trigram')")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def backend():
+    name = getattr(settings, "SEARCH_BACKEND", "auto")
+    if name == "auto":
+        if connection.vendor == "sqlite" and _fts5_available():
+            name = "fts5"
+        elif connection.vendor == "postgresql":
+            name = "trigram"
+        else:
+            name = "like"
+    return BACKENDS[name]()
+
+
+def search(queryset, index, query, path=""):
+    """Matches for `query` in `index`, annotated with search_rank (higher is better)."""
+    return backend().search(queryset, index, query, path)
+
+
+def install():
+    backend().install()
+
+
+def update(index, pks):
+    """Re-index these rows of `index` (no-op unless the backend keeps its own tables)."""
+    backend().update(index, pks)
+
+
+def delete(index, pks):
+    backend().delete(index, pks)
+
+
+def rebuild(index=None):
+    """Re-index every row; returns {index: rows indexed}."""
+    current = backend()
+    return {name: current.rebuild(name) for name in ([index] if index else INDEXES)}
@@ -1,9 +1,14 @@
-from django.db.models.signals import post_save
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.conf import settings
 from django.contrib.auth.signals import user_logged_in
 from django.utils import timezone
-from .models import Student, Lecturer
+from . import activity, catalog, counters, refdata, search, typeahead
+from .models import (
+    Student, Lecturer, Attendance, ClassGroup, Course, Department, Enrollment, StudentFeePlan, Subject,
+    apply_attendance_changes,
+)
 from accounts.models import CustomUser  # Adjust import if needed
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -27,11 +32,293 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
 @receiver(user_logged_in)
 def update_latest_activity(sender, request, user, **kwargs):
     """
-    Update the latest_activity timestamp for Student on user login.
+    Note the login as activity; core.activity writes it in its next bulk flush.
     """
-    try:
-        student = Student.objects.get(user=user)
-        student.latest_activity = timezone.now()
-        student.save(update_fields=['latest_activity'])
-    except Student.DoesNotExist:
-        pass
+    activity.touch(user)
+
+
+# ---------- Attendance summary/bitmap upkeep (single-row writes) ----------
+# Bulk writes go through Attendance.objects.record_sheet, which updates the
+# derived stores itself; these receivers cover admin edits and ad-hoc saves.
+
+@receiver(pre_save, sender=Attendance)
+def remember_previous_attendance(sender, instance, raw=False, **kwargs):
+    instance._summary_previous = None
+    if instance.pk and not raw:
+        instance._summary_previous = (
+            Attendance.objects.filter(pk=instance.pk)
+            .values_list('enrollment_id', 'date', 'session', 'status')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Attendance)
+def update_summary_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    new_key = (instance.enrollment_id, instance.date, instance.session)
+    previous = getattr(instance, '_summary_previous', None)
+    if previous and tuple(previous[:3]) != new_key:
+        changes = [(*previous, None), (*new_key, None, instance.status)]
+    else:
+        changes = [(*new_key, previous[3] if previous else None, instance.status)]
+    apply_attendance_changes(changes)
+
+
+@receiver(post_delete, sender=Attendance)
+def update_summary_on_delete(sender, instance, origin=None, **kwargs):
+    # Cascades from Enrollment/Student deletes take the summary with them.
+    if not (isinstance(origin, Attendance) or (isinstance(origin, QuerySet) and origin.model is Attendance)):
+        return
+    apply_attendance_changes(
+        [(instance.enrollment_id, instance.date, instance.session, instance.status, None)]
+    )
+
+
+# ---------- Counter upkeep (single-row writes) ----------
+# Bulk paths call core.counters.count_users()/count_enrollments() directly;
+# the reconcile_counters command repairs anything that bypassed both.
+
+def _previous(sender, instance, fields, raw, update_fields):
+    if raw or not instance.pk:
+        return None
+    if update_fields is not None and not set(fields) & set(update_fields):
+        return ()  # unchanged
+    return sender._default_manager.filter(pk=instance.pk).values_list(*fields).first()
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def remember_user_counter_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    previous = _previous(sender, instance, ('role', 'department'), raw, update_fields)
+    instance._counter_keys = counters.user_keys(*previous) if previous else previous
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def count_user_on_save(sender, instance, created, raw=False, **kwargs):
+    old = getattr(instance, '_counter_keys', None)
+    if raw or old == ():
+        return
+    counters.shift(old or [], counters.user_keys(instance.role, instance.department_id))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def count_user_on_delete(sender, instance, **kwargs):
+    counters.shift(counters.user_keys(instance.role, instance.department_id), [])
+
+
+@receiver(pre_save, sender=Lecturer)
+def remember_lecturer_counter_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    previous = _previous(sender, instance, ('department',), raw, update_fields)
+    instance._counter_keys = counters.lecturer_keys(*previous) if previous else previous
+
+
+@receiver(post_save, sender=Lecturer)
+def count_lecturer_on_save(sender, instance, raw=False, **kwargs):
+    old = getattr(instance, '_counter_keys', None)
+    if raw or old == ():
+        return
+    counters.shift(old or [], counters.lecturer_keys(instance.department_id))
+
+
+@receiver(post_delete, sender=Lecturer)
+def count_lecturer_on_delete(sender, instance, **kwargs):
+    counters.shift(counters.lecturer_keys(instance.department_id), [])
+
+
+@receiver(pre_save, sender=Enrollment)
+def remember_enrollment_counter_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    previous = _previous(sender, instance, ('class_group',), raw, update_fields)
+    instance._counter_keys = counters.enrollment_keys(*previous) if previous else previous
+
+
+@receiver(post_save, sender=Enrollment)
+def count_enrollment_on_save(sender, instance, raw=False, **kwargs):
+    old = getattr(instance, '_counter_keys', None)
+    if raw or old == ():
+        return
+    counters.shift(old or [], counters.enrollment_keys(instance.class_group_id))
+
+
+@receiver(post_delete, sender=Enrollment)
+def count_enrollment_on_delete(sender, instance, **kwargs):
+    counters.shift(counters.enrollment_keys(instance.class_group_id), [])
+
+
+@receiver(post_save, sender=Course)
+def count_course_on_save(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.shift([], [counters.COURSES])
+
+
+@receiver(post_delete, sender=Course)
+def count_course_on_delete(sender, instance, **kwargs):
+    counters.shift([counters.COURSES], [])
+
+
+@receiver(post_delete, sender=ClassGroup)
+def forget_classgroup_counters(sender, instance, **kwargs):
+    counters.forget(counters.classgroup_key(instance.pk))
+
+
+@receiver(post_delete, sender=Department)
+def forget_department_counters(sender, instance, **kwargs):
+    # Users and lecturers are detached by SET_NULL updates, which send no signals.
+    counters.forget(f"department:{instance.pk}:")
+
+
+# ---------- Class catalog invalidation (core.catalog) ----------
+
+def _linked_pks(instance, action, pk_set, related):
+    # Clears report no pk_set after the fact, so they are handled before.
+    if action == 'pre_clear':
+        return list(getattr(instance, related).values_list('pk', flat=True))
+    return list(pk_set or ())
+
+
+@receiver(pre_save, sender=Subject)
+def remember_subject_course(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._catalog_previous = _previous(sender, instance, ('course',), raw, update_fields)
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_catalog_on_subject(sender, instance, **kwargs):
+    courses = {instance.course_id, *(getattr(instance, '_catalog_previous', None) or ())}
+    catalog.invalidate(catalog.classgroup_ids(courses=courses))
+
+
+@receiver(post_save, sender=Course)
+def invalidate_catalog_on_course(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        catalog.invalidate(catalog.classgroup_ids(courses=[instance.pk]))
+
+
+@receiver(post_save, sender=ClassGroup)
+@receiver(post_delete, sender=ClassGroup)
+def invalidate_catalog_on_classgroup(sender, instance, **kwargs):
+    catalog.invalidate([instance.pk])
+
+
+@receiver(m2m_changed, sender=ClassGroup.lecturers.through)
+def invalidate_catalog_on_class_lecturers(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:  # lecturer.classgroups.add(...)
+        catalog.invalidate(_linked_pks(instance, action, pk_set, 'classgroups'))
+    else:
+        catalog.invalidate([instance.pk])
+
+
+@receiver(m2m_changed, sender=Lecturer.subjects.through)
+def invalidate_catalog_on_subject_lecturers(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:  # subject.lecturers.add(...)
+        courses = [instance.course_id]
+    else:
+        subjects = _linked_pks(instance, action, pk_set, 'subjects')
+        courses = Subject.objects.filter(pk__in=subjects).values_list('course_id', flat=True)
+    catalog.invalidate(catalog.classgroup_ids(courses=courses))
+
+
+@receiver(post_save, sender=Lecturer)
+@receiver(pre_delete, sender=Lecturer)
+def invalidate_catalog_on_lecturer(sender, instance, created=False, raw=False, **kwargs):
+    # pre_delete: the subject and class links are still there to look up.
+    if not created and not raw:
+        catalog.invalidate(catalog.classgroup_ids(lecturers=[instance.pk]))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_catalog_on_lecturer_user(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Names, emails and pictures are shown; logins only touch last_login.
+    if created or raw or instance.role != CustomUser.Role.LECTURER:
+        return
+    if update_fields is not None and set(update_fields) <= {'last_login', 'latest_activity'}:
+        return
+    lecturers = Lecturer.objects.filter(user=instance).values_list('pk', flat=True)
+    catalog.invalidate(catalog.classgroup_ids(lecturers=lecturers))
+
+
+@receiver(post_save, sender=Department)
+@receiver(pre_delete, sender=Department)
+def invalidate_catalog_on_department(sender, instance, created=False, raw=False, **kwargs):
+    # Lecturer entries show their department's name. pre_delete: the
+    # lecturers are detached by a SET_NULL update, which sends no signals.
+    if not created and not raw:
+        lecturers = Lecturer.objects.filter(department=instance).values_list('pk', flat=True)
+        catalog.invalidate(catalog.classgroup_ids(lecturers=lecturers))
+
+
+# ---------- Search index upkeep (core.search) ----------
+# Only the FTS5 backend keeps its own tables; for the others these are no-ops.
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def index_user(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and set(update_fields) <= {'last_login', 'latest_activity'}):
+        return
+    search.update('users', [instance.pk])
+    if not created and instance.role == CustomUser.Role.STUDENT:
+        # Fee plans are searched by their student's name and email.
+        search.update('fee_plans', StudentFeePlan.objects.filter(student__user=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def unindex_user(sender, instance, **kwargs):
+    search.delete('users', [instance.pk])
+
+
+@receiver(post_save, sender=StudentFeePlan)
+def index_fee_plan(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.update('fee_plans', [instance.pk])
+
+
+@receiver(post_delete, sender=StudentFeePlan)
+def unindex_fee_plan(sender, instance, **kwargs):
+    search.delete('fee_plans', [instance.pk])
+
+
+# ---------- Student typeahead (core.typeahead) ----------
+# Student rows come and go with their users (create_or_update_user_profile,
+# cascades), so user saves only matter when an indexed field changes.
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def remember_typeahead_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._typeahead_previous = _previous(sender, instance, typeahead.INDEXED_FIELDS, raw, update_fields)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_typeahead_on_user(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_typeahead_previous', None)
+    if created or raw or not previous:
+        return
+    current = tuple(getattr(instance, field) for field in typeahead.INDEXED_FIELDS)
+    if CustomUser.Role.STUDENT in (previous[0], current[0]) and tuple(previous) != current:
+        typeahead.bump()
+
+
+@receiver(post_save, sender=Student)
+def refresh_typeahead_on_student(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        typeahead.bump()
+
+
+@receiver(post_delete, sender=Student)
+def refresh_typeahead_on_student_delete(sender, instance, **kwargs):
+    typeahead.bump()
+
+
+# ---------- Reference data (core.refdata, core.departments) ----------
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=ClassGroup)
+@receiver(post_delete, sender=ClassGroup)
+def refresh_reference_data(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refdata.bump(refdata.AFFECTED[sender])
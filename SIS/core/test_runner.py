@@ -0,0 +1,17 @@
+# core/test_runner.py
+"""
+Test runner that drops state queued for the test database before it goes.
+
+Touches queued by test requests (core.activity) would otherwise be written
+by the exit flush, after the test database is destroyed and the connection
+points back at the real one.
+"""
+from django.test.runner import DiscoverRunner
+
+from . import activity
+
+
+class TestRunner(DiscoverRunner):
+    def teardown_databases(self, old_config, **kwargs):
+        activity._tracker.clear()
+        super().teardown_databases(old_config, **kwargs)
@@ -1,3 +1,836 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from io import StringIO
+import time
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from core import activity, attendance, catalog, counters, refdata, search, typeahead, versions
+from core.attendance import NOT_MARKED, AttendanceMatrix, AttendanceReport, period_days
+from core.models import (
+    Attendance, AttendanceBitmap, AttendanceCheckIn, AttendanceStreak, AttendanceSummary, ClassGroup, Counter, Course, Department,
+    Enrollment, Lecturer, Student, StudentFeePlan, Subject,
+)
+
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+def make_classgroup(name="CG1"):
+    department, _ = Department.objects.get_or_create(name="Computing")
+    course, _ = Course.objects.get_or_create(code="CS", defaults={"name": "Computer Science", "department": department})
+    return ClassGroup.objects.create(name=name, department=department, course=course)
+
+
+def enroll_students(classgroup, count, prefix="s"):
+    enrollments = []
+    for i in range(count):
+        user = CustomUser.objects.create_user(
+            email=f"{prefix}{classgroup.pk}_{i}@example.com",
+            identity_card_number=f"{prefix}{classgroup.pk}-{i}",
+            full_name=f"Student {prefix}{i}",
+            role=CustomUser.Role.STUDENT,
+        )
+        student = Student.objects.get(user=user)
+        student.class_group = classgroup
+        student.save(update_fields=["class_group"])
+        enrollments.append(Enrollment.objects.create(student=student, class_group=classgroup))
+    return enrollments
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class RecordSheetTests(TestCase):
+    def _sheet(self, enrollments, status="present", day=date(2025, 1, 6)):
+        return [
+            Attendance(enrollment=e, date=day, session="morning", status=status, description="")
+            for e in enrollments
+        ]
+
+    def test_inserts_then_updates_in_place(self):
+        enrollments = enroll_students(make_classgroup(), 3)
+        self.assertEqual(Attendance.objects.record_sheet(self._sheet(enrollments)), 3)
+        self.assertEqual(Attendance.objects.record_sheet(self._sheet(enrollments, status="absent")), 3)
+        self.assertEqual(Attendance.objects.count(), 3)
+        self.assertEqual(set(Attendance.objects.values_list("status", flat=True)), {"absent"})
+
+    def test_duplicate_keys_last_mark_wins(self):
+        enrollment = enroll_students(make_classgroup(), 1)[0]
+        marks = self._sheet([enrollment]) + self._sheet([enrollment], status="late")
+        self.assertEqual(Attendance.objects.record_sheet(marks), 1)
+        self.assertEqual(Attendance.objects.get().status, "late")
+
+    def test_query_count_independent_of_class_size(self):
+        small = enroll_students(make_classgroup("small"), 5, prefix="a")
+        large = enroll_students(make_classgroup("large"), 60, prefix="b")
+
+        with CaptureQueriesContext(connection) as small_ctx:
+            Attendance.objects.record_sheet(self._sheet(small))
+        with CaptureQueriesContext(connection) as large_ctx:
+            Attendance.objects.record_sheet(self._sheet(large))
+
+        self.assertEqual(len(small_ctx.captured_queries), len(large_ctx.captured_queries))
+
+    def test_enrollments_locked_before_previous_marks_are_read(self):
+        enrollments = enroll_students(make_classgroup(), 2)
+        with CaptureQueriesContext(connection) as ctx:
+            Attendance.objects.record_sheet(self._sheet(enrollments))
+        tables = [q["sql"].split(" FROM ")[1].split()[0] for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+        self.assertEqual(tables[:2], ['"core_enrollment"', '"core_attendance"'])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AttendanceSummaryTests(TestCase):
+    def setUp(self):
+        self.enrollment = enroll_students(make_classgroup(), 1)[0]
+        self.start = date(2025, 1, 6)
+
+    def _mark(self, offset, session, status):
+        return Attendance(
+            enrollment=self.enrollment, date=self.start + timedelta(days=offset),
+            session=session, status=status, description="",
+        )
+
+    def _assert_matches_rebuild(self):
+        live = AttendanceSummary.objects.get(enrollment=self.enrollment)
+        fresh = AttendanceSummary.objects.compute([self.enrollment.id])[0]
+        fields = ("present_count", "absent_count", "late_count", "excused_count",
+                  "last_marked_date", "last_marked_session", "current_streak")
+        self.assertEqual([getattr(live, f) for f in fields], [getattr(fresh, f) for f in fields])
+        return live
+
+    def test_bulk_marks_update_counts_and_streak(self):
+        Attendance.objects.record_sheet([self._mark(0, "morning", "absent")])
+        Attendance.objects.record_sheet([self._mark(0, "evening", "present")])
+        Attendance.objects.record_sheet([self._mark(1, "morning", "late")])
+        summary = self._assert_matches_rebuild()
+        self.assertEqual((summary.total_count, summary.attended_count, summary.current_streak), (3, 2, 2))
+
+    def test_editing_past_mark_recomputes_streak(self):
+        Attendance.objects.record_sheet([
+            self._mark(0, "morning", "present"),
+            self._mark(0, "evening", "absent"),
+            self._mark(1, "morning", "present"),
+        ])
+        Attendance.objects.record_sheet([self._mark(0, "evening", "excused")])
+        summary = self._assert_matches_rebuild()
+        self.assertEqual(summary.current_streak, 3)
+
+    @override_settings(ATTENDANCE_ATTENDED_STATUSES=("present",))
+    def test_streak_follows_the_attendance_policy(self):
+        Attendance.objects.record_sheet([self._mark(0, "morning", "present")])
+        Attendance.objects.record_sheet([self._mark(0, "evening", "late")])
+        summary = self._assert_matches_rebuild()
+        self.assertEqual((summary.attended_count, summary.current_streak), (1, 0))
+        self.assertEqual(AttendanceBitmap.streak(AttendanceBitmap.objects.filter(enrollment=self.enrollment)), 0)
+
+    def test_single_save_and_delete_are_tracked(self):
+        Attendance.objects.record_sheet([self._mark(0, "morning", "present")])
+        row = self._mark(0, "evening", "present")
+        row.save()
+        row.status = "absent"
+        row.save()
+        self.assertEqual(self._assert_matches_rebuild().current_streak, 0)
+        row.delete()
+        summary = self._assert_matches_rebuild()
+        self.assertEqual((summary.total_count, summary.current_streak), (1, 1))
+
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class RebuildAttendanceSummaryCommandTests(TransactionTestCase):
+    # Worker threads read through their own connections, so the data must be committed.
+    def test_rebuild_command_repairs_drift(self):
+        self.enrollment = enroll_students(make_classgroup(), 1)[0]
+        Attendance.objects.record_sheet([
+            Attendance(enrollment=self.enrollment, date=date(2025, 1, 6), session="morning", status="present")
+        ])
+        AttendanceSummary.objects.update(present_count=42)
+        call_command("rebuild_attendance_summary", "--workers", "2", "--chunk-size", "1", stdout=StringIO())
+        self.assertEqual(AttendanceSummary.objects.get(enrollment=self.enrollment).present_count, 1)
+
+
+class AttendanceBackfillTests(TestCase):
+    def test_missing_derived_rows_are_backfilled_once(self):
+        enrollment = enroll_students(make_classgroup(), 1)[0]
+        Attendance.objects.record_sheet([
+            Attendance(enrollment=enrollment, date=date(2025, 1, 6), session=session, status="present")
+            for session in ("morning", "evening")
+        ])
+        # As on a database migrated to the derived tables with marks already in it.
+        for model in (AttendanceSummary, AttendanceStreak, AttendanceBitmap):
+            model.objects.all().delete()
+
+        self.assertEqual(attendance.backfill(), {"summaries": 1, "streaks": 1, "bitmaps": 1})
+        self.assertEqual(AttendanceSummary.objects.get(enrollment=enrollment).present_count, 2)
+        self.assertEqual(AttendanceStreak.objects.get(student=enrollment.student).current_streak, 2)
+        self.assertEqual(AttendanceBitmap.objects.verify([enrollment.pk]), [])
+        self.assertEqual(attendance.backfill(), {"summaries": 0, "streaks": 0, "bitmaps": 0})
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AttendanceBitmapTests(TestCase):
+    def setUp(self):
+        self.enrollment = enroll_students(make_classgroup(), 1)[0]
+
+    def _mark(self, day, session, status):
+        return Attendance(enrollment=self.enrollment, date=day, session=session, status=status, description="")
+
+    def test_marks_round_trip_across_years(self):
+        Attendance.objects.record_sheet([
+            self._mark(date(2024, 12, 31), "evening", "absent"),
+            self._mark(date(2025, 1, 1), "morning", "present"),
+            self._mark(date(2025, 1, 1), "evening", "excused"),
+        ])
+        bitmaps = list(AttendanceBitmap.objects.filter(enrollment=self.enrollment))
+        self.assertEqual(sorted(b.year for b in bitmaps), [2024, 2025])
+        by_year = {b.year: b for b in bitmaps}
+        self.assertEqual(list(by_year[2025].marks()), [
+            (date(2025, 1, 1), "morning", "present"),
+            (date(2025, 1, 1), "evening", "excused"),
+        ])
+        self.assertEqual(by_year[2024].get_status(date(2024, 12, 31), "evening"), "absent")
+        self.assertEqual(AttendanceBitmap.streak(bitmaps), 2)
+
+    @override_settings(ATTENDANCE_ATTENDED_STATUSES=("present", "late"))
+    def test_streak_keeps_late_and_excused_apart(self):
+        Attendance.objects.record_sheet([
+            self._mark(date(2025, 3, 3), "morning", "present"),
+            self._mark(date(2025, 3, 3), "evening", "excused"),
+            self._mark(date(2025, 3, 4), "morning", "late"),
+            self._mark(date(2025, 3, 4), "evening", "present"),
+        ])
+        bitmap = AttendanceBitmap.objects.get(enrollment=self.enrollment)
+        self.assertEqual([status for *_, status in bitmap.marks()], ["present", "excused", "late", "present"])
+        self.assertEqual(AttendanceBitmap.streak([bitmap]), 2)
+
+    def test_backfill_rebuilds_bitmaps_in_an_older_layout(self):
+        Attendance.objects.record_sheet([self._mark(date(2025, 3, 3), "morning", "excused")])
+        AttendanceBitmap.objects.update(bits=bytes(AttendanceBitmap.SIZE // 2))
+        self.assertEqual(attendance.backfill()["bitmaps"], 1)
+        bitmap = AttendanceBitmap.objects.get(enrollment=self.enrollment)
+        self.assertEqual(bitmap.get_status(date(2025, 3, 3), "morning"), "excused")
+
+    def test_single_saves_and_deletes_keep_bitmap_in_sync(self):
+        row = self._mark(date(2025, 3, 3), "morning", "present")
+        row.save()
+        row.date = date(2025, 3, 4)
+        row.save()
+        self.assertEqual(AttendanceBitmap.objects.verify([self.enrollment.id]), [])
+        row.delete()
+        self.assertEqual(AttendanceBitmap.objects.verify([self.enrollment.id]), [])
+        self.assertEqual(list(AttendanceBitmap.objects.get(enrollment=self.enrollment).marks()), [])
+
+    def test_checker_reports_and_fixes_drift(self):
+        Attendance.objects.record_sheet([self._mark(date(2025, 3, 3), "morning", "present")])
+        AttendanceBitmap.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command("check_attendance_bitmaps", stdout=StringIO())
+        call_command("check_attendance_bitmaps", "--fix", stdout=StringIO())
+        call_command("check_attendance_bitmaps", stdout=StringIO())
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AttendanceStreakTests(TestCase):
+    def setUp(self):
+        self.first = enroll_students(make_classgroup("A"), 1)[0]
+        self.student = self.first.student
+        self.second = Enrollment.objects.create(student=self.student, class_group=make_classgroup("B"))
+        self.start = date(2025, 1, 6)
+
+    def _mark(self, enrollment, offset, session, status):
+        return Attendance(
+            enrollment=enrollment, date=self.start + timedelta(days=offset),
+            session=session, status=status, description="",
+        )
+
+    def _assert_matches_recompute(self):
+        live = AttendanceStreak.objects.get(student=self.student)
+        fresh = AttendanceStreak.objects.compute([self.student.id])[0]
+        self.assertEqual(
+            (live.current_streak, live.last_marked_date, live.last_marked_session),
+            (fresh.current_streak, fresh.last_marked_date, fresh.last_marked_session),
+        )
+        return live.current_streak
+
+    def test_streak_spans_class_groups(self):
+        Attendance.objects.record_sheet([self._mark(self.first, 0, "morning", "absent")])
+        Attendance.objects.record_sheet([self._mark(self.first, 0, "evening", "present")])
+        Attendance.objects.record_sheet([self._mark(self.second, 0, "evening", "late")])
+        Attendance.objects.record_sheet([self._mark(self.second, 1, "morning", "present")])
+        self.assertEqual(self._assert_matches_recompute(), 3)
+        Attendance.objects.record_sheet([self._mark(self.first, 1, "morning", "absent")])
+        self.assertEqual(self._assert_matches_recompute(), 0)
+        self.assertEqual(Student.objects.get(pk=self.student.pk).current_streak, 0)
+
+    def test_editing_past_record_recomputes(self):
+        Attendance.objects.record_sheet([
+            self._mark(self.first, 0, "morning", "present"),
+            self._mark(self.first, 0, "evening", "absent"),
+            self._mark(self.first, 1, "morning", "present"),
+        ])
+        self.assertEqual(self._assert_matches_recompute(), 1)
+        Attendance.objects.record_sheet([self._mark(self.first, 0, "evening", "present")])
+        self.assertEqual(self._assert_matches_recompute(), 3)
+
+    def test_new_mark_cost_does_not_grow_with_history(self):
+        def cost_of_next_mark(offset):
+            with CaptureQueriesContext(connection) as ctx:
+                Attendance.objects.record_sheet([self._mark(self.first, offset, "morning", "present")])
+            return len(ctx.captured_queries)
+
+        short = cost_of_next_mark(0)
+        Attendance.objects.record_sheet(
+            [self._mark(self.first, day, "evening", "present") for day in range(1, 40)]
+        )
+        self.assertEqual(cost_of_next_mark(50), short)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AttendanceMatrixTests(TestCase):
+    def test_rows_count_in_database_and_fill_unmarked_cells(self):
+        first, second = enroll_students(make_classgroup(), 2)
+        days = period_days(date(2025, 2, 12), "month")
+        Attendance.objects.record_sheet([
+            Attendance(enrollment=first, date=date(2025, 2, 3), session="morning", status="present"),
+            Attendance(enrollment=first, date=date(2025, 2, 3), session="evening", status="late"),
+            Attendance(enrollment=first, date=date(2025, 3, 3), session="morning", status="absent"),
+            Attendance(enrollment=second, date=date(2025, 2, 28), session="evening", status="absent"),
+        ])
+        enrollments = Enrollment.objects.filter(pk__in=[first.pk, second.pk]).select_related("student").order_by("pk")
+
+        self.assertEqual(len(days), 28)
+        self.assertTrue(all(isinstance(cell, tuple) for cell in AttendanceMatrix(enrollments, days).cells()))
+        with self.assertNumQueries(3):
+            rows = AttendanceMatrix(enrollments, days).rows()
+
+        self.assertEqual(
+            [(r["present_count"], r["late_count"], r["absent_count"], r["total_marked"]) for r in rows],
+            [(1, 1, 0, 2), (0, 0, 1, 1)],
+        )
+        self.assertEqual(rows[0]["attendance_percentage"], 100.0)  # late counts as attended
+        self.assertEqual(rows[0]["statuses"][2], {"date": date(2025, 2, 3), "morning": "present", "evening": "late"})
+        self.assertEqual(rows[1]["statuses"][0]["morning"], NOT_MARKED)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AttendanceReportTests(TestCase):
+    def setUp(self):
+        self.first, self.second = enroll_students(make_classgroup(), 2)
+        Attendance.objects.record_sheet([
+            Attendance(enrollment=self.first, date=date(2025, 2, 3), session="morning", status="present"),
+            Attendance(enrollment=self.first, date=date(2025, 2, 3), session="evening", status="late"),
+            Attendance(enrollment=self.first, date=date(2025, 3, 3), session="morning", status="absent"),
+            Attendance(enrollment=self.second, date=date(2025, 2, 28), session="evening", status="excused"),
+        ])
+        self.enrollments = Enrollment.objects.filter(pk__in=[self.first.pk, self.second.pk])
+
+    def test_period_and_history_figures_each_take_one_query(self):
+        with self.assertNumQueries(1):
+            february = AttendanceReport(self.enrollments, period_days(date(2025, 2, 12), "month"))
+        with self.assertNumQueries(1):
+            history = AttendanceReport(self.enrollments)
+
+        self.assertEqual((february[self.first.pk].attended, february[self.first.pk].total), (2, 2))
+        self.assertEqual((history[self.first.pk].attended, history[self.first.pk].total), (2, 3))
+        self.assertEqual(history[self.first.pk].percentage, 66.67)
+        self.assertEqual((history.overall.attended, history.overall.total), (3, 4))
+        self.assertIsNone(AttendanceReport(self.enrollments, [date(2024, 1, 1)])[self.first.pk].percentage)
+
+    @override_settings(ATTENDANCE_ATTENDED_STATUSES=("present",))
+    def test_policy_decides_what_counts_as_attended(self):
+        report = AttendanceReport(self.enrollments)
+        self.assertEqual(report[self.first.pk].percentage, 33.33)
+        self.assertEqual(report[self.second.pk].percentage, 0.0)
+
+    @override_settings(ATTENDANCE_ATTENDED_STATUSES=("present", "on time"))
+    def test_unknown_policy_status_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            AttendanceReport(self.enrollments)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class CatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.classgroup = make_classgroup()
+        self.lecturer = self._lecturer("ada@example.com", "Ada Lovelace")
+        self.classgroup.lecturers.add(self.lecturer)
+
+    def _lecturer(self, email, name):
+        user = CustomUser.objects.create_user(
+            email=email, identity_card_number=f"L-{email}", full_name=name, role=CustomUser.Role.LECTURER,
+        )
+        return Lecturer.objects.get(user=user)
+
+    def _subjects(self, count, start=0):
+        subjects = Subject.objects.bulk_create([
+            Subject(course=self.classgroup.course, name=f"Subject {i}", code=f"S{i:02}")
+            for i in range(start, start + count)
+        ])
+        for subject in subjects:
+            subject.lecturers.add(self.lecturer, self._lecturer(f"{subject.code}@example.com", f"Tutor {subject.code}"))
+        return subjects
+
+    def test_built_in_constant_queries_then_cached(self):
+        self._subjects(2)
+        with CaptureQueriesContext(connection) as small:
+            catalog.build(self.classgroup.pk)
+        self._subjects(10, start=2)
+        with CaptureQueriesContext(connection) as large:
+            entry = catalog.catalog(self.classgroup.pk)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+        with self.assertNumQueries(0):
+            self.assertEqual(catalog.catalog(self.classgroup.pk), entry)
+
+        first = entry["subjects"][0]
+        self.assertEqual((first["code"], [l["name"] for l in first["lecturers"]]), ("S00", ["Ada Lovelace", "Tutor S00"]))
+        self.assertEqual(entry["lecturers"][0]["email"], "ada@example.com")
+        self.assertEqual(entry["course"], {"name": "Computer Science", "code": "CS"})
+
+    def test_links_and_edits_invalidate(self):
+        subject = self._subjects(1)[0]
+        catalog.catalog(self.classgroup.pk)
+
+        other = self._lecturer("grace@example.com", "Grace Hopper")
+        with self.captureOnCommitCallbacks(execute=True):
+            other.subjects.add(subject)
+        self.assertIn("Grace Hopper", [l["name"] for l in catalog.catalog(self.classgroup.pk)["subjects"][0]["lecturers"]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            subject.name = "Compilers"
+            subject.save()
+        self.assertEqual(catalog.catalog(self.classgroup.pk)["subjects"][0]["name"], "Compilers")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user = self.lecturer.user
+            user.full_name = "Ada King"
+            user.save()
+        self.assertEqual(catalog.catalog(self.classgroup.pk)["lecturers"][0]["name"], "Ada King")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.classgroup.lecturers.clear()
+        self.assertEqual(catalog.catalog(self.classgroup.pk)["lecturers"], [])
+
+    @override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "catalog_test_cache",
+    }})
+    def test_department_rename_and_delete_invalidate_every_worker(self):
+        call_command("createcachetable", verbosity=0)
+        other_worker = DatabaseCache("catalog_test_cache", {})
+        department = Department.objects.create(name="Mathematics")
+        self.lecturer.department = department
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lecturer.save()
+        self.assertEqual(catalog.catalog(self.classgroup.pk)["lecturers"][0]["department"], "Mathematics")
+        self.assertIsNotNone(other_worker.get(catalog.key(self.classgroup.pk)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            department.name = "Applied Mathematics"
+            department.save()
+        self.assertIsNone(other_worker.get(catalog.key(self.classgroup.pk)))
+        self.assertEqual(catalog.catalog(self.classgroup.pk)["lecturers"][0]["department"], "Applied Mathematics")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            department.delete()
+        self.assertIsNone(catalog.catalog(self.classgroup.pk)["lecturers"][0]["department"])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AttendanceCheckInFlushTests(TestCase):
+    def test_flush_dedupes_and_keeps_existing_marks(self):
+        first, second = enroll_students(make_classgroup(), 2)
+        day = date(2025, 1, 6)
+        Attendance.objects.record_sheet([Attendance(enrollment=second, date=day, session="morning", status="absent")])
+        AttendanceCheckIn.objects.bulk_create(
+            [AttendanceCheckIn(enrollment=first, date=day, session="morning") for _ in range(3)]
+            + [AttendanceCheckIn(enrollment=second, date=day, session="morning")]
+        )
+
+        self.assertEqual(AttendanceCheckIn.objects.flush(), 4)
+        self.assertFalse(AttendanceCheckIn.objects.exists())
+        self.assertEqual(
+            dict(Attendance.objects.values_list("enrollment_id", "status")),
+            {first.id: "present", second.id: "absent"},
+        )
+        self.assertEqual(AttendanceSummary.objects.get(enrollment=first).present_count, 1)
+        self.assertEqual(AttendanceCheckIn.objects.flush(), 0)
+
+    def test_command_finishes_when_every_check_in_is_a_duplicate(self):
+        enrollment = enroll_students(make_classgroup(), 1)[0]
+        day = date(2025, 1, 6)
+        Attendance.objects.record_sheet([Attendance(enrollment=enrollment, date=day, session="morning", status="late")])
+        AttendanceCheckIn.objects.bulk_create(
+            [AttendanceCheckIn(enrollment=enrollment, date=day, session="morning") for _ in range(3)]
+        )
+        out = StringIO()
+        call_command("flush_attendance_checkins", "--batch-size", "2", stdout=out)
+        self.assertIn("3 check-in(s) recorded", out.getvalue())
+        self.assertFalse(AttendanceCheckIn.objects.exists())
+        self.assertEqual(Attendance.objects.get().status, "late")
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class CounterTests(TestCase):
+    def assertCountersMatchTables(self):
+        rows = Counter.objects.values_list("key", "value")
+        stored = {k: v for k, v in rows if v}
+        self.assertEqual(stored, {k: v for k, v in counters.expected().items() if v})
+
+    def test_hooks_follow_saves_role_changes_and_deletes(self):
+        classgroup = make_classgroup()
+        enrollments = enroll_students(classgroup, 3)
+        user = enrollments[0].student.user
+        user.department = classgroup.department
+        user.save()
+        self.assertEqual(Counter.objects.get_many([counters.classgroup_key(classgroup.pk)]),
+                         {counters.classgroup_key(classgroup.pk): 3})
+        self.assertCountersMatchTables()
+
+        user.role = CustomUser.Role.LECTURER
+        user.save()
+        user.lecturer.department = classgroup.department
+        user.lecturer.save()
+        enrollments[1].delete()
+        enrollments[2].student.user.delete()
+        self.assertCountersMatchTables()
+
+        classgroup.department.delete()
+        self.assertFalse(Counter.objects.filter(key__startswith="department:").exists())
+        self.assertFalse(Counter.objects.filter(key__startswith="classgroup:").exists())
+        self.assertCountersMatchTables()
+
+    def test_reconcile_command_repairs_drift(self):
+        enroll_students(make_classgroup(), 2)
+        Counter.objects.filter(key=counters.USERS).update(value=40)
+        Counter.objects.create(key="classgroup:999:students", value=5)
+        stamp = versions.get("typeahead", fresh=True)
+        out = StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertIn("users: 40 -> 2", out.getvalue())
+        self.assertCountersMatchTables()
+        self.assertEqual(counters.reconcile(), {})
+        self.assertEqual(versions.get("typeahead", fresh=True), stamp)  # stamps aren't counters
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class SearchTests(TestCase):
+    def _user(self, email, name, role=CustomUser.Role.STUDENT):
+        return CustomUser.objects.create_user(
+            email=email, identity_card_number=f"IC-{email}", full_name=name, role=role,
+        )
+
+    def _found(self, query, index="users", queryset=None):
+        queryset = CustomUser.objects.all() if queryset is None else queryset
+        return list(search.search(queryset, index, query).order_by("-search_rank", "pk"))
+
+    def test_fts5_is_the_sqlite_backend(self):
+        self.assertEqual(search.backend().name, "fts5")
+
+    def test_substring_matches_ranked_by_relevance(self):
+        weak = self._user("khalid@example.com", "Muhammad Khalid")
+        strong = self._user("ali@example.com", "Ali bin Ali")
+        self._user("siti@example.com", "Siti Aminah")
+        self.assertEqual(self._found("ALI"), [strong, weak])
+        self.assertEqual(self._found("aminah@"), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        user = self._user("wei@example.com", "Tan Wei Ling")
+        user.full_name = "Lim Wei Ling"
+        user.save()
+        self.assertEqual(self._found("Tan W"), [])
+        self.assertEqual(self._found("Lim W"), [user])
+        user.delete()
+        self.assertEqual(self._found("Lim W"), [])
+
+    def test_fee_plans_are_found_by_student_name(self):
+        user = self._user("ravi@example.com", "Ravi Kumar")
+        plan = StudentFeePlan.objects.create(student=user.student, total_amount=1200, months=6, description="Semester 1")
+        plans = StudentFeePlan.objects.all()
+        self.assertEqual(self._found("kumar", "fee_plans", plans), [plan])
+        self.assertEqual(self._found("semester", "fee_plans", plans), [plan])
+
+        user.full_name = "Ravi Nair"
+        user.save()
+        self.assertEqual(self._found("kumar", "fee_plans", plans), [])
+        self.assertEqual(self._found("nair", "fee_plans", plans), [plan])
+        plan.delete()
+        self.assertEqual(self._found("nair", "fee_plans", plans), [])
+
+    def test_related_paths_and_short_queries(self):
+        lecturer_user = self._user("ada@example.com", "Ada Lovelace", role=CustomUser.Role.LECTURER)
+        lecturers = Lecturer.objects.all()
+        self.assertEqual(list(search.search(lecturers, "users", "lovelace", path="user")), [lecturer_user.lecturer])
+        # Too short for trigrams: a LIKE scan instead.
+        self.assertEqual(list(search.search(lecturers, "users", "Ad", path="user")), [lecturer_user.lecturer])
+
+    def test_matches_agree_with_like_backend(self):
+        for i, name in enumerate(("Nur Aisyah", "Aisyah Rahman", "Farah Hassan", "Nurul Huda")):
+            self._user(f"u{i}@example.com", name)
+        for query in ("aisyah", "nur", "hassan", "example.com", "zzz"):
+            with override_settings(SEARCH_BACKEND="like"):
+                expected = set(self._found(query))
+            self.assertEqual(set(self._found(query)), expected, query)
+
+    def test_rebuild_command_indexes_bulk_created_users(self):
+        CustomUser.objects.bulk_create([
+            CustomUser(email="bulk@example.com", identity_card_number="B-1", full_name="Bulk Loaded")
+        ])
+        self.assertEqual(self._found("bulk loaded"), [])
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("users: 1 rows", out.getvalue())
+        self.assertEqual([u.email for u in self._found("bulk loaded")], ["bulk@example.com"])
+
+
+@override_settings(
+    PASSWORD_HASHERS=FAST_HASHERS, VIEW_METRICS_SAMPLE_RATE=0, ACTIVITY_FLUSH_SECONDS=3600,
+    TYPEAHEAD_BACKGROUND_REBUILD=False, VERSION_STAMP_SECONDS=60,
+)
+class TypeaheadTests(TestCase):
+    def setUp(self):
+        versions.clear()
+        for i, name in enumerate(("Tan Wei Ling", "Lim Wei Jie", "Nur Aisyah binti Ahmad")):
+            self._student(f"s{i}@example.com", name, f"990101-14-00{i}{i}")
+
+    def _student(self, email, name, ic):
+        return CustomUser.objects.create_user(
+            email=email, identity_card_number=ic, full_name=name, role=CustomUser.Role.STUDENT,
+        )
+
+    def _names(self, query, limit=None):
+        return [person["name"] for person in typeahead.lookup(query, limit)]
+
+    def test_prefixes_of_names_emails_and_ic_numbers(self):
+        self.assertEqual(self._names("wei"), ["Lim Wei Jie", "Tan Wei Ling"])
+        self.assertEqual(self._names("AIS"), ["Nur Aisyah binti Ahmad"])
+        self.assertEqual(self._names("s1@"), ["Lim Wei Jie"])
+        self.assertEqual(self._names("99010114000"), ["Tan Wei Ling"])
+        self.assertEqual(self._names("990101-14-002"), ["Nur Aisyah binti Ahmad"])
+        self.assertEqual(self._names("ling tan"), ["Tan Wei Ling"])
+        self.assertEqual(self._names("ei"), [])
+        self.assertEqual(len(self._names("wei", limit=1)), 1)
+        person = typeahead.lookup("tan wei")[0]
+        student = Student.objects.get(user__email="s0@example.com")
+        self.assertEqual(person, {
+            "id": student.pk, "user_id": student.user_id, "name": "Tan Wei Ling",
+            "email": "s0@example.com", "ic": "990101-14-0000",
+        })
+
+    def test_served_from_memory_until_users_change(self):
+        typeahead.lookup("tan")
+        with self.assertNumQueries(0):
+            self.assertEqual(self._names("tan"), ["Tan Wei Ling"])
+
+        self._student("s9@example.com", "Tanaka Hiro", "880202-01-9999")
+        self.assertEqual(self._names("tan"), ["Tan Wei Ling", "Tanaka Hiro"])
+
+        user = CustomUser.objects.get(email="s0@example.com")
+        user.save(update_fields=["last_login"])
+        user.phone_number = "012-3456789"
+        user.save()
+        lecturer = CustomUser.objects.create_user(
+            email="lect@example.com", identity_card_number="L-1", full_name="Lecturer", role=CustomUser.Role.LECTURER,
+        )
+        lecturer.full_name = "Renamed Lecturer"
+        lecturer.save()
+        with self.assertNumQueries(0):  # nothing the index shows changed
+            self._names("tan")
+
+        user.full_name = "Tan Wei Ling Binti Tan"
+        user.save()
+        self.assertEqual(self._names("binti"), ["Nur Aisyah binti Ahmad", "Tan Wei Ling Binti Tan"])
+        user.delete()
+        self.assertEqual(self._names("tan"), ["Tanaka Hiro"])
+
+    def test_stamp_is_shared_between_processes(self):
+        self._names("tan")
+        stamp = typeahead.version()
+        # Another process: nothing in memory, same database.
+        versions.clear()
+        self.assertEqual(typeahead.version(), stamp)
+        CustomUser.objects.filter(email="s0@example.com").update(full_name="Tanaka Hiro")  # no signals
+        typeahead.bump()  # as the other process's write would
+        self.assertNotEqual(typeahead.version(), stamp)
+        self.assertEqual(self._names("tan"), ["Tanaka Hiro"])
+
+    def test_scoped_lookup_reaches_students_past_the_scan_window(self):
+        people = [
+            {"id": i, "user_id": i, "name": f"Tan {i:05d}", "short_name": "", "email": f"t{i}@example.com", "ic": ""}
+            for i in range(typeahead.MAX_SCAN * 2)
+        ]
+        people.append({"id": -1, "user_id": -1, "name": "Wei Tan", "short_name": "", "email": "w@example.com", "ic": ""})
+        index = typeahead.PrefixIndex(people)
+        scope = {typeahead.MAX_SCAN + 5, -1, 3, 999999}
+        found = [person["name"] for person in index.lookup("tan", students=scope)]
+        self.assertEqual(found, ["Tan 00003", f"Tan {typeahead.MAX_SCAN + 5:05d}", "Wei Tan"])
+        self.assertEqual([p["name"] for p in index.lookup("tan wei", students=scope)], ["Wei Tan"])
+        self.assertEqual(len(index.lookup("tan", limit=1, students=scope)), 1)
+
+    def test_endpoints_for_admins_and_lecturers_only(self):
+        admin = CustomUser.objects.create_user(
+            email="admin@example.com", identity_card_number="A-1", full_name="Admin", role=CustomUser.Role.ADMIN,
+        )
+        lecturer = CustomUser.objects.create_user(
+            email="lect@example.com", identity_card_number="L-1", full_name="Lecturer", role=CustomUser.Role.LECTURER,
+        )
+        classgroup = make_classgroup()
+        classgroup.lecturers.add(lecturer.lecturer)
+        Enrollment.objects.create(student=Student.objects.get(user__email="s2@example.com"), class_group=classgroup)
+
+        self.client.force_login(admin)
+        response = self.client.get(reverse("adminportal:student_typeahead"), {"q": "wei"})
+        self.assertEqual([p["email"] for p in response.json()["results"]], ["s1@example.com", "s0@example.com"])
+
+        # Lecturers only find students in their own classes, without IC numbers.
+        self.client.force_login(lecturer)
+        self.assertEqual(self.client.get(reverse("lecturer:student_typeahead"), {"q": "wei"}).json()["results"], [])
+        person = self.client.get(reverse("lecturer:student_typeahead"), {"q": "nur"}).json()["results"][0]
+        self.assertEqual((person["email"], "ic" in person), ("s2@example.com", False))
+        self.client.force_login(CustomUser.objects.get(email="s0@example.com"))
+        self.assertEqual(self.client.get(reverse("lecturer:student_typeahead"), {"q": "nur"}).status_code, 403)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, VERSION_STAMP_SECONDS=60)
+class TypeaheadRebuildTests(TransactionTestCase):
+    # Committed data, so the rebuild thread's own connection can see it.
+    def setUp(self):
+        versions.clear()
+        typeahead._index = None
+        self._student("s0@example.com", "Tan Wei Ling")
+
+    def _student(self, email, name):
+        return CustomUser.objects.create_user(
+            email=email, identity_card_number=email, full_name=name, role=CustomUser.Role.STUDENT,
+        )
+
+    def test_stale_index_is_served_while_a_new_one_builds(self):
+        typeahead.lookup("tan")
+        self._student("s1@example.com", "Tanaka Hiro")
+        self.assertEqual([p["name"] for p in typeahead.lookup("tan")], ["Tan Wei Ling"])
+        deadline = time.monotonic() + 5
+        while typeahead._rebuilding is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([p["name"] for p in typeahead.lookup("tan")], ["Tan Wei Ling", "Tanaka Hiro"])
+
+
+@override_settings(VERSION_STAMP_SECONDS=60)
+class RefDataTests(TestCase):
+    def setUp(self):
+        versions.clear()
+        self.classgroup = make_classgroup()
+
+    def _form(self, data=None):
+        from adminportal.forms import AddStudentForm
+        return AddStudentForm(data)
+
+    def test_choices_served_from_memory_until_written(self):
+        str(self._form())
+        with self.assertNumQueries(0):
+            html = str(self._form()["class_group"]) + str(self._form()["department"])
+        self.assertIn("CG1 (CS", html)
+        self.assertIn(">Computing</option>", html)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.filter(code="CS").get().save()  # course saves refresh the class group labels too
+            ClassGroup.objects.create(name="CG2", department=self.classgroup.department, course=self.classgroup.course)
+        self.assertEqual([cg.name for cg in refdata.rows("classgroups")], ["CG1", "CG2"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.classgroup.delete()
+        self.assertIsNone(refdata.get("classgroups", self.classgroup.pk))
+        self.assertEqual([cg.name for cg in refdata.rows("classgroups")], ["CG2"])
+
+    def test_validation_and_copies(self):
+        form = self._form({"department": self.classgroup.department_id, "class_group": "999"})
+        form.is_valid()
+        self.assertEqual(form.cleaned_data["department"], self.classgroup.department)
+        self.assertIn("class_group", form.errors)
+
+        rows = refdata.rows("departments")
+        rows[0].student_count = 5
+        self.assertFalse(hasattr(refdata.get("departments", rows[0].pk), "student_count"))
+        with self.assertNumQueries(0):
+            self.assertEqual(refdata.get("classgroups", self.classgroup.pk).course.code, "CS")
+
+    def test_writes_in_another_process_are_seen_through_the_shared_stamp(self):
+        self.assertEqual([cg.name for cg in refdata.rows("classgroups")], ["CG1"])
+        loaded = dict(refdata._loaded)
+
+        def this_process_as_before():
+            # Its rows and its copy of the stamps, untouched by the other process.
+            refdata._loaded.clear()
+            refdata._loaded.update(loaded)
+            versions._stamps = {"refdata:classgroups": loaded["classgroups"][0]}
+
+        # Another process adds a class group, bumping the stamp in the database.
+        other = ClassGroup.objects.create(name="CG2", department=self.classgroup.department, course=self.classgroup.course)
+        this_process_as_before()
+        self.assertEqual([cg.name for cg in refdata.rows("classgroups")], ["CG1"])  # within VERSION_STAMP_SECONDS
+        with override_settings(VERSION_STAMP_SECONDS=0):
+            self.assertEqual([cg.name for cg in refdata.rows("classgroups")], ["CG1", "CG2"])
+
+        # Submitted choices check the stamp at once.
+        this_process_as_before()
+        form = self._form({"department": self.classgroup.department_id, "class_group": other.pk})
+        form.is_valid()
+        self.assertNotIn("class_group", form.errors)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, VIEW_METRICS_SAMPLE_RATE=0, ACTIVITY_RESOLUTION_SECONDS=60)
+class ActivityTrackerTests(TestCase):
+    def setUp(self):
+        activity._tracker.clear()
+        self.student = enroll_students(make_classgroup(), 1)[0].student
+        self.lecturer = CustomUser.objects.create_user(
+            email="lect@example.com", identity_card_number="L-1", full_name="Lecturer", role=CustomUser.Role.LECTURER,
+        )
+
+    def test_touches_are_coalesced_into_bulk_updates(self):
+        for _ in range(5):
+            activity.touch(self.student.user)
+            activity.touch(self.lecturer)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(activity.flush(), 2)
+        self.assertEqual([q["sql"].split()[0] for q in ctx.captured_queries], ["UPDATE"])
+
+        self.student.user.refresh_from_db()
+        self.lecturer.refresh_from_db()
+        self.assertIsNotNone(self.student.user.latest_activity)
+        self.assertIsNotNone(self.lecturer.latest_activity)
+
+        # Written within the resolution: further touches are dropped.
+        activity.touch(self.lecturer)
+        with self.assertNumQueries(0):
+            self.assertEqual(activity.flush(), 0)
+
+    def test_recent_stored_value_is_not_rewritten(self):
+        CustomUser.objects.filter(pk=self.lecturer.pk).update(latest_activity=timezone.now())
+        activity.touch(self.lecturer)
+        self.assertEqual(activity.flush(), 0)
+
+    def test_write_is_immediate_and_drops_the_queued_touch(self):
+        activity.touch(self.student.user)
+        activity.write(self.student.user)
+        self.student.user.refresh_from_db()
+        self.assertIsNotNone(self.student.user.latest_activity)
+        self.assertEqual(activity.flush(), 0)
+
+    def test_pending_touches_are_flushed_at_exit(self):
+        activity.touch(self.lecturer)
+        activity._flush_at_exit()
+        self.lecturer.refresh_from_db()
+        self.assertIsNotNone(self.lecturer.latest_activity)
+
+    @override_settings(ACTIVITY_FLUSH_SECONDS=3600)
+    def test_page_views_do_not_write(self):
+        self.client.force_login(self.student.user)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("dashboard:main_dashboard"))
+        self.assertFalse([q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")])
+        self.assertEqual(activity._tracker.pending, {self.student.user.pk})
@@ -0,0 +1,190 @@
+# core/typeahead.py
+"""
+Student typeahead served from a per-process prefix index.
+
+Every student is indexed under the words of their full and short name,
+their email (whole and local part) and identity card number (as stored and
+digits only), lowercased. The index is one sorted list of (term, person),
+so a lookup is a bisect to the query's prefix range and a short walk along
+it; no query is run.
+
+    lookup("tan wei")                  ->  [{"id", "user_id", "name", "email", "ic"}, ...]
+    lookup("tan wei", students={...})  ->  only these student ids
+
+Every word of a multi-word query must prefix one of the person's terms;
+names typed in order are matched first. Results are in term order, each
+person once, at most TYPEAHEAD_LIMIT (default 10). An unscoped lookup
+walks at most MAX_SCAN index entries, so vague queries stay fast and may
+return fewer. A scoped lookup checks each student in the scope instead
+(a lecturer's classes are small), so it finds them however common the
+prefix is.
+
+The index is built on first use in each process and tagged with the
+"typeahead" stamp from core.versions, which is shared by every process.
+core.signals bumps it when a student is added or removed, or a student
+user's role, name, short name, email or IC number changes; logins and
+other edits leave the index alone. A process whose index is behind keeps
+serving it while one background thread builds the new one, so a lookup
+never waits on a rebuild (TYPEAHEAD_BACKGROUND_REBUILD=False builds inline
+instead, as the very first build always is).
+"""
+import logging
+import os
+import re
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connection
+
+from . import versions
+from .models import Student
+
+logger = logging.getLogger(__name__)
+
+VERSION = "typeahead"
+MAX_SCAN = 2000  # index entries a lookup walks at most
+FIELDS = ("id", "user_id", "name", "email", "ic")
+# User fields the index is built from.
+INDEXED_FIELDS = ("role", "full_name", "short_name", "email", "identity_card_number")
+
+_lock = threading.Lock()
+_index, _index_version = None, None
+_rebuilding = None  # pid running a background rebuild
+
+
+def _normalise(text):
+    return " ".join((text or "").casefold().split())
+
+
+def _terms(person):
+    name = _normalise(person["name"])
+    words = set(f"{name} {_normalise(person['short_name'])}".split())
+    email = _normalise(person["email"])
+    ic = _normalise(person["ic"])
+    # The whole name too, so "tan wei l" is one prefix range.
+    return words | {name, email, email.split("@")[0], ic, re.sub(r"\D", "", ic)} - {""}
+
+
+class PrefixIndex:
+    def __init__(self, people):
+        self.people = people
+        self._words = [_terms(person) for person in people]
+        self._positions = {person["id"]: i for i, person in enumerate(people)}
+        terms, owners = [], []
+        for i, words in enumerate(self._words):
+            terms.extend(words)
+            owners.extend([i] * len(words))
+        order = sorted(range(len(terms)), key=terms.__getitem__)  # cheaper than sorting (term, i) tuples
+        self._terms = [terms[j] for j in order]
+        self._owners = [owners[j] for j in order]
+
+    def __len__(self):
+        return len(self.people)
+
+    def _range(self, prefix):
+        return bisect_left(self._terms, prefix), bisect_left(self._terms, prefix + "\U0010ffff")
+
+    def lookup(self, query, limit=10, students=None):
+        query = _normalise(query)
+        tokens = query.split()
+        if not tokens:
+            return []
+        if students is not None:
+            results = self._scoped(query, tokens, students)[:limit]
+            return [{key: person[key] for key in FIELDS} for person in results]
+        results, seen = [], set()
+
+        def walk(start, stop, others=()):
+            # Bounded, so a vague multi-word query can't scan the whole index.
+            for position in range(start, min(stop, start + MAX_SCAN)):
+                i = self._owners[position]
+                if i in seen:
+                    continue
+                seen.add(i)
+                if all(any(term.startswith(t) for term in self._words[i]) for t in others):
+                    results.append(self.people[i])
+                    if len(results) >= limit:
+                        return
+
+        # Names typed in order first, then any order: walk the narrowest
+        # word's range and check the other words per person.
+        walk(*self._range(query))
+        if len(tokens) > 1 and len(results) < limit:
+            ranges = {t: self._range(t) for t in tokens}
+            anchor = min(tokens, key=lambda t: ranges[t][1] - ranges[t][0])
+            walk(*ranges[anchor], others=[t for t in tokens if t is not anchor])
+        return [{key: person[key] for key in FIELDS} for person in results]
+
+    def _scoped(self, query, tokens, students):
+        # Same order as the walk: the whole query in term order, then the
+        # other matches in the order of the anchor word's terms.
+        ranges = {t: self._range(t) for t in tokens}
+        anchor = min(tokens, key=lambda t: ranges[t][1] - ranges[t][0])
+        in_order, any_order = [], []
+        for student_id in students:
+            i = self._positions.get(student_id)
+            if i is None:
+                continue
+            words = self._words[i]
+            hits = [term for term in words if term.startswith(query)]
+            if hits:
+                in_order.append((min(hits), i))
+            elif len(tokens) > 1 and all(any(term.startswith(t) for term in words) for t in tokens):
+                any_order.append((min(term for term in words if term.startswith(anchor)), i))
+        return [self.people[i] for _term, i in sorted(in_order) + sorted(any_order)]
+
+
+def build():
+    rows = Student.objects.values_list(
+        "pk", "user_id", "user__full_name", "user__short_name", "user__email", "user__identity_card_number",
+    ).order_by("user__full_name", "pk")
+    return PrefixIndex([
+        {"id": pk, "user_id": user_id, "name": name, "short_name": short_name or "", "email": email, "ic": ic}
+        for pk, user_id, name, short_name, email, ic in rows
+    ])
+
+
+def version():
+    return versions.get(VERSION)
+
+
+def bump():
+    """Have every process rebuild its index, once the transaction commits."""
+    versions.bump([VERSION])
+
+
+def _rebuild(current):
+    global _index, _index_version, _rebuilding
+    try:
+        built = build()
+        with _lock:
+            _index, _index_version = built, current
+    except Exception:
+        logger.warning("Typeahead index rebuild failed", exc_info=True)
+    finally:
+        _rebuilding = None
+        # The thread outlives the request; don't leave its connection open.
+        connection.close()
+
+
+def index():
+    """This process's index; a stale one is served while a newer one is built."""
+    global _index, _index_version, _rebuilding
+    current = version()
+    if _index is not None and _index_version == current:
+        return _index
+    with _lock:
+        if _index is None:
+            _index, _index_version = build(), current
+        elif _index_version != current:
+            if not getattr(settings, "TYPEAHEAD_BACKGROUND_REBUILD", True):
+                _index, _index_version = build(), current
+            elif _rebuilding != os.getpid():  # a rebuild isn't inherited across a fork
+                _rebuilding = os.getpid()
+                threading.Thread(target=_rebuild, args=(current,), name="typeahead-rebuild", daemon=True).start()
+        return _index
+
+
+def lookup(query, limit=None, students=None):
+    return index().lookup(query, limit or getattr(settings, "TYPEAHEAD_LIMIT", 10), students)
@@ -0,0 +1,56 @@
+# core/versions.py
+"""
+Version stamps for data that processes hold in memory (core.refdata,
+core.typeahead), shared through the database so every worker sees them.
+
+    get("typeahead")        the current stamp (0 until first bumped)
+    bump(["typeahead"])     give the stamps new values
+
+A stamp is a VersionStamp row. bump() writes it in the current
+transaction, so the new value commits or rolls back with the write that
+caused it. Values are random rather than incremented: a stamp that was
+bumped and rolled back never comes back to a value some process already
+built under.
+
+get() reads every stamp in one query and keeps them in this process for
+VERSION_STAMP_SECONDS (default 1), so a busy worker runs about one small
+query a second and other workers see a bump within that time. bump() drops
+the copy, so the bumping process sees its own change at once; get(name,
+fresh=True) skips the copy for reads that must not be stale.
+"""
+import secrets
+import time
+
+from django.conf import settings
+
+from .models import VersionStamp
+
+_stamps, _read_at = None, 0.0
+
+
+def get(name, fresh=False):
+    global _stamps, _read_at
+    now = time.monotonic()
+    stamps = _stamps
+    if fresh or stamps is None or now - _read_at >= getattr(settings, "VERSION_STAMP_SECONDS", 1):
+        stamps = dict(VersionStamp.objects.values_list("name", "value"))
+        _stamps, _read_at = stamps, now
+    return stamps.get(name, 0)
+
+
+def bump(names):
+    """Move these stamps; every process reloads once the transaction commits."""
+    global _stamps
+    VersionStamp.objects.bulk_create(
+        [VersionStamp(name=name, value=secrets.randbits(62)) for name in names],
+        update_conflicts=True,
+        unique_fields=["name"],
+        update_fields=["value"],
+    )
+    _stamps = None
+
+
+def clear():
+    """Forget this process's copy (tests roll stamps back behind its back)."""
+    global _stamps
+    _stamps = None
@@ -0,0 +1,51 @@
+# core/widgets.py
+"""
+Form widgets backed by the student typeahead (core.typeahead).
+
+Both render a text box that fetches suggestions from `src` (a typeahead
+endpoint URL) as the user types; templates/partials/_typeahead.html holds
+the script and must be included on the page.
+
+- TypeaheadInput: picking a suggestion fills the box with one of its
+  fields, e.g. the email.
+- TypeaheadSelect: for a ModelChoiceField; a hidden input carries the
+  picked id and the text box shows its label. Only the current value's
+  label is looked up, never the whole queryset.
+"""
+from django import forms
+
+
+class TypeaheadInput(forms.TextInput):
+    def __init__(self, src, fill="email", input_type="text", attrs=None):
+        super().__init__(attrs)
+        self.src, self.fill, self.input_type = src, fill, input_type
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context["widget"]["attrs"].update({
+            "data-typeahead-src": str(self.src),
+            "data-typeahead-fill": self.fill,
+            "autocomplete": "off",
+        })
+        return context
+
+
+class TypeaheadSelect(forms.Widget):
+    template_name = "core/widgets/typeahead_select.html"
+
+    def __init__(self, src, attrs=None):
+        super().__init__(attrs)
+        self.src = src
+        self.choices = ()  # set by the ModelChoiceField
+
+    def _label(self, value):
+        if value in (None, ""):
+            return ""
+        queryset = getattr(self.choices, "queryset", None)
+        obj = queryset.filter(pk=value).first() if queryset is not None else None
+        return self.choices.field.label_from_instance(obj) if obj else ""
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context["widget"].update({"src": str(self.src), "label": self._label(context["widget"]["value"])})
+        return context
@@ -1,10 +1,11 @@
 from django import forms
 from accounts.models import CustomUser
 from core.models import Department, Student, Course, Subject, ClassGroup, Lecturer
+from core.refdata import ReferenceChoiceField
 
 # ---------- ADMIN PROFILE FORM ----------
 class AdminProfileForm(forms.ModelForm):
-    department = forms.ModelChoiceField(
+    department = ReferenceChoiceField(
         queryset=Department.objects.all(),
         required=False,
         empty_label="Select Department",
@@ -0,0 +1,189 @@
+# dashboard/fragments.py
+"""
+Cached dashboard cards.
+
+The data behind each card is cached under a fixed key in the shared cache
+(settings.CACHES), so every worker sees the same entries. The receivers in
+dashboard.signals delete those keys, after the transaction commits, when
+the rows behind a card are written:
+
+    dashboard:admin:totals                      admin stat cards
+    dashboard:lecturer:<lecturer_id>:classes    a lecturer's class groups
+    dashboard:classgroup:<id>:<day>:students    one class card: students, % and today's marks
+    dashboard:student:<student_id>:<panel>      a student's enrollments, achievements or disciplinary actions
+    dashboard:notifications:<user_id>           a lecturer's unread notifications
+
+Each entry is stored with the generation of its key (a random value kept
+under <key>:generation) read before the card was built; invalidation moves
+the generation as well as deleting the entry. An entry built before an
+invalidation but written after it therefore never matches and is rebuilt
+on the next read instead of being served until it expires.
+
+A class card's key carries today's date, so "today's attendance" rolls over
+without an invalidation. DASHBOARD_CACHE_SECONDS (default 600) is only a
+backstop for writes no signal sees, such as a renamed course or a
+queryset.update(). Hits and misses per card are tallied in the process and
+added to counters in the cache at most every VIEW_METRICS_FLUSH_SECONDS,
+so a read costs no cache writes; stats() reads them back (the adminportal
+metrics page shows them).
+
+Each dashboard panel (dashboard.views *_panel) reads its own key, so one
+panel's writes never expire another's.
+"""
+import secrets
+import threading
+import time
+from collections import Counter as Tally
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+STUDENT_PANELS = ("enrollments", "achievements", "disciplinary")
+CARDS = ("admin", "lecturer", "classgroup", *STUDENT_PANELS, "notifications")
+STATS_PREFIX = "dashboard:stats:"
+
+_stats_lock = threading.Lock()
+_pending, _flushed_at = Tally(), time.monotonic()
+
+
+def admin_key():
+    return "dashboard:admin:totals"
+
+
+def lecturer_key(lecturer_id):
+    return f"dashboard:lecturer:{lecturer_id}:classes"
+
+
+def classgroup_key(classgroup_id, day=None):
+    return f"dashboard:classgroup:{classgroup_id}:{(day or date.today()).isoformat()}:students"
+
+
+def student_key(student_id, panel):
+    return f"dashboard:student:{student_id}:{panel}"
+
+
+def notifications_key(user_id):
+    return f"dashboard:notifications:{user_id}"
+
+
+def _timeout():
+    return getattr(settings, "DASHBOARD_CACHE_SECONDS", 600)
+
+
+def _count(card, hits=0, misses=0):
+    with _stats_lock:
+        _pending[f"{STATS_PREFIX}{card}:hits"] += hits
+        _pending[f"{STATS_PREFIX}{card}:misses"] += misses
+        due = time.monotonic() - _flushed_at >= getattr(settings, "VIEW_METRICS_FLUSH_SECONDS", 30)
+    if due:
+        flush_stats()
+
+
+def flush_stats():
+    """Add this process's pending hit/miss tallies to the shared counters."""
+    global _pending, _flushed_at
+    with _stats_lock:
+        pending, _pending, _flushed_at = _pending, Tally(), time.monotonic()
+    for key, n in pending.items():
+        if not n:
+            continue
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key, n)
+        except ValueError:  # evicted between add() and incr()
+            cache.set(key, n, timeout=None)
+
+
+def _generation_key(key):
+    return f"{key}:generation"
+
+
+def _read(keys):
+    """
+    ``keys`` maps ids to cache keys. Returns ({id: value} for the current
+    entries, {id: generation} to store rebuilt entries under), in one read.
+    """
+    found = cache.get_many([*keys.values(), *map(_generation_key, keys.values())])
+    generations = {ident: found.get(_generation_key(key)) for ident, key in keys.items()}
+    values = {
+        ident: found[key][1]
+        for ident, key in keys.items()
+        if key in found and found[key][0] == generations[ident]
+    }
+    return values, generations
+
+
+def _write(keys, built, generations):
+    cache.set_many({keys[ident]: (generations[ident], value) for ident, value in built.items()}, _timeout())
+
+
+def get(card, key, build):
+    """The cached value for ``key``, or build() it and cache the result."""
+    return get_many(card, {key: key}, lambda missing: {key: build()})[key]
+
+
+def get_many(card, keys, build):
+    """
+    ``keys`` maps ids to cache keys; ``build(missing_ids)`` returns
+    {id: value} for the ids not in the cache, in one go.
+    """
+    values, generations = _read(keys)
+    missing = [ident for ident in keys if ident not in values]
+    _count(card, hits=len(values), misses=len(missing))
+    if missing:
+        built = build(missing)
+        _write(keys, {ident: built[ident] for ident in missing}, generations)
+        values.update(built)
+    return values
+
+
+def warm(keys, build):
+    """
+    Fill the cache ahead of a request without touching the hit/miss
+    counters. ``keys`` maps ids to cache keys, as for get_many(); only the
+    missing ids are built. Returns how many entries were written.
+    """
+    values, generations = _read(keys)
+    missing = [ident for ident in keys if ident not in values]
+    if missing:
+        built = build(missing)
+        _write(keys, {ident: built[ident] for ident in missing}, generations)
+    return len(missing)
+
+
+def _expire(keys):
+    cache.set_many({_generation_key(key): secrets.randbits(62) for key in keys}, _timeout())
+    cache.delete_many(keys)
+
+
+def invalidate(keys):
+    """Expire cache keys once the current transaction (if any) commits."""
+    keys = list(keys)
+    if keys:
+        transaction.on_commit(lambda: _expire(keys))
+
+
+def stats():
+    """{card: {'hits', 'misses', 'hit_rate'}} since the last reset_stats()."""
+    flush_stats()
+    keys = [f"{STATS_PREFIX}{card}:{outcome}" for card in CARDS for outcome in ("hits", "misses")]
+    found = cache.get_many(keys)
+    result = {}
+    for card in CARDS:
+        hits = found.get(f"{STATS_PREFIX}{card}:hits", 0)
+        misses = found.get(f"{STATS_PREFIX}{card}:misses", 0)
+        total = hits + misses
+        result[card] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(100.0 * hits / total, 1) if total else None,
+        }
+    return result
+
+
+def reset_stats():
+    with _stats_lock:
+        _pending.clear()
+    cache.delete_many([f"{STATS_PREFIX}{card}:{outcome}" for card in CARDS for outcome in ("hits", "misses")])
@@ -0,0 +1,153 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from accounts.models import CustomUser
+from core.models import (
+    ClassGroup, Course, DisciplinaryAction, Enrollment, Student, StudentAchievement, attendance_changed,
+)
+from notifications.models import Notification
+
+from . import fragments, warmup
+
+
+def _enrollment_key(student_id):
+    return fragments.student_key(student_id, 'enrollments')
+
+
+def _student_keys(classgroup_ids):
+    student_ids = (
+        Enrollment.objects.filter(class_group_id__in=classgroup_ids)
+        .values_list('student_id', flat=True).distinct()
+    )
+    return [_enrollment_key(pk) for pk in student_ids]
+
+
+def _classgroup_keys(classgroup_ids):
+    return [fragments.classgroup_key(pk) for pk in classgroup_ids]
+
+
+@receiver(attendance_changed)
+def invalidate_on_attendance(sender, enrollment_ids, **kwargs):
+    pairs = Enrollment.objects.filter(pk__in=enrollment_ids).values_list('student_id', 'class_group_id')
+    keys = set()
+    for student_id, classgroup_id in pairs:
+        keys.update((_enrollment_key(student_id), fragments.classgroup_key(classgroup_id)))
+    fragments.invalidate(keys)
+
+
+@receiver(pre_save, sender=Enrollment)
+def remember_enrollment_class(sender, instance, raw=False, **kwargs):
+    instance._dashboard_previous = None
+    if instance.pk and not raw:
+        instance._dashboard_previous = (
+            Enrollment.objects.filter(pk=instance.pk).values_list('student_id', 'class_group_id').first()
+        )
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def invalidate_on_enrollment(sender, instance, **kwargs):
+    keys = {_enrollment_key(instance.student_id), fragments.classgroup_key(instance.class_group_id)}
+    previous = getattr(instance, '_dashboard_previous', None)
+    if previous:
+        keys.update((_enrollment_key(previous[0]), fragments.classgroup_key(previous[1])))
+    fragments.invalidate(keys)
+
+
+@receiver(post_save, sender=StudentAchievement)
+@receiver(post_delete, sender=StudentAchievement)
+def invalidate_achievements(sender, instance, **kwargs):
+    fragments.invalidate([fragments.student_key(instance.student_id, 'achievements')])
+
+
+@receiver(post_save, sender=DisciplinaryAction)
+@receiver(post_delete, sender=DisciplinaryAction)
+def invalidate_disciplinary_actions(sender, instance, **kwargs):
+    fragments.invalidate([fragments.student_key(instance.student_id, 'disciplinary')])
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def invalidate_notifications(sender, instance, **kwargs):
+    fragments.invalidate([fragments.notifications_key(instance.lecturer_id)])
+
+
+@receiver(m2m_changed, sender=ClassGroup.lecturers.through)
+def invalidate_on_lecturer_assignment(sender, instance, action, reverse, pk_set, **kwargs):
+    # Clears report no pk_set after the fact, so they are handled before.
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:  # lecturer.classgroups.add(...)
+        lecturer_ids = [instance.pk]
+        classgroup_ids = pk_set if action != 'pre_clear' else list(instance.classgroups.values_list('pk', flat=True))
+    else:  # classgroup.lecturers.add(...)
+        classgroup_ids = [instance.pk]
+        lecturer_ids = pk_set if action != 'pre_clear' else list(instance.lecturers.values_list('pk', flat=True))
+    # Students' class panels show each class's lecturer.
+    fragments.invalidate(
+        [fragments.lecturer_key(pk) for pk in lecturer_ids] + _student_keys(classgroup_ids)
+    )
+
+
+@receiver(post_save, sender=ClassGroup)
+@receiver(pre_delete, sender=ClassGroup)
+def invalidate_on_classgroup(sender, instance, **kwargs):
+    # pre_delete: the lecturer links and enrollments are still there to look up.
+    lecturer_ids = instance.lecturers.values_list('pk', flat=True) if instance.pk else []
+    fragments.invalidate(
+        [fragments.lecturer_key(pk) for pk in lecturer_ids]
+        + _classgroup_keys([instance.pk])
+        + _student_keys([instance.pk])
+    )
+
+
+@receiver(pre_save, sender=Student)
+def remember_student_class(sender, instance, raw=False, **kwargs):
+    instance._dashboard_class = None
+    if not instance.pk or raw:
+        return
+    instance._dashboard_class = Student.objects.filter(pk=instance.pk).values_list('class_group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_class_cards_on_student(sender, instance, raw=False, **kwargs):
+    # Class cards list Student.class_group's students.
+    if raw:
+        return
+    classgroup_ids = {instance.class_group_id, getattr(instance, '_dashboard_class', None)} - {None}
+    fragments.invalidate(_classgroup_keys(classgroup_ids))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_class_cards_on_student_user(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Class cards show each student's name and email.
+    if raw or instance.role != CustomUser.Role.STUDENT:
+        return
+    if update_fields is not None and not {'full_name', 'short_name', 'email'} & set(update_fields):
+        return
+    classgroup_ids = Student.objects.filter(user=instance).exclude(class_group=None).values_list('class_group_id', flat=True)
+    fragments.invalidate(_classgroup_keys(classgroup_ids))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_admin_totals_on_user(sender, instance, created, update_fields=None, **kwargs):
+    # Logins only touch last_login; everything else may move a role total.
+    if created or update_fields is None or {'role'} & set(update_fields):
+        fragments.invalidate([fragments.admin_key()])
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_admin_totals(sender, instance, **kwargs):
+    fragments.invalidate([fragments.admin_key()])
+
+
+@receiver(user_logged_in)
+def warm_on_login(sender, request, user, **kwargs):
+    user_id = user.pk
+    transaction.on_commit(lambda: warmup.schedule(user_id))
@@ -1,3 +1,287 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from core.models import Attendance, DisciplinaryAction, StudentAchievement
+from dashboard import fragments
+from core.tests import FAST_HASHERS, enroll_students, make_classgroup
+from lecturer.tests import make_lecturer
+from notifications.models import Notification
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, VIEW_METRICS_SAMPLE_RATE=0, ACTIVITY_FLUSH_SECONDS=3600, DASHBOARD_CACHE_SECONDS=0)
+class LecturerDashboardTests(TestCase):
+    # Measures the uncached build; DashboardCacheTests covers the cache.
+    def setUp(self):
+        cache.clear()
+        self.classgroups = [make_classgroup(f"CG{i}") for i in range(3)]
+        user = make_lecturer(self.classgroups[0])
+        for cg in self.classgroups[1:]:
+            cg.lecturers.add(user.lecturer)
+        self.client.force_login(user)
+        self.url = reverse("dashboard:classes_panel")
+
+    def _queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_students(self):
+        for i, cg in enumerate(self.classgroups):
+            enroll_students(cg, 2, prefix=f"a{i}")
+        _, small = self._queries()
+        for i, cg in enumerate(self.classgroups):
+            enroll_students(cg, 15, prefix=f"b{i}")
+        response, large = self._queries()
+
+        self.assertEqual(large, small)
+        self.assertLessEqual(large, 6)  # session, user, lecturer, classes, students, today's marks
+        self.assertEqual(response.context["total_students"], 51)
+
+    def test_percentages_come_from_summaries(self):
+        first, second = enroll_students(self.classgroups[0], 2)
+        Attendance.objects.record_sheet([
+            Attendance(enrollment=first, date=date(2025, 1, 6), session="morning", status="present"),
+            Attendance(enrollment=first, date=date(2025, 1, 6), session="evening", status="absent"),
+            Attendance(enrollment=first, date=date(2025, 1, 7), session="morning", status="present"),
+            Attendance(enrollment=first, date=date(2025, 1, 7), session="evening", status="late"),
+        ])
+        response, _ = self._queries()
+        infos = {i["student"].pk: i for i in response.context["classes_data"][0]["students_info"]}
+        self.assertEqual(infos[first.student.pk]["attendance_percentage"], 75.0)  # late counts as attended
+        self.assertEqual(infos[second.student.pk]["attendance_percentage"], 0.0)
+        self.assertEqual(infos[first.student.pk]["enrollment_id"], first.pk)
+        self.assertEqual(response.context["average_attendance"], 37.5)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, VIEW_METRICS_SAMPLE_RATE=0, ACTIVITY_FLUSH_SECONDS=3600)
+class AdminDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_totals_come_from_counters(self):
+        admin = CustomUser.objects.create_user(
+            email="admin@example.com", identity_card_number="ADM-1", full_name="Admin", role=CustomUser.Role.ADMIN,
+        )
+        classgroup = make_classgroup()
+        enroll_students(classgroup, 3)
+        make_lecturer(classgroup)
+        self.client.force_login(admin)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("dashboard:main_dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if "COUNT(" in q["sql"]])
+        self.assertEqual(
+            [response.context[k] for k in ("total_lecturers", "total_students", "total_courses", "total_users")],
+            [1, 3, 1, 5],
+        )
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, VIEW_METRICS_SAMPLE_RATE=0, ACTIVITY_FLUSH_SECONDS=3600)
+class DashboardPanelTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.classgroup = make_classgroup()
+        self.enrollment = enroll_students(self.classgroup, 1)[0]
+        self.student_user = self.enrollment.student.user
+        self.lecturer_user = make_lecturer(self.classgroup)
+
+    def _shell_queries(self, user):
+        self.client.force_login(user)
+        cache.clear()  # compare cold shells
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("dashboard:main_dashboard"))
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_shell_cost_does_not_depend_on_panel_data(self):
+        _, small = self._shell_queries(self.student_user)
+        student = self.enrollment.student
+        StudentAchievement.objects.bulk_create(
+            [StudentAchievement(student=student, title=f"Award {i}") for i in range(20)]
+        )
+        enroll_students(make_classgroup("CG2"), 10, prefix="x")
+        response, large = self._shell_queries(self.student_user)
+        self.assertEqual(large, small)
+        for panel in ("classes_panel", "achievements_panel", "disciplinary_panel"):
+            self.assertContains(response, f'data-panel-src="{reverse(f"dashboard:{panel}")}"')
+
+        response, _ = self._shell_queries(self.lecturer_user)
+        self.assertContains(response, f'data-panel-src="{reverse("dashboard:notifications_panel")}"')
+
+    def test_panels_are_limited_to_their_roles(self):
+        self.client.force_login(self.student_user)
+        self.assertEqual(self.client.get(reverse("dashboard:notifications_panel")).status_code, 403)
+        self.client.force_login(self.lecturer_user)
+        self.assertEqual(self.client.get(reverse("dashboard:achievements_panel")).status_code, 403)
+        response = self.client.get(reverse("dashboard:classes_panel"))
+        self.assertContains(response, self.classgroup.name)
+
+    def test_notifications_panel_follows_new_notifications(self):
+        self.client.force_login(self.lecturer_user)
+        response = self.client.get(reverse("dashboard:notifications_panel"))
+        self.assertEqual(response.context["notifications_unread_count"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(lecturer=self.lecturer_user, message="Room changed")
+        response = self.client.get(reverse("dashboard:notifications_panel"))
+        self.assertEqual(response.context["notifications_unread_count"], 1)
+        self.assertContains(response, "Room changed")
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, VIEW_METRICS_SAMPLE_RATE=0, ACTIVITY_FLUSH_SECONDS=3600)
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        fragments.reset_stats()
+        self.classgroup = make_classgroup()
+        self.enrollments = enroll_students(self.classgroup, 2)
+        self.lecturer_user = make_lecturer(self.classgroup)
+
+    def _get(self, user, panel="classes_panel"):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(f"dashboard:{panel}"))
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_lecturer_cards_are_cached_until_attendance_is_written(self):
+        _, cold = self._get(self.lecturer_user)
+        response, warm = self._get(self.lecturer_user)
+        self.assertLess(warm, cold)
+        self.assertEqual(response.context["todays_attendance_count"], 0)
+        self.assertEqual(fragments.stats()["classgroup"], {"hits": 1, "misses": 1, "hit_rate": 50.0})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.record_sheet([
+                Attendance(enrollment=self.enrollments[0], date=date.today(), session="morning", status="present")
+            ])
+        response, _ = self._get(self.lecturer_user)
+        self.assertEqual(response.context["todays_attendance_count"], 1)
+        self.assertEqual(response.context["average_attendance"], 50.0)
+
+    def test_lecturer_class_list_follows_assignments(self):
+        self._get(self.lecturer_user)
+        other = make_classgroup("CG2")
+        with self.captureOnCommitCallbacks(execute=True):
+            other.lecturers.add(self.lecturer_user.lecturer)
+        response, _ = self._get(self.lecturer_user)
+        self.assertEqual(len(response.context["classes_data"]), 2)
+
+    def test_class_cards_follow_roster_and_name_changes(self):
+        newcomer = enroll_students(make_classgroup("CG2"), 1, prefix="n")[0].student
+        self._get(self.lecturer_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            newcomer.class_group = self.classgroup
+            newcomer.save()
+        response, _ = self._get(self.lecturer_user)
+        self.assertEqual(len(response.context["classes_data"][0]["students_info"]), 3)
+
+        user = newcomer.user
+        with self.captureOnCommitCallbacks(execute=True):
+            user.full_name = "Renamed Student"
+            user.save()
+        response, _ = self._get(self.lecturer_user)
+        names = {info["full_name"] for info in response.context["classes_data"][0]["students_info"]}
+        self.assertIn("Renamed Student", names)
+
+    @override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "dashboard_test_cache",
+    }})
+    def test_invalidation_reaches_other_workers_through_the_shared_cache(self):
+        call_command("createcachetable", verbosity=0)
+        other_worker = DatabaseCache("dashboard_test_cache", {})
+        key = fragments.classgroup_key(self.classgroup.pk)
+        self._get(self.lecturer_user)
+        self.assertIsNotNone(other_worker.get(key))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.record_sheet([
+                Attendance(enrollment=self.enrollments[0], date=date.today(), session="morning", status="present")
+            ])
+        self.assertIsNone(other_worker.get(key))
+
+    def test_entry_built_before_an_invalidation_is_not_served(self):
+        key = fragments.student_key(0, "achievements")
+
+        def build_racing_a_write():
+            with self.captureOnCommitCallbacks(execute=True):
+                fragments.invalidate([key])  # lands while the card is being built
+            return "stale"
+
+        self.assertEqual(fragments.get("achievements", key, build_racing_a_write), "stale")
+        self.assertEqual(fragments.get("achievements", key, lambda: "fresh"), "fresh")
+        self.assertEqual(fragments.get("achievements", key, lambda: "rebuilt"), "fresh")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            fragments.invalidate([key])
+        self.assertEqual(fragments.warm({0: key}, lambda ids: {0: build_racing_a_write()}), 1)
+        self.assertEqual(fragments.get("achievements", key, lambda: "warmed late"), "warmed late")
+
+    def test_student_cards_follow_achievements(self):
+        enrollment = self.enrollments[0]
+        response, _ = self._get(enrollment.student.user, "achievements_panel")
+        self.assertEqual(response.context["achievements"], [])
+        self._get(enrollment.student.user, "disciplinary_panel")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentAchievement.objects.create(student=enrollment.student, title="Top marks", date_awarded=date.today())
+        response, _ = self._get(enrollment.student.user, "achievements_panel")
+        self.assertEqual([a.title for a in response.context["achievements"]], ["Top marks"])
+        # Other panels keep their entries.
+        self.assertEqual(fragments.stats()["disciplinary"]["misses"], 1)
+        self._get(enrollment.student.user, "disciplinary_panel")
+        self.assertEqual(fragments.stats()["disciplinary"], {"hits": 1, "misses": 1, "hit_rate": 50.0})
+
+
+@override_settings(
+    PASSWORD_HASHERS=FAST_HASHERS, VIEW_METRICS_SAMPLE_RATE=0, ACTIVITY_FLUSH_SECONDS=3600, DASHBOARD_WARMUP_THREADS=0,
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "warmup_test_cache"}},
+)
+class LoginWarmupTests(TestCase):
+    def setUp(self):
+        call_command("createcachetable", verbosity=0)
+        cache.clear()
+        fragments.reset_stats()
+        self.classgroup = make_classgroup()
+        self.enrollment = enroll_students(self.classgroup, 2)[0]
+
+    def _login(self, user):
+        user.set_password("pw")
+        user.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("accounts:login"), {"identifier": user.email, "password": "pw"})
+        self.assertRedirects(response, reverse("dashboard:main_dashboard"), fetch_redirect_response=False)
+
+    def test_student_dashboard_is_warm_after_login(self):
+        self._login(self.enrollment.student.user)
+        for panel in fragments.STUDENT_PANELS:
+            self.assertIsNotNone(cache.get(fragments.student_key(self.enrollment.student_id, panel)))
+        for panel in ("classes_panel", "achievements_panel", "disciplinary_panel"):
+            self.client.get(reverse(f"dashboard:{panel}"))
+        stats = fragments.stats()
+        self.assertEqual([stats[panel]["misses"] for panel in fragments.STUDENT_PANELS], [0, 0, 0])
+
+    def test_lecturer_classes_and_rosters_are_warm_after_login(self):
+        user = make_lecturer(self.classgroup)
+        self._login(user)
+        response = self.client.get(reverse("dashboard:classes_panel"))
+        self.assertEqual(response.context["total_students"], 2)
+        self.client.get(reverse("dashboard:notifications_panel"))
+        stats = fragments.stats()
+        self.assertEqual([stats[card]["misses"] for card in ("lecturer", "classgroup", "notifications")], [0, 0, 0])
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_no_warm_up_with_a_per_process_cache(self):
+        self._login(self.enrollment.student.user)
+        for panel in fragments.STUDENT_PANELS:
+            self.assertIsNone(cache.get(fragments.student_key(self.enrollment.student_id, panel)))
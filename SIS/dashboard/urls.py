@@ -1,11 +1,16 @@
 from django.urls import path
 from .views import unified_dashboard, profile_view, profile_update
+from .views import classes_panel, notifications_panel, achievements_panel, disciplinary_panel
 from .views import parent_update
 
 app_name = "dashboard"
 
 urlpatterns = [
     path('', unified_dashboard, name='main_dashboard'),
+    path('panels/classes/', classes_panel, name='classes_panel'),
+    path('panels/notifications/', notifications_panel, name='notifications_panel'),
+    path('panels/achievements/', achievements_panel, name='achievements_panel'),
+    path('panels/disciplinary/', disciplinary_panel, name='disciplinary_panel'),
     path('profile/', profile_view, name='profile'),
     path('profile/update/', profile_update, name='profile_update'),
     path("guardian/<int:pk>/update/", parent_update, name="parent_update"),
@@ -1,11 +1,18 @@
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseForbidden
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils import timezone
 from datetime import date
-from django.db.models import Count, Q, DecimalField, F, Avg, FloatField, ExpressionWrapper
+from django.db.models import Count, Q, DecimalField, F, Avg, FloatField, ExpressionWrapper, Case, When, Value, FilteredRelation
+from django.db.models.functions import Coalesce, Round
+from accounts.decorators import role_required
 from accounts.models import CustomUser
+from core import counters
+from core.attendance import AttendanceReport, attended_statuses
+from core.catalog import catalog
 from core.models import (
+    Counter,
     Course,
     Lecturer,
     Student,
@@ -19,6 +26,8 @@ from notifications.models import Notification
 
 from django.urls import reverse
 
+from . import fragments
+
 # dashboard/views.py
 from datetime import date
 from django.utils import timezone
@@ -32,12 +41,145 @@ from core.models import (
     StudentAchievement, DisciplinaryAction,
 )
 
-@login_required
-def unified_dashboard(request):
-    user = request.user
 
-    # -------- Safe defaults used by dashboard.html for ALL roles --------
-    context = {
+def _admin_totals():
+    return Counter.objects.get_many([
+        counters.role_key(CustomUser.Role.LECTURER), counters.role_key(CustomUser.Role.STUDENT),
+        counters.COURSES, counters.USERS,
+    ])
+
+
+def _lecturer_classgroups(lecturer):
+    """The lecturer's classes: what the dashboard lists and what lecturer views allow."""
+    return list(ClassGroup.objects.filter(lecturers=lecturer).select_related('course'))
+
+
+def _class_cards(classgroup_ids, today):
+    """Lecturer dashboard card data for each class group: {id: {'students_info', 'marked_today'}}."""
+    # One query for every student in the classes, LEFT JOINed to their
+    # enrollment (and its summary) in that class; percentage in SQL under
+    # the attendance policy.
+    counts = {
+        status: Coalesce(F(f'class_enrollment__attendance_summary__{status}_count'), 0)
+        for status in ('present', 'absent', 'late', 'excused')
+    }
+    students = (
+        CoreStudent.objects
+        .filter(class_group__in=classgroup_ids)
+        .select_related('user')
+        .annotate(class_enrollment=FilteredRelation(
+            'enrollment', condition=Q(enrollment__class_group=F('class_group')),
+        ))
+        .annotate(
+            enrollment_id=F('class_enrollment__id'),
+            date_enrolled=F('class_enrollment__date_enrolled'),
+            attended=sum(counts[status] for status in attended_statuses()),
+            marked=counts['present'] + counts['absent'] + counts['late'] + counts['excused'],
+        )
+        .annotate(attendance_percentage=Case(
+            When(marked__gt=0, then=Round(Value(100.0) * F('attended') / F('marked'), 2)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ))
+        .order_by('class_group_id', 'pk')
+    )
+    cards = {cg_id: {'students_info': [], 'marked_today': set()} for cg_id in classgroup_ids}
+    for student in students:
+        cards[student.class_group_id]['students_info'].append({
+            'student': student,
+            'email': student.user.email,
+            'full_name': student.user.get_full_name(),
+            'date_enrolled': student.date_enrolled,
+            'attendance_percentage': student.attendance_percentage,
+            'enrollment_id': student.enrollment_id,
+        })
+
+    marked_today = (
+        Attendance.objects
+        .filter(enrollment__class_group__in=classgroup_ids, date=today)
+        .values_list('enrollment__class_group_id', 'enrollment__student_id')
+        .distinct()
+    )
+    for cg_id, student_id in marked_today:
+        cards[cg_id]['marked_today'].add(student_id)
+    return cards
+
+
+def _student_enrollments(student):
+    enrollments_qs = (
+        Enrollment.objects
+        .filter(student=student)
+        .select_related('class_group__course')
+        .prefetch_related('class_group__lecturers__user')
+    )
+    report = AttendanceReport(Enrollment.objects.filter(student=student))
+
+    enrollments_list = []
+    for enrollment in enrollments_qs:
+        enrollments_list.append({
+            'class_group': enrollment.class_group,
+            'attendance_percentage': round(report[enrollment.id].percentage or 0.0, 0),
+            'enrollment': enrollment,
+        })
+    return enrollments_list
+
+
+def _student_achievements(student):
+    return list(StudentAchievement.objects.filter(student=student).order_by("-date_awarded"))
+
+
+def _student_disciplinary_actions(student):
+    return list(DisciplinaryAction.objects.filter(student=student).order_by('-date'))
+
+
+_STUDENT_PANELS = {
+    'enrollments': _student_enrollments,
+    'achievements': _student_achievements,
+    'disciplinary': _student_disciplinary_actions,
+}
+
+
+def _student_panel(student, panel):
+    return fragments.get(panel, fragments.student_key(student.pk, panel), lambda: _STUDENT_PANELS[panel](student))
+
+
+def _subjects_count(student):
+    return len(catalog(student.class_group_id)['subjects']) if student.class_group_id else 0
+
+
+def _lecturer_overview(lecturer):
+    """Stat cards and class list for the lecturer's classes panel."""
+    classgroups = fragments.get('lecturer', fragments.lecturer_key(lecturer.pk), lambda: _lecturer_classgroups(lecturer))
+    today = date.today()
+    cards = fragments.get_many(
+        'classgroup',
+        {cg.id: fragments.classgroup_key(cg.id, today) for cg in classgroups},
+        lambda ids: _class_cards(ids, today),
+    )
+    by_class = {cg_id: card['students_info'] for cg_id, card in cards.items()}
+    todays_attendance_count = len(set().union(*(card['marked_today'] for card in cards.values())))
+
+    classes_data = [
+        {'classgroup': cg, 'students_info': by_class[cg.id]} for cg in classgroups
+    ]
+    attendance_values = [info['attendance_percentage'] for infos in by_class.values() for info in infos]
+    avg_att = round(sum(attendance_values) / len(attendance_values), 2) if attendance_values else 0
+    return {
+        'classes_data': classes_data,
+        'total_students': len(attendance_values),
+        'average_attendance': avg_att,
+        'todays_attendance_count': todays_attendance_count,
+    }
+
+
+def _lecturer_notifications(user):
+    unread = Notification.objects.filter(lecturer=user, is_read=False)
+    return {'notifications': list(unread[:5]), 'notifications_unread_count': unread.count()}
+
+
+def _dashboard_defaults():
+    """Safe defaults used by dashboard.html for ALL roles."""
+    return {
         # admin defaults
         'total_lecturers': 0,
         'total_students': 0,
@@ -46,165 +188,62 @@ def unified_dashboard(request):
 
         # lecturer defaults
         'lecturer': None,
-        'classes_data': [],
-        'notifications': [],
-        'notifications_unread_count': 0,
-        'total_students': 0,
-        'average_attendance': 0,
-        'todays_attendance_count': 0,
 
         # student defaults
         'subjects_count': 0,
         'attendance_streak': 0,
-        'enrollments': [],
-        'achievements': [],
-        'disciplinary_actions': [],
         "profile_url_name": "dashboard:profile",
 
         # role switch for the template
         'dashboard_mode': None,
     }
 
+
+@login_required
+def unified_dashboard(request):
+    """
+    The dashboard shell. It renders from a few constant-cost reads; the
+    panels below (*_panel) are fetched by the page after first paint.
+    """
+    user = request.user
+
+    context = _dashboard_defaults()
+
     # ---------------- Admin ----------------
     if user.role == CustomUser.Role.ADMIN:
+        totals = fragments.get('admin', fragments.admin_key(), _admin_totals)
         context.update({
-            'total_lecturers': CustomUser.objects.filter(role=CustomUser.Role.LECTURER).count(),
-            'total_students': CustomUser.objects.filter(role=CustomUser.Role.STUDENT).count(),
-            'total_courses': Course.objects.count(),
-            'total_users': CustomUser.objects.count(),
+            'total_lecturers': totals[counters.role_key(CustomUser.Role.LECTURER)],
+            'total_students': totals[counters.role_key(CustomUser.Role.STUDENT)],
+            'total_courses': totals[counters.COURSES],
+            'total_users': totals[counters.USERS],
             'dashboard_mode': 'admin',
         })
 
     # ---------------- Lecturer ----------------
     elif user.role == CustomUser.Role.LECTURER:
         # IMPORTANT: use the *core* Lecturer model, not the accounts proxy
-        lecturer = CoreLecturer.objects.filter(user=user).select_related('department').first()
+        lecturer = CoreLecturer.objects.filter(user=user).select_related('user', 'department').first()
         if not lecturer:
             messages.error(request, "Lecturer profile missing. Please contact admin.")
             return redirect('accounts:login')
 
-        classgroups = ClassGroup.objects.filter(lecturers=lecturer)
-        enrollments = (
-            Enrollment.objects
-            .filter(class_group__in=classgroups)
-            .select_related('student__user', 'class_group')
-        )
-
-        today = date.today()
-        todays_attendance_count = (
-            Attendance.objects
-            .filter(enrollment__in=enrollments, date=today)
-            .values('enrollment__student').distinct().count()
-        )
-
-        classes_data, total_students, attendance_values = [], 0, []
-        # Build per-class student info
-        for cg in classgroups:
-            students_info = []
-            # cg.students is the reverse of Student.class_group (core Student model)
-            for student in cg.students.select_related('user').all():
-                enrollment = enrollments.filter(student=student, class_group=cg).first()
-                if enrollment:
-                    qs = Attendance.objects.filter(enrollment=enrollment)
-                    total = qs.count()
-                    present = qs.filter(status='present').count()
-                    pct = (present / total * 100) if total else 0
-                else:
-                    pct = 0
-                students_info.append({
-                    'student': student,
-                    'email': student.user.email,
-                    'full_name': student.user.get_full_name(),
-                    'date_enrolled': getattr(enrollment, "date_enrolled", None),
-                    'attendance_percentage': round(pct, 2),
-                    'enrollment': enrollment,
-                })
-                attendance_values.append(pct)
-
-            total_students += len(students_info)
-            classes_data.append({'classgroup': cg, 'students_info': students_info})
-
-        avg_att = round(sum(attendance_values) / len(attendance_values), 2) if attendance_values else 0
-
-        # Optional notifications (guarded)
-        notifications = []
-        unread = 0
-        try:
-            from notifications.models import Notification  # adjust or remove if you don’t have it
-            notifications = Notification.objects.filter(lecturer=user, is_read=False)
-            unread = notifications.count()
-        except Exception:
-            pass
-
         context.update({
             'lecturer': lecturer,
-            'classes_data': classes_data,
-            'notifications': notifications,
-            'notifications_unread_count': unread,
-            'total_students': total_students,
-            'average_attendance': avg_att,
-            'todays_attendance_count': todays_attendance_count,
             'dashboard_mode': 'lecturer',
         })
 
     # ---------------- Student ----------------
     elif user.role == CustomUser.Role.STUDENT:
         try:
-            student = CoreStudent.objects.select_related("class_group__course").get(user=user)
-            student.latest_activity = timezone.now()
-            student.save(update_fields=['latest_activity'])
+            student = CoreStudent.objects.select_related("class_group__course", "attendance_streak").get(user=user)
         except CoreStudent.DoesNotExist:
             messages.error(request, "Student profile missing. Please contact admin.")
             return redirect('accounts:login')
 
-        NON_ABSENT = ("present", "late", "excused")
-
-        enrollments_qs = (
-            Enrollment.objects
-            .filter(student=student)
-            .select_related('class_group__course')
-            .prefetch_related('class_group__lecturers__user')
-        )
-
-        enrollments_list = []
-        for enrollment in enrollments_qs:
-            aqs = Attendance.objects.filter(enrollment=enrollment)
-            total = aqs.count()
-            present_like = aqs.filter(status__in=NON_ABSENT).count()
-            pct = (present_like / total * 100) if total else 0.0
-            enrollments_list.append({
-                'class_group': enrollment.class_group,
-                'attendance_percentage': round(pct, 0),
-                'enrollment': enrollment,
-            })
-
-        subjects_count = (
-            student.class_group.course.subjects.count()
-            if student.class_group and student.class_group.course_id
-            else 0
-        )
-
-        streak = 0
-        for status in (
-            Attendance.objects
-            .filter(enrollment__student=student)
-            .order_by("-date", "-session")
-            .values_list("status", flat=True)
-        ):
-            if status in NON_ABSENT:
-                streak += 1
-            else:
-                break
-
-        achievements_qs = StudentAchievement.objects.filter(student=student).order_by("-date_awarded")
-        disciplinary_qs = DisciplinaryAction.objects.filter(student=student).order_by('-date')
-
         context.update({
-            'subjects_count': subjects_count,
-            'attendance_streak': streak,
-            'enrollments': enrollments_list,
-            'achievements': achievements_qs,
-            'disciplinary_actions': disciplinary_qs,
+            'subjects_count': _subjects_count(student),
+            'attendance_streak': student.current_streak,
             'dashboard_mode': 'student',
         })
 
@@ -216,6 +255,48 @@ def unified_dashboard(request):
     return render(request, "dashboard/dashboard.html", context)
 
 
+# ---------- Dashboard panels ----------
+# Each panel has its own URL name, so ViewMetricsMiddleware times it on its
+# own, and reads its own fragments key.
+
+@login_required
+def classes_panel(request):
+    user = request.user
+    if user.role == CustomUser.Role.LECTURER:
+        lecturer = get_object_or_404(CoreLecturer, user=user)
+        return render(request, "dashboard/partials/panels/lecturer_classes.html", _lecturer_overview(lecturer))
+    if user.role == CustomUser.Role.STUDENT:
+        student = get_object_or_404(CoreStudent, user=user)
+        return render(request, "dashboard/partials/panels/student_classes.html", {
+            'enrollments': _student_panel(student, 'enrollments'),
+        })
+    return HttpResponseForbidden("You are not authorized to view this page.")
+
+
+@role_required(CustomUser.Role.LECTURER)
+def notifications_panel(request):
+    context = fragments.get(
+        'notifications', fragments.notifications_key(request.user.pk), lambda: _lecturer_notifications(request.user),
+    )
+    return render(request, "dashboard/partials/panels/notifications.html", context)
+
+
+@role_required(CustomUser.Role.STUDENT)
+def achievements_panel(request):
+    student = get_object_or_404(CoreStudent, user=request.user)
+    return render(request, "dashboard/partials/panels/achievements.html", {
+        'achievements': _student_panel(student, 'achievements'),
+    })
+
+
+@role_required(CustomUser.Role.STUDENT)
+def disciplinary_panel(request):
+    student = get_object_or_404(CoreStudent, user=request.user)
+    return render(request, "dashboard/partials/panels/disciplinary.html", {
+        'disciplinary_actions': _student_panel(student, 'disciplinary'),
+    })
+
+
 # ========== Unified Profile View ==========
 
 @login_required
@@ -0,0 +1,105 @@
+# dashboard/warmup.py
+"""
+Pre-compute a user's dashboard cards right after login.
+
+dashboard.signals queues warm_user() on user_logged_in (after commit) on a
+small background thread pool, so the redirect to dashboard:main_dashboard
+usually lands on cached cards:
+
+    admin      totals
+    lecturer   class list (the scope lecturer views allow), each class card (roster, %)
+               and unread notifications
+    student    enrollments, achievements and disciplinary actions
+
+The warm-up only runs when the default cache is shared between workers
+(e.g. DatabaseCache or Redis). With a per-process backend (LocMemCache,
+DummyCache) the entries would only serve the worker that happened to handle
+the login, so schedule() does nothing.
+
+DASHBOARD_WARMUP_THREADS (default 2) sizes the pool; 0 runs the warm-up
+inline in the login request instead.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+
+from accounts.models import CustomUser
+from core.models import Lecturer, Student
+
+from . import fragments
+from .views import _STUDENT_PANELS, _admin_totals, _class_cards, _lecturer_classgroups, _lecturer_notifications
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pool, _pool_pid = None, None
+
+
+def warm_user(user_id):
+    """Cache whatever cards the user's dashboard will read; returns entries written."""
+    role = CustomUser.objects.filter(pk=user_id).values_list('role', flat=True).first()
+    if role == CustomUser.Role.ADMIN:
+        return fragments.warm({0: fragments.admin_key()}, lambda ids: {0: _admin_totals()})
+
+    if role == CustomUser.Role.LECTURER:
+        lecturer = Lecturer.objects.filter(user_id=user_id).select_related('user').first()
+        if not lecturer:
+            return 0
+        classgroups = _lecturer_classgroups(lecturer)
+        today = date.today()
+        written = fragments.warm({lecturer.pk: fragments.lecturer_key(lecturer.pk)}, lambda ids: {lecturer.pk: classgroups})
+        written += fragments.warm(
+            {cg.id: fragments.classgroup_key(cg.id, today) for cg in classgroups},
+            lambda ids: _class_cards(ids, today),
+        )
+        return written + fragments.warm(
+            {user_id: fragments.notifications_key(user_id)},
+            lambda ids: {user_id: _lecturer_notifications(lecturer.user)},
+        )
+
+    if role == CustomUser.Role.STUDENT:
+        student = Student.objects.filter(user_id=user_id).first()
+        if not student:
+            return 0
+        return fragments.warm(
+            {panel: fragments.student_key(student.pk, panel) for panel in _STUDENT_PANELS},
+            lambda panels: {panel: _STUDENT_PANELS[panel](student) for panel in panels},
+        )
+    return 0
+
+
+def _warm_in_background(user_id):
+    try:
+        warm_user(user_id)
+    except Exception:
+        logger.warning("Dashboard warm-up failed for user %s", user_id, exc_info=True)
+    finally:
+        # Pool threads outlive the request; don't leave their connections open.
+        connection.close()
+
+
+def enabled():
+    """Whether warmed entries reach the other workers."""
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+
+def schedule(user_id):
+    global _pool, _pool_pid
+    if not enabled():
+        return
+    threads = getattr(settings, "DASHBOARD_WARMUP_THREADS", 2)
+    if threads <= 0:
+        warm_user(user_id)
+        return
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():  # not inherited across a fork
+            _pool, _pool_pid = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="dashboard-warmup"), os.getpid()
+        _pool.submit(_warm_in_background, user_id)
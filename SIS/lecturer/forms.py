@@ -1,6 +1,8 @@
 from django import forms
 from accounts.models import CustomUser
+from django.urls import reverse_lazy
 from core.models import Course, Student, Enrollment, DisciplinaryAction , Course, ClassGroup
+from core.widgets import TypeaheadInput
 
 # ---------- Lecturer Login Form ----------
 class LecturerLoginForm(forms.Form):
@@ -60,6 +62,15 @@ class AttendanceForm(forms.Form):
         }),
         label="Date"
     )
+    session = forms.ChoiceField(
+        choices=[
+            ('morning', 'Morning'),
+            ('evening', 'Evening'),
+        ],
+        initial='morning',
+        widget=forms.RadioSelect,
+        label="Session"
+    )
     status = forms.ChoiceField(
         choices=[
             ('present', 'Present'),
@@ -82,9 +93,9 @@ class AttendanceForm(forms.Form):
 # ---------- Message Form ----------
 class MessageForm(forms.Form):
     student_email = forms.EmailField(
-        widget=forms.EmailInput(attrs={
+        widget=TypeaheadInput(reverse_lazy('lecturer:student_typeahead'), fill='email', attrs={
             'class': 'w-full border border-gray-300 rounded px-4 py-2 focus:outline-none focus:ring-2 focus:ring-blue-600',
-            'placeholder': 'Student email',
+            'placeholder': 'Student name, email or IC',
         }),
         label="Student Email"
     )
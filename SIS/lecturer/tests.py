@@ -1,3 +1,221 @@
-from django.test import TestCase
+import csv
+import json
+from datetime import date
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from core.models import Attendance, Lecturer
+from core.tests import FAST_HASHERS, enroll_students, make_classgroup
+
+
+def make_lecturer(classgroup, email="lect@example.com"):
+    user = CustomUser.objects.create_user(
+        email=email,
+        password="pw",
+        identity_card_number=f"L-{email}",
+        full_name="Lecturer One",
+        role=CustomUser.Role.LECTURER,
+    )
+    lecturer = Lecturer.objects.get(user=user)
+    classgroup.lecturers.add(lecturer)
+    return user
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class TakeAttendanceDeltaTests(TestCase):
+    def setUp(self):
+        self.classgroup = make_classgroup()
+        self.enrollments = enroll_students(self.classgroup, 3)
+        self.client.force_login(make_lecturer(self.classgroup))
+        self.url = reverse("lecturer:attendance_list")
+        self.day = date(2025, 1, 6)
+        Attendance.objects.record_sheet(
+            Attendance(enrollment=e, date=self.day, session="morning", status="present", description="")
+            for e in self.enrollments
+        )
+
+    def _post(self, data, token):
+        payload = {"date": self.day.isoformat(), "session": "morning", "save_attendance": "1", "sheet_token": token}
+        payload.update(data)
+        return self.client.post(self.url, payload)
+
+    def _token(self):
+        response = self.client.get(self.url, {"date": self.day.isoformat(), "session": "morning"})
+        return response.context["sheet_token"]
+
+    def test_only_changed_rows_are_written(self):
+        token = self._token()
+        first, second, _ = self.enrollments
+        # A full re-post where only one row differs from the loaded sheet.
+        self._post({
+            f"status_{first.id}": "present",
+            f"status_{second.id}": "absent",
+            f"remarks_{second.id}": "MC",
+        }, token)
+        row = Attendance.objects.get(enrollment=second)
+        self.assertEqual((row.status, row.description), ("absent", "MC"))
+        messages = [str(m) for m in self.client.get(self.url).context["messages"]]
+        self.assertTrue(any("1 students" in m for m in messages))
+
+    def test_unchanged_resave_writes_nothing(self):
+        token = self._token()
+        self._post({f"status_{e.id}": "present" for e in self.enrollments}, token)
+        messages = [str(m) for m in self.client.get(self.url).context["messages"]]
+        self.assertIn("No changes to save.", messages)
+
+    def test_roster_changes_since_the_sheet_loaded_are_reported(self):
+        token = self._token()
+        first, second, _ = self.enrollments
+        newcomer = enroll_students(self.classgroup, 1, prefix="n")[0]
+        second.delete()
+        response = self._post({
+            f"status_{first.id}": "absent",
+            f"status_{second.id}": "absent",
+        }, token)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Attendance.objects.get(enrollment=first).status, "absent")
+        self.assertFalse(Attendance.objects.filter(enrollment_id=second.id).exists())
+        self.assertFalse(Attendance.objects.filter(enrollment=newcomer).exists())
+        messages = [str(m) for m in self.client.get(self.url).context["messages"]]
+        self.assertTrue(any("1 students left the class" in m for m in messages))
+        self.assertTrue(any("1 students joined the class" in m for m in messages))
+
+    def test_bad_token_falls_back_to_database(self):
+        first = self.enrollments[0]
+        self._post({f"status_{first.id}": "absent"}, "garbage")
+        self.assertEqual(Attendance.objects.get(enrollment=first).status, "absent")
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AttendanceHistoryMatrixTests(TestCase):
+    def setUp(self):
+        self.classgroup = make_classgroup()
+        self.enrollments = enroll_students(self.classgroup, 2)
+        self.client.force_login(make_lecturer(self.classgroup))
+        self.url = reverse("lecturer:attendance_history_matrix")
+        self.params = {"classgroup": self.classgroup.id, "date": "2025-02-10", "period": "month"}
+
+    def test_packed_rows_and_etag_revalidation(self):
+        first = self.enrollments[0]
+        Attendance.objects.record_sheet([
+            Attendance(enrollment=first, date=date(2025, 2, 1), session="evening", status="absent"),
+            Attendance(enrollment=first, date=date(2025, 2, 2), session="morning", status="late"),
+        ])
+        response = self.client.get(self.url, self.params)
+        data = response.json()
+        self.assertEqual(len(data["dates"]), 28)
+        self.assertEqual([len(r) for r in data["rows"]], [56, 56])
+        self.assertEqual(data["rows"][0][:4], "-AL-")
+        self.assertEqual(set(data["rows"][1]), {"-"})
+
+        etag = response["ETag"]
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertFalse([q for q in ctx.captured_queries if "core_attendance\"" in q["sql"]])
+        self.assertNotEqual(self.client.get(self.url, {**self.params, "period": "week"})["ETag"], etag)
+
+        Attendance.objects.record_sheet([
+            Attendance(enrollment=first, date=date(2025, 2, 1), session="morning", status="present"),
+        ])
+        changed = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()["rows"][0][:2], "PA")
+
+        user = first.student.user
+        user.full_name = "Renamed Student"
+        user.save()
+        self.assertEqual(self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=changed["ETag"]).status_code, 200)
+
+    def test_other_lecturers_classgroup_is_hidden(self):
+        other = make_classgroup("CG2")
+        response = self.client.get(self.url, {**self.params, "classgroup": other.id})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class SyncAttendanceTests(TestCase):
+    def setUp(self):
+        self.classgroup = make_classgroup()
+        self.enrollments = enroll_students(self.classgroup, 2)
+        self.client.force_login(make_lecturer(self.classgroup))
+        self.url = reverse("lecturer:sync_attendance")
+
+    def _sync(self, ops):
+        return self.client.post(self.url, json.dumps({"ops": ops}), content_type="application/json")
+
+    def _op(self, op_id, enrollment, status="present", day="2025-01-06", session="morning"):
+        return {"id": op_id, "enrollment": enrollment.id, "date": day, "session": session,
+                "status": status, "remarks": ""}
+
+    def test_batch_across_sessions_is_idempotent(self):
+        first, second = self.enrollments
+        ops = [
+            self._op("a", first),
+            self._op("b", second, "absent"),
+            self._op("c", first, "late", session="evening"),
+            self._op("d", first, "excused", day="2025-01-07"),
+        ]
+        results = self._sync(ops).json()["results"]
+        self.assertEqual([r["result"] for r in results], ["applied"] * 4)
+        self.assertEqual(Attendance.objects.count(), 4)
+
+        # A retried batch (plus one new op) re-writes nothing it already applied.
+        Attendance.objects.filter(enrollment=second).update(status="present")
+        results = self._sync(ops + [self._op("e", second, "late", day="2025-01-07")]).json()["results"]
+        self.assertEqual([r["result"] for r in results], ["duplicate"] * 4 + ["applied"])
+        self.assertEqual(Attendance.objects.get(enrollment=second, date=date(2025, 1, 6)).status, "present")
+        self.assertEqual(Attendance.objects.count(), 5)
+
+    def test_invalid_ops_are_rejected_individually(self):
+        foreign = enroll_students(make_classgroup("CG2"), 1, prefix="x")[0]
+        results = self._sync([
+            self._op("ok", self.enrollments[0]),
+            self._op("foreign", foreign),
+            self._op("bad-status", self.enrollments[1], "asleep"),
+            self._op("future", self.enrollments[1], day="2999-01-01"),
+            {"enrollment": self.enrollments[1].id},
+        ]).json()["results"]
+        self.assertEqual(
+            [(r["id"], r["result"]) for r in results],
+            [("ok", "applied"), ("foreign", "rejected"), ("bad-status", "rejected"),
+             ("future", "rejected"), (None, "rejected")],
+        )
+        self.assertEqual(Attendance.objects.count(), 1)
+
+    def test_long_remarks_are_kept_whole(self):
+        remarks = "late bus; " * 40
+        self._sync([dict(self._op("a", self.enrollments[0]), remarks=remarks)])
+        self.assertEqual(Attendance.objects.get().description, remarks)
+
+    def test_offline_queue_is_scoped_to_the_user(self):
+        response = self.client.get(reverse("lecturer:attendance_list"))
+        user = response.wsgi_request.user
+        self.assertContains(response, f'data-queue-key="attendance-sync-queue:{user.pk}"')
+
+    def test_malformed_body(self):
+        self.assertEqual(self.client.post(self.url, "nope", content_type="application/json").status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ExportAttendanceTests(TestCase):
+    def test_period_export_carries_report_figures(self):
+        classgroup = make_classgroup()
+        enrollment = enroll_students(classgroup, 1)[0]
+        self.client.force_login(make_lecturer(classgroup))
+        Attendance.objects.record_sheet([
+            Attendance(enrollment=enrollment, date=date(2025, 1, 6), session="morning", status="late"),
+            Attendance(enrollment=enrollment, date=date(2025, 1, 6), session="evening", status="absent"),
+            Attendance(enrollment=enrollment, date=date(2024, 12, 2), session="morning", status="present"),
+        ])
+        response = self.client.get(
+            reverse("lecturer:export_attendance"), {"classgroup": classgroup.pk, "period": "week", "date": "2025-01-08"},
+        )
+        rows = list(csv.reader(response.content.decode().splitlines()))
+        self.assertEqual(rows[0][-3:], ["Period Attended", "Period Marked", "Period Attendance %"])
+        self.assertEqual(len(rows), 1 + 7 * 2)
+        self.assertEqual({tuple(row[-3:]) for row in rows[1:]}, {("1", "2", "50.0")})
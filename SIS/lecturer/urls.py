@@ -17,9 +17,11 @@ urlpatterns = [
     # Attendance (All Courses)
     # ===================
     path('attendance/', views.take_attendance, name='attendance_list'),
+    path('attendance/sync/', views.sync_attendance, name='sync_attendance'),
     path('attendance/mark/', views.mark_attendance, name='mark_attendance'),
     path('attendance/mark/<int:enrollment_id>/', views.mark_individual_attendance, name='mark_individual_attendance'),
     path('attendance/history/', views.attendance_history, name='attendance_history'),
+    path('attendance/history/matrix/', views.attendance_history_matrix, name='attendance_history_matrix'),
 
     # ===================
     # ClassGroup-specific actions
@@ -41,6 +43,7 @@ urlpatterns = [
     # Messaging
     # ===================
     path('send-message/', views.send_message, name='send_message'),
+    path('students/typeahead/', views.student_typeahead, name='student_typeahead'),
 
     # ===================
     # Student-specific features
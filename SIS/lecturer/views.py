@@ -1,17 +1,26 @@
-import csv, re
+import csv, hashlib, json, re, zlib
 from datetime import date, datetime, timedelta
 
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.decorators.http import etag, require_POST
+from django.http import Http404, HttpResponse, JsonResponse
 from django.contrib import messages
+from django.core import signing
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from django import forms
 from django.contrib.auth.decorators import login_required
 from django.utils.dateparse import parse_date
-from django.db.models import Q, Prefetch
+from django.db.models import Prefetch
 
+from core import activity, search, typeahead
+from core.attendance import (
+    NOT_MARKED, SESSIONS, AttendanceMatrix, AttendanceReport, checkin_code, flush_checkins, period_days,
+)
 from core.models import (
-    Lecturer, Course, Enrollment, Attendance,
+    Lecturer, Course, Enrollment, Attendance, AttendanceSyncOp,
     Student, StudentAchievement, DisciplinaryAction
 )
 from accounts.models import CustomUser
@@ -39,10 +48,7 @@ def classgroup_student_list(request, classgroup_id):
 
     q = request.GET.get("q")
     if q:
-        enrollments = enrollments.filter(
-            Q(student__user__full_name__icontains=q) |
-            Q(student__user__email__icontains=q)
-        )
+        enrollments = search.search(enrollments, "users", q, path="student__user").order_by("-search_rank")
     students = [enrollment.student for enrollment in enrollments]
 
     return render(request, 'lecturer/student_list.html', {  
@@ -54,10 +60,46 @@ def classgroup_student_list(request, classgroup_id):
 # ATTENDANCE VIEWS (ALL COURSES & BULK)
 # ==============================================================
 
+SHEET_TOKEN_SALT = "lecturer.take_attendance"
+
+
+def _row_fingerprint(status, remarks):
+    """Short hash of one sheet row as the lecturer last saw it."""
+    return format(zlib.crc32(f"{status or ''}\x1f{remarks or ''}".encode()), "08x")
+
+
+def _sheet_token(classgroup, day, session, fingerprints):
+    return signing.dumps(
+        {"cg": classgroup.id, "d": day.isoformat(), "s": session, "rows": fingerprints},
+        salt=SHEET_TOKEN_SALT,
+        compress=True,
+    )
+
+
+def _read_sheet_token(token, classgroup, day, session):
+    """
+    Return the {enrollment_id: fingerprint} map a sheet was rendered with, or
+    None if the token is missing, tampered with, or belongs to another sheet.
+    """
+    try:
+        data = signing.loads(token or "", salt=SHEET_TOKEN_SALT)
+    except signing.BadSignature:
+        return None
+    if (data.get("cg"), data.get("d"), data.get("s")) != (classgroup.id, day.isoformat(), session):
+        return None
+    return data.get("rows") or {}
+
+
 @role_required(CustomUser.Role.LECTURER)
 def take_attendance(request):
     """
     Take attendance for the lecturer's first assigned class group (bulk, by date/session).
+
+    The sheet carries a signed fingerprint of every row as it was loaded, so a
+    save only writes rows whose status or remarks actually changed, without
+    reading the sheet back from the database first. Rows are checked against
+    the current roster: students unenrolled since the sheet loaded are
+    skipped, and students enrolled since are reported as not marked.
     """
     lecturer = get_object_or_404(Lecturer, user=request.user)
     classgroups = ClassGroup.objects.filter(lecturers=lecturer)
@@ -84,37 +126,68 @@ def take_attendance(request):
         or request.GET.get("session")
         or session_list[0]
     )
+    if selected_session not in session_list:
+        selected_session = session_list[0]
 
     enrollments = Enrollment.objects.filter(class_group=classgroup).select_related("student__user")
-    attendance_qs = Attendance.objects.filter(
-        enrollment__in=enrollments,
-        date=selected_date_obj,
-        session=selected_session
-    )
-    att_map = {att.enrollment_id: att for att in attendance_qs}
-    for enroll in enrollments:
-        att = att_map.get(enroll.id)
-        enroll.attendance_selected_date = att.status if att else None
-        enroll.remarks = att.description if att else ""
-
     statuses = ["present", "absent"]
+    flush_checkins([classgroup])  # self check-ins show on the sheet
+
+    def load_sheet():
+        attendance_qs = Attendance.objects.filter(
+            enrollment__in=enrollments,
+            date=selected_date_obj,
+            session=selected_session
+        )
+        att_map = {att.enrollment_id: att for att in attendance_qs}
+        for enroll in enrollments:
+            att = att_map.get(enroll.id)
+            enroll.attendance_selected_date = att.status if att else None
+            enroll.remarks = (att.description or "") if att else ""
+        return {
+            str(enroll.id): _row_fingerprint(enroll.attendance_selected_date, enroll.remarks)
+            for enroll in enrollments
+        }
 
     if request.method == "POST" and "save_attendance" in request.POST:
-        updated = 0
-        for enrollment in enrollments:
-            status = request.POST.get(f"status_{enrollment.id}")
-            remarks = request.POST.get(f"remarks_{enrollment.id}", "")
-            if status in statuses:
-                Attendance.objects.update_or_create(
-                    enrollment=enrollment,
-                    date=selected_date_obj,
-                    session=selected_session,
-                    defaults={"status": status, "description": remarks},
-                )
-                updated += 1
-        messages.success(request, f"Attendance saved for {updated} students ({selected_session.capitalize()} session).")
+        loaded = _read_sheet_token(
+            request.POST.get("sheet_token"), classgroup, selected_date_obj, selected_session
+        )
+        if loaded is None:
+            # Stale or missing token: fall back to comparing against the database.
+            loaded = load_sheet()
+        roster = {str(pk) for pk in enrollments.values_list("id", flat=True)}
+        unenrolled = loaded.keys() - roster
+        enrolled_since = roster - loaded.keys()
+
+        marks = []
+        for enrollment_id, fingerprint in loaded.items():
+            if enrollment_id in unenrolled:
+                continue
+            status = request.POST.get(f"status_{enrollment_id}")
+            remarks = request.POST.get(f"remarks_{enrollment_id}", "")
+            if status not in statuses or _row_fingerprint(status, remarks) == fingerprint:
+                continue
+            marks.append(Attendance(
+                enrollment_id=int(enrollment_id),
+                date=selected_date_obj,
+                session=selected_session,
+                status=status,
+                description=remarks,
+            ))
+        updated = Attendance.objects.record_sheet(marks)
+        if updated:
+            messages.success(request, f"Attendance saved for {updated} students ({selected_session.capitalize()} session).")
+        else:
+            messages.info(request, "No changes to save.")
+        if unenrolled:
+            messages.warning(request, f"{len(unenrolled)} students left the class after the sheet was opened; their rows were not saved.")
+        if enrolled_since:
+            messages.warning(request, f"{len(enrolled_since)} students joined the class after the sheet was opened and are not marked yet.")
         return redirect(f"{request.path}?date={selected_date_obj}&session={selected_session}")
 
+    fingerprints = load_sheet()
+
     context = {
         "course": course,                 # Used for classroom display in the template
         "classgroup": classgroup,         # If you want to display class group details
@@ -124,10 +197,40 @@ def take_attendance(request):
         "selected_session": selected_session,
         "session_list": session_list,
         "statuses": statuses,
+        "sheet_token": _sheet_token(classgroup, selected_date_obj, selected_session, fingerprints),
+        "checkin_url": request.build_absolute_uri(
+            reverse("student:check_in") + "?" + urlencode(
+                {"code": checkin_code(classgroup, selected_date_obj, selected_session)}
+            )
+        ),
     }
     return render(request, "lecturer/take_attendance.html", context)
 
 
+SYNC_MAX_OPS = 500
+
+
+@role_required(CustomUser.Role.LECTURER)
+@require_POST
+def sync_attendance(request):
+    """
+    Idempotent batch sync for attendance sheets saved while offline.
+    Body: {"ops": [{"id", "enrollment", "date", "session", "status", "remarks"}, ...]}
+    with client-generated op ids; replies with per-op results
+    (see AttendanceSyncOp.objects.apply_batch).
+    """
+    lecturer = get_object_or_404(Lecturer, user=request.user)
+    try:
+        ops = json.loads(request.body or b"{}").get("ops")
+    except (ValueError, AttributeError):
+        ops = None
+    if not isinstance(ops, list) or len(ops) > SYNC_MAX_OPS:
+        return JsonResponse(
+            {"error": f'Expected {{"ops": [...]}} with at most {SYNC_MAX_OPS} operations.'}, status=400
+        )
+    return JsonResponse({"results": AttendanceSyncOp.objects.apply_batch(lecturer, ops)})
+
+
 @role_required(CustomUser.Role.LECTURER)
 def mark_attendance(request):
     """
@@ -138,12 +241,13 @@ def mark_attendance(request):
         if attendance_form.is_valid():
             enrollment = attendance_form.cleaned_data['enrollment']
             date_value = attendance_form.cleaned_data['date']
-            status = attendance_form.cleaned_data['status']
-            Attendance.objects.update_or_create(
+            Attendance.objects.record_sheet([Attendance(
                 enrollment=enrollment,
                 date=date_value,
-                defaults={'status': status}
-            )
+                session=attendance_form.cleaned_data['session'],
+                status=attendance_form.cleaned_data['status'],
+                description=attendance_form.cleaned_data['remarks'],
+            )])
             messages.success(request, f"Attendance updated for {enrollment.student.user.get_full_name()} on {date_value}.")
         else:
             messages.error(request, "Please correct the errors in the attendance form.")
@@ -160,12 +264,13 @@ def mark_individual_attendance(request, enrollment_id):
         form = AttendanceForm(request.POST)
         if form.is_valid():
             date_value = form.cleaned_data['date']
-            status = form.cleaned_data['status']
-            Attendance.objects.update_or_create(
+            Attendance.objects.record_sheet([Attendance(
                 enrollment=enrollment,
                 date=date_value,
-                defaults={'status': status}
-            )
+                session=form.cleaned_data['session'],
+                status=form.cleaned_data['status'],
+                description=form.cleaned_data['remarks'],
+            )])
             messages.success(request, f"Attendance recorded for {enrollment.student.user.get_full_name()} on {date_value}.")
             return redirect('lecturer:attendance_list')
     else:
@@ -182,24 +287,20 @@ def mark_individual_attendance(request, enrollment_id):
 
 @role_required(CustomUser.Role.LECTURER)
 def class_attendance(request, classgroup_id):
-    classgroup = get_object_or_404(ClassGroup, id=classgroup_id)
+    classgroup = get_object_or_404(ClassGroup, id=classgroup_id, lecturers__user=request.user)
     enrollments = (
         Enrollment.objects.filter(class_group=classgroup)
         .select_related('student__user')
-        .prefetch_related('attendance_set')
     )
+    flush_checkins([classgroup])
+    report = AttendanceReport(enrollments)
 
     # Build a list of enrollments with attendance percentage
     enrollments_with_percent = []
     for enrollment in enrollments:
-        total_attendance = enrollment.attendance_set.count()
-        present_count = enrollment.attendance_set.filter(status='present').count()
-        attendance_percentage = (
-            round((present_count / total_attendance) * 100, 2) if total_attendance else None
-        )
         enrollments_with_percent.append({
             'enrollment': enrollment,
-            'attendance_percentage': attendance_percentage,
+            'attendance_percentage': report[enrollment.id].percentage,
         })
 
     return render(request, 'lecturer/class_attendance.html', {
@@ -207,10 +308,11 @@ def class_attendance(request, classgroup_id):
         'enrollments': enrollments_with_percent,
     })
 
-@role_required(CustomUser.Role.LECTURER)
-def attendance_history(request):
-    lecturer = get_object_or_404(Lecturer, user=request.user)
+HISTORY_PERIODS = ["day", "week", "month"]
+
 
+def _history_filters(request, lecturer):
+    """Resolve (classgroups, selected_classgroup, period, date) from the history querystring."""
     # All classgroups assigned to this lecturer
     classgroups = (
         ClassGroup.objects
@@ -220,9 +322,8 @@ def attendance_history(request):
         .distinct()
     )
 
-    period_list = ["day", "week", "month"]
     selected_period = request.GET.get("period", "day")
-    if selected_period not in period_list:
+    if selected_period not in HISTORY_PERIODS:
         selected_period = "day"
 
     # read classgroup from querystring
@@ -235,85 +336,97 @@ def attendance_history(request):
 
     # resolve selected_classgroup ONLY from lecturer's list
     selected_classgroup = classgroups.filter(id=classgroup_id).first() if classgroup_id else None
+    return classgroups, selected_classgroup, selected_period, selected_date
+
+
+def _history_enrollments(classgroup):
+    return (
+        Enrollment.objects
+        .filter(class_group=classgroup)
+        .select_related("student__user")
+        .order_by("student__user__full_name", "student__user__id")
+    )
+
+
+def _history_student(enrollment):
+    """Student entry for the packed matrix: [name, avatar url or ""]."""
+    student = enrollment.student
+    picture = student.profile_picture or student.user.profile_picture
+    return [student.user.get_full_name() or student.user.email, picture.url if picture else ""]
 
-    attendance_list, days_range = None, []
+
+@role_required(CustomUser.Role.LECTURER)
+def attendance_history(request):
+    lecturer = get_object_or_404(Lecturer, user=request.user)
+    classgroups, selected_classgroup, selected_period, selected_date = _history_filters(request, lecturer)
+
+    student_count, days_range = None, []
 
     # (optional) form wiring, if you have one
     try:
         from lecturer.forms import AttendanceHistoryFilterForm
         form = AttendanceHistoryFilterForm(
-            initial={"class_group": classgroup_id or "", "date": selected_date},
+            initial={"class_group": selected_classgroup.id if selected_classgroup else "", "date": selected_date},
             classgroups=classgroups,  # <— pass lecturer’s classgroups here
         )
     except Exception:
         form = None
 
     if selected_classgroup:
-        # enrollments for this classgroup only
-        enrollments = (Enrollment.objects
-            .filter(class_group=selected_classgroup)
-            .select_related("student__user", "class_group")
-            .order_by("student__user__full_name", "student__user__id")
-        )
-
-        # build date range
-        if selected_period == "day":
-            days_range = [selected_date]
-        elif selected_period == "week":
-            start = selected_date - timedelta(days=selected_date.weekday())
-            days_range = [start + timedelta(days=i) for i in range(7)]
-        else:  # month
-            m1 = selected_date.replace(day=1)
-            m2 = (m1.replace(year=m1.year + 1, month=1) if m1.month == 12
-                  else m1.replace(month=m1.month + 1))
-            days_range = [m1 + timedelta(days=i) for i in range((m2 - m1).days)]
-
-        if days_range:
-            records = (Attendance.objects
-                .filter(enrollment__in=enrollments, date__range=[days_range[0], days_range[-1]])
-                .select_related("enrollment__student__user")
-                .only("enrollment_id", "date", "session", "status")
-            )
-            att = {(r.enrollment_id, r.date, r.session): r.status for r in records}
-
-            attendance_list = []
-            for e in enrollments:
-                row, present, absent, late, excused, total = [], 0, 0, 0, 0, 0
-                for d in days_range:
-                    m = att.get((e.id, d, "morning"), "not marked")
-                    v = att.get((e.id, d, "evening"), "not marked")
-                    for s in (m, v):
-                        if s in ("present", "absent", "late", "excused"): total += 1
-                        if s == "present": present += 1
-                        elif s == "absent": absent += 1
-                        elif s == "late": late += 1
-                        elif s == "excused": excused += 1
-                    row.append({"date": d, "morning": m, "evening": v})
-                pct = round((present / total) * 100, 2) if total else None
-                attendance_list.append({
-                    "student": e.student,
-                    "statuses": row,
-                    "present_count": present,
-                    "absent_count": absent,
-                    "late_count": late,
-                    "excused_count": excused,
-                    "total_marked": total,
-                    "attendance_percentage": pct,
-                })
+        # The grid itself is rendered client-side from attendance_history_matrix.
+        student_count = Enrollment.objects.filter(class_group=selected_classgroup).count()
+        days_range = period_days(selected_date, selected_period)
 
     context = {
         "form": form,
         "classgroups": classgroups,              # ✅ template fallback
         "selected_classgroup": selected_classgroup,
-        "attendance_list": attendance_list,
+        "student_count": student_count,
         "selected_date": selected_date,
         "selected_period": selected_period,
-        "period_list": period_list,
+        "period_list": HISTORY_PERIODS,
         "days_range": days_range,
     }
     return render(request, "lecturer/attendance_history.html", context)
 
 
+def _history_matrix_etag(request):
+    """
+    ETag for attendance_history_matrix from the filters and one row per
+    student: what the grid shows of them, plus their summary's updated_at,
+    which moves on every attendance write. No attendance rows are read.
+    """
+    lecturer = Lecturer.objects.filter(user=request.user).first()
+    _, classgroup, period, day = _history_filters(request, lecturer) if lecturer else (None, None, None, None)
+    if not classgroup:
+        return None
+    flush_checkins([classgroup])  # before the stamp, so staged check-ins count
+    roster = _history_enrollments(classgroup).values_list(
+        "id", "student__user__full_name", "student__user__email",
+        "student__profile_picture", "student__user__profile_picture", "attendance_summary__updated_at",
+    )
+    return hashlib.md5(repr((classgroup.pk, period, day, list(roster))).encode()).hexdigest()
+
+
+@role_required(CustomUser.Role.LECTURER)
+@etag(_history_matrix_etag)
+def attendance_history_matrix(request):
+    """
+    JSON for the attendance_history grid (see AttendanceMatrix.packed).
+    Sent with an ETag and no-cache so the browser revalidates; the ETag is
+    worked out before the grid, so a 304 skips building it.
+    """
+    lecturer = get_object_or_404(Lecturer, user=request.user)
+    _, classgroup, period, day = _history_filters(request, lecturer)
+    if not classgroup:
+        raise Http404("Class group not found.")
+
+    matrix = AttendanceMatrix(_history_enrollments(classgroup), period_days(day, period))
+    response = JsonResponse(matrix.packed(_history_student))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 
 
 # ==============================================================
@@ -325,21 +438,27 @@ def course_attendance(request, course_id):
     """
     Bulk attendance page for a specific course.
     """
-    course = get_object_or_404(Course, id=course_id, lecturers__user=request.user)
-    enrollments = Enrollment.objects.filter(course=course).select_related('student__user')
+    course = get_object_or_404(
+        Course.objects.distinct(), id=course_id, classgroups__lecturers__user=request.user
+    )
+    enrollments = Enrollment.objects.filter(class_group__course=course).select_related('student__user')
     today = date.today()
+    session = request.POST.get('session')
+    if session not in dict(Attendance.SESSION_CHOICES):
+        session = 'morning'
 
     if request.method == "POST":
-        updated = 0
+        marks = []
         for enrollment in enrollments:
             status = request.POST.get(f'status_{enrollment.id}')
             if status in ['present', 'absent']:
-                Attendance.objects.update_or_create(
+                marks.append(Attendance(
                     enrollment=enrollment,
                     date=today,
-                    defaults={'status': status}
-                )
-                updated += 1
+                    session=session,
+                    status=status,
+                ))
+        updated = Attendance.objects.record_sheet(marks)
         if updated:
             messages.success(request, f"Attendance recorded for {updated} students in {course.name}.")
         else:
@@ -470,11 +589,10 @@ def student_full_details(request, student_id):
 @role_required(CustomUser.Role.LECTURER)
 def update_student_activity(request, student_id):
     """
-    Update student's latest activity timestamp.
+    Update student's latest activity timestamp (written at once, not queued).
     """
-    student = get_object_or_404(Student, id=student_id)
-    student.latest_activity = timezone.now()
-    student.save(update_fields=['latest_activity'])
+    student = get_object_or_404(Student.objects.select_related('user'), id=student_id)
+    activity.write(student.user)
     messages.success(request, f"Updated latest activity for {student.user.get_full_name()}.")
     return redirect('lecturer:student_full_details', student_id=student.id)
 
@@ -552,6 +670,19 @@ def remove_parent(request, student_id, parent_id):
 # MESSAGING, EXPORTS, UTILITIES
 # ==============================================================
 
+@role_required(CustomUser.Role.LECTURER)
+def student_typeahead(request):
+    """
+    Students matching ?q= by name, email or IC number, for the pickers. Only
+    students enrolled in the lecturer's class groups, and no IC numbers.
+    """
+    lecturer = get_object_or_404(Lecturer, user=request.user)
+    students = set(
+        Enrollment.objects.filter(class_group__lecturers=lecturer).values_list('student_id', flat=True)
+    )
+    results = typeahead.lookup(request.GET.get("q", ""), students=students)
+    return JsonResponse({"results": [{key: person[key] for key in ("id", "user_id", "name", "email")} for person in results]})
+
 @role_required(CustomUser.Role.LECTURER)
 def send_message(request):
     """
@@ -658,15 +789,8 @@ def export_attendance(request):
     period = period if period in {"day", "week", "month", "all"} else "day"
     ref_date = _parse_any_date(request.GET.get("date"))
 
-    if period == "day":
-        days_range = [ref_date]
-    elif period == "week":
-        start = ref_date - timedelta(days=ref_date.weekday())
-        days_range = [start + timedelta(days=i) for i in range(7)]
-    elif period == "month":
-        m1 = ref_date.replace(day=1)
-        m2 = m1.replace(year=m1.year + 1, month=1) if m1.month == 12 else m1.replace(month=m1.month + 1)
-        days_range = [m1 + timedelta(days=i) for i in range((m2 - m1).days)]
+    if period != "all":
+        days_range = period_days(ref_date, period)
     else:
         enrollments_qs = Enrollment.objects.filter(class_group=classgroup)
         att_qs = Attendance.objects.filter(enrollment__in=enrollments_qs).only("date")
@@ -685,15 +809,11 @@ def export_attendance(request):
         .order_by("student__user__full_name", "student__user__id")
     )
 
-    sessions = ("morning", "evening")
-
-    att_records = (
-        Attendance.objects
-        .filter(enrollment__in=enrollments, date__range=[days_range[0], days_range[-1]])
-        .select_related("enrollment__student__user")
-        .only("enrollment_id", "date", "session", "status", "description")
-    )
-    att_map = {(r.enrollment_id, r.date, r.session): r for r in att_records}
+    att_map = {
+        (e, d, s): (status, notes)
+        for e, d, s, status, notes in AttendanceMatrix(enrollments, days_range).cells("description")
+    }
+    report = AttendanceReport(enrollments, days_range)
 
     # --- CSV response ---
     base = f"{classgroup.name}"
@@ -724,24 +844,30 @@ def export_attendance(request):
         "Session",
         "Status",
         "Notes",
+        "Period Attended",
+        "Period Marked",
+        "Period Attendance %",
     ])
 
     # Rows
     for e in enrollments:
         student_user = e.student.user
+        figures = report[e.id]
+        period_pct = "" if figures.percentage is None else figures.percentage
         for d in days_range:
-            for s in sessions:
-                rec = att_map.get((e.id, d, s))
-                status = rec.status if rec else "not marked"
-                notes = rec.description if rec and rec.description else ""
+            for s in SESSIONS:
+                status, notes = att_map.get((e.id, d, s), (NOT_MARKED, ""))
                 writer.writerow([
                     student_user.get_full_name(),
                     student_user.email,
                     classgroup.name,
                     d.strftime("%d/%m/%y"),  # <-- updated format
                     s.title(),
-                    status.title() if status != "not marked" else "n/a",
-                    notes,
+                    status.title() if status != NOT_MARKED else "n/a",
+                    notes or "",
+                    figures.attended,
+                    figures.total,
+                    period_pct,
                 ])
 
     return response
@@ -777,6 +903,7 @@ def export_class_students(request, classgroup_id):
         .prefetch_related("student__parents")
         .order_by("student__user__full_name", "student__user__id")
     )
+    report = AttendanceReport(enrollments)
 
     # CSV response setup
     base = re.sub(r"[^A-Za-z0-9._-]+", "_", classgroup.name).strip("_") or "class"
@@ -806,6 +933,9 @@ def export_class_students(request, classgroup_id):
         "Parent Roles",
         "Parent Phones",
         "Parent Emails",
+        "Sessions Attended",
+        "Sessions Marked",
+        "Attendance %",
     ])
 
     # Date format required
@@ -821,6 +951,7 @@ def export_class_students(request, classgroup_id):
         parent_roles = "; ".join(filter(None, [", ".join(p.get_roles_list()) for p in parents]))
         parent_phones = "; ".join(filter(None, [p.phone_number for p in parents]))
         parent_emails = "; ".join(filter(None, [p.email for p in parents]))
+        figures = report[e.id]
 
         writer.writerow([
             u.get_full_name(),
@@ -840,6 +971,9 @@ def export_class_students(request, classgroup_id):
             parent_roles,
             parent_phones,
             parent_emails,
+            figures.attended,
+            figures.total,
+            "" if figures.percentage is None else figures.percentage,
         ])
 
     return response
\ No newline at end of file
@@ -1,3 +1,116 @@
-from django.test import TestCase
+from datetime import date
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.attendance import checkin_code
+from core.models import Attendance, AttendanceCheckIn, Subject
+from core.tests import FAST_HASHERS, enroll_students, make_classgroup
+from lecturer.tests import make_lecturer
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class CheckInTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.classgroup = make_classgroup()
+        self.enrollment = enroll_students(self.classgroup, 1)[0]
+        self.client.force_login(self.enrollment.student.user)
+        self.url = reverse("student:check_in")
+        self.day = date(2025, 1, 6)
+
+    def test_check_in_is_staged_then_flushed_when_the_lecturer_looks(self):
+        code = checkin_code(self.classgroup, self.day, "morning")
+        self.assertEqual(self.client.post(self.url, {"code": code}).status_code, 302)
+        self.client.post(self.url, {"code": code})
+        self.assertEqual(AttendanceCheckIn.objects.count(), 2)  # the student's request only stages
+        self.assertFalse(Attendance.objects.exists())
+
+        other = enroll_students(make_classgroup("CG2"), 1, prefix="o")[0]
+        AttendanceCheckIn.objects.create(enrollment=other, date=self.day, session="morning")
+        self.client.force_login(make_lecturer(self.classgroup))
+        self.client.get(reverse("lecturer:attendance_list"), {"date": self.day.isoformat(), "session": "morning"})
+        self.assertEqual(Attendance.objects.get().enrollment, self.enrollment)  # duplicates collapse
+        self.assertEqual(list(AttendanceCheckIn.objects.values_list("enrollment", flat=True)), [other.pk])
+
+        call_command("flush_attendance_checkins", stdout=StringIO())
+        self.assertFalse(AttendanceCheckIn.objects.exists())
+        self.assertEqual(Attendance.objects.count(), 2)
+
+    def test_other_lecturers_cannot_open_the_class_or_flush_it(self):
+        AttendanceCheckIn.objects.create(enrollment=self.enrollment, date=self.day, session="morning")
+        self.client.force_login(make_lecturer(make_classgroup("CG2")))
+        url = reverse("lecturer:class_attendance", args=[self.classgroup.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertTrue(AttendanceCheckIn.objects.exists())
+
+    def test_code_for_another_class_is_rejected(self):
+        code = checkin_code(make_classgroup("CG2"), self.day, "morning")
+        response = self.client.post(self.url, {"code": code})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(AttendanceCheckIn.objects.exists())
+        self.assertEqual(self.client.post(self.url, {"code": "tampered"}).status_code, 200)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, VIEW_METRICS_SAMPLE_RATE=0, ACTIVITY_FLUSH_SECONDS=3600)
+class AttendanceOverviewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.enrollment = enroll_students(make_classgroup(), 1)[0]
+        self.client.force_login(self.enrollment.student.user)
+        Attendance.objects.record_sheet([
+            Attendance(enrollment=self.enrollment, date=date(2025, 1, 6), session="morning", status="present"),
+            Attendance(enrollment=self.enrollment, date=date(2025, 1, 6), session="evening", status="late"),
+            Attendance(enrollment=self.enrollment, date=date(2025, 1, 7), session="morning", status="absent"),
+            Attendance(enrollment=self.enrollment, date=date(2025, 1, 7), session="evening", status="absent"),
+        ])
+
+    def test_overview_and_dashboard_agree(self):
+        response = self.client.get(reverse("student:attendance_overview"))
+        row = response.context["per_class"][0]
+        self.assertEqual((row["attended"], row["total"], row["percentage"]), (2, 4, 50.0))
+        self.assertEqual(response.context["avg_attendance"], 50.0)
+
+        response = self.client.get(reverse("dashboard:classes_panel"))
+        self.assertEqual(response.context["enrollments"][0]["attendance_percentage"], 50.0)
+
+    @override_settings(ATTENDANCE_ATTENDED_STATUSES=("present",))
+    def test_detail_shows_excused_marks_and_follows_the_policy(self):
+        Attendance.objects.record_sheet([
+            Attendance(enrollment=self.enrollment, date=date(2025, 1, 8), session="morning", status="excused"),
+        ])
+        url = reverse("student:attendance_detail", args=[self.enrollment.class_group_id])
+        response = self.client.get(url)
+        rows = {row["date"]: row for row in response.context["daily_rows"]}
+        self.assertEqual(rows[date(2025, 1, 8)]["morning"]["status"], "excused")
+        self.assertEqual(rows[date(2025, 1, 6)]["evening"]["status"], "late")
+        self.assertEqual((response.context["attended_classes"], response.context["total_classes"]), (1, 5))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, VIEW_METRICS_SAMPLE_RATE=0, ACTIVITY_FLUSH_SECONDS=3600)
+class SubjectCatalogViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        classgroup = make_classgroup()
+        student = enroll_students(classgroup, 1)[0].student
+        student.class_group = classgroup
+        student.save()
+        lecturer = make_lecturer(classgroup).lecturer
+        for i in range(3):
+            Subject.objects.create(course=classgroup.course, name=f"Subject {i}", code=f"S{i}").lecturers.add(lecturer)
+        self.client.force_login(student.user)
+
+    def test_subjects_list_shows_lecturers_without_per_subject_queries(self):
+        self.client.get(reverse("student:subjects"))  # fills the catalog
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("student:subjects"))
+        self.assertContains(response, "Lecturer One", count=3)
+        self.assertFalse([q for q in ctx.captured_queries if "core_subject" in q["sql"]])
+
+        response = self.client.get(reverse("student:class_overview"))
+        self.assertContains(response, "lect@example.com")
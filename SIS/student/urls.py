@@ -17,6 +17,7 @@ urlpatterns = [
     # Student Dashboard Cards URLs
     path("class-overview/", views.class_overview, name="class_overview"),
     path("attendance/",views.attendance_overview,name="attendance_overview"),
+    path("attendance/check-in/", views.check_in, name="check_in"),
     path("achievements/",views.achievements_list,name="achievements_list"),
     path("disciplinary/",views.disciplinary_list,name="disciplinary_list"),
 
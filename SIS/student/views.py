@@ -4,12 +4,13 @@ from django.contrib import messages
 from accounts.decorators import role_required
 from accounts.models import CustomUser
 from accounts.forms import StudentProfileUpdateForm
-from core.models import Enrollment, Attendance, Course, ClassGroup, Student, DisciplinaryAction, StudentAchievement, Subject, Lecturer
+from core.catalog import catalog
+from core.attendance import AttendanceReport, attended_statuses, read_checkin_code
+from core.models import Enrollment, Attendance, AttendanceBitmap, AttendanceCheckIn, Course, ClassGroup, Student, DisciplinaryAction, StudentAchievement, Subject, Lecturer
 from django.utils.dateparse import parse_date
 from django.utils import timezone
-from django.db.models import Prefetch
 import calendar
-from collections import defaultdict, OrderedDict
+from collections import defaultdict
 from datetime import date
 
 
@@ -24,29 +25,18 @@ def class_overview(request):
     if not class_group:
         return render(request, "student/class_overview.html", {
             "class_group": None,
+            "course": None,
+            "lecturers": [],
             "subjects": [],
             "subj_to_lects": {},   # kept for compatibility
             "classmates": [],
         })
 
-    # subjects for this class' course, with lecturers+users prefetched
-    subjects = []
-    subj_to_lects = {}
-    if class_group.course_id:
-        subjects = (
-            class_group.course.subjects
-            .select_related("course")
-            .prefetch_related(
-                Prefetch(
-                    "lecturers",
-                    queryset=Lecturer.objects.select_related("user")
-                )
-            )
-            .all()
-        )
-        # keep the mapping for compatibility, even though template can iterate directly
-        for s in subjects:
-            subj_to_lects[s.id] = list(s.lecturers.all())
+    # subjects with their lecturers, and the class's lecturers (cached)
+    class_catalog = catalog(class_group.pk)
+    subjects = class_catalog["subjects"]
+    # keep the mapping for compatibility, even though template can iterate directly
+    subj_to_lects = {s["id"]: s["lecturers"] for s in subjects}
 
     # classmates (exclude self), bring along the linked user for names/emails/pictures
     classmates = (
@@ -59,37 +49,32 @@ def class_overview(request):
 
     context = {
         "class_group": class_group,
+        "course": class_catalog["course"],
+        "lecturers": class_catalog["lecturers"],
         "subjects": subjects,
         "subj_to_lects": subj_to_lects,
         "classmates": classmates,
     }
     return render(request, "student/class_overview.html", context)
 
-@login_required
+@role_required(CustomUser.Role.STUDENT)
 def attendance_overview(request):
-    if not _require_student(request.user):
-        return redirect("accounts:login")
     student = Student.objects.get(user=request.user)
     enrollments = Enrollment.objects.filter(student=student).select_related("class_group")
+    report = AttendanceReport(enrollments)
 
     # Per-enrollment attendance + overall average
     per_class = []
-    all_present, all_total = 0, 0
     for enr in enrollments:
-        qs = Attendance.objects.filter(enrollment=enr)
-        total = qs.count()
-        present = qs.filter(status="present").count()
-        pct = round((present / total) * 100, 2) if total else 0.0
+        figures = report[enr.id]
         per_class.append({
             "class_group": enr.class_group,
-            "present": present,
-            "total": total,
-            "percentage": pct,
+            "attended": figures.attended,
+            "total": figures.total,
+            "percentage": figures.percentage or 0.0,
         })
-        all_present += present
-        all_total += total
 
-    avg_attendance = round((all_present / all_total) * 100, 2) if all_total else 0.0
+    avg_attendance = report.overall.percentage or 0.0
 
     context = {
         "student": student,
@@ -125,30 +110,30 @@ def attendance_detail(request, class_group_id):
     class_group = get_object_or_404(ClassGroup, id=class_group_id)
     enrollment = get_object_or_404(Enrollment, student=student, class_group=class_group)
 
-    # --- Records (one per date+session) ---
-    attendance_qs = (
-        Attendance.objects
+    # --- Records: decoded from the per-year bitmaps (one small row per year) ---
+    bitmaps = list(AttendanceBitmap.objects.filter(enrollment=enrollment))
+    notes = {
+        (d, sess): text
+        for d, sess, text in Attendance.objects
         .filter(enrollment=enrollment)
-        .order_by("-date", "-session")
-    )
+        .exclude(description__isnull=True).exclude(description="")
+        .values_list("date", "session", "description")
+    }
+    by_date_sessions = defaultdict(lambda: {"morning": None, "evening": None})
+    for bitmap in sorted(bitmaps, key=lambda b: b.year, reverse=True):
+        for d, sess, status in bitmap.marks(newest_first=True):
+            by_date_sessions[d][sess] = {"status": status, "description": notes.get((d, sess), "")}
 
     # --- Quick stats ---
-    total_classes = attendance_qs.count()
-    absences = attendance_qs.filter(status="absent").count()
-    attended_classes = total_classes - absences  # treat non-absent as attended
+    statuses = [mark["status"] for day in by_date_sessions.values() for mark in day.values() if mark]
+    policy = attended_statuses()
+    total_classes = len(statuses)
+    absences = statuses.count("absent")
+    attended_classes = sum(status in policy for status in statuses)
     attendance_percentage = round((attended_classes / total_classes) * 100, 1) if total_classes else 0
 
-    # --- Table rows: combine AM/PM into one row per date ---
-    daily_map = OrderedDict()  # {date: {"date": d, "morning": Attendance|None, "evening": Attendance|None}}
-    for rec in attendance_qs:
-        d = rec.date
-        if d not in daily_map:
-            daily_map[d] = {"date": d, "morning": None, "evening": None}
-        if rec.session == "morning":
-            daily_map[d]["morning"] = rec
-        elif rec.session == "evening":
-            daily_map[d]["evening"] = rec
-    daily_rows = list(daily_map.values())  # keeps ordering (desc by date)
+    # --- Table rows: combine AM/PM into one row per date (desc by date) ---
+    daily_rows = [{"date": d, **sessions} for d, sessions in by_date_sessions.items()]
 
     # --- Toggle + calendar month params ---
     mode = request.GET.get("mode", "table")  # 'table' or 'calendar'
@@ -159,16 +144,7 @@ def attendance_detail(request, class_group_id):
     cal = calendar.Calendar(firstweekday=0)       # Monday = 0
     raw_weeks = cal.monthdatescalendar(y, m)      # list[list[date]]
 
-    # --- Build month map with AM/PM objects for each visible day ---
-    by_date_sessions = defaultdict(lambda: {"morning": None, "evening": None})
-    month_records = attendance_qs.filter(date__year=y, date__month=m)
-    for r in month_records:
-        if r.session == "morning":
-            by_date_sessions[r.date]["morning"] = r
-        elif r.session == "evening":
-            by_date_sessions[r.date]["evening"] = r
-
-    # --- Calendar cells: include AM/PM objects directly ---
+    # --- Calendar cells: include AM/PM marks directly ---
     weeks_data = []
     for wk in raw_weeks:
         row = []
@@ -190,13 +166,13 @@ def attendance_detail(request, class_group_id):
     # --- Context ---
     context = {
         "class_group": class_group,
-        "attendance_records": attendance_qs,   # still available if needed elsewhere
         "daily_rows": daily_rows,
 
         "total_classes": total_classes,
         "attended_classes": attended_classes,
         "attendance_percentage": attendance_percentage,
         "absences": absences,
+        "current_streak": AttendanceBitmap.streak(bitmaps),
 
         # toggle + calendar
         "mode": mode,
@@ -211,6 +187,33 @@ def attendance_detail(request, class_group_id):
 
     return render(request, "student/attendance_details.html", context)
 
+@role_required(CustomUser.Role.STUDENT)
+def check_in(request):
+    """
+    Self check-in with the class code shown on the lecturer's attendance page.
+    The mark is only staged in AttendanceCheckIn, so a whole class checking in
+    at once stays cheap. It reaches Attendance in a batched flush when the
+    lecturer next opens the class's sheet or history, or from the
+    flush_attendance_checkins job.
+    """
+    code = (request.POST.get("code") or request.GET.get("code") or "").strip()
+    if request.method == "POST":
+        target = read_checkin_code(code)
+        enrollment_id = target and (
+            Enrollment.objects
+            .filter(student__user=request.user, class_group_id=target[0])
+            .values_list("id", flat=True)
+            .first()
+        )
+        if not enrollment_id:
+            messages.error(request, "That check-in code is invalid, expired, or not for your class.")
+        else:
+            _, day, session = target
+            AttendanceCheckIn.objects.create(enrollment_id=enrollment_id, date=day, session=session)
+            messages.success(request, f"Checked in for the {session} session on {day:%d-%m-%Y}.")
+            return redirect("student:check_in")
+    return render(request, "student/check_in.html", {"code": code})
+
 @role_required(CustomUser.Role.STUDENT)
 def classmates_list(request):
     me = get_object_or_404(Student, user=request.user)
@@ -232,21 +235,12 @@ def classmates_list(request):
 def subjects_list(request):
     me = get_object_or_404(Student, user=request.user)
     class_group = me.class_group
-    subjects = []
-    subj_to_lects = {}
-    if class_group and class_group.course_id:
-        subjects = (
-            class_group.course.subjects
-            .all()
-            .select_related("course")
-            .order_by("code")
-        )
-        # Subject.lecturers exists (M2M), build mapping for chips
-        for s in subjects:
-            subj_to_lects[s.id] = list(s.lecturers.select_related("user").all())
+    class_catalog = catalog(class_group.pk) if class_group else None
+    subjects = class_catalog["subjects"] if class_group else []
     return render(request, "student/subjects_list.html", {
         "me": me,
         "class_group": class_group,
+        "course": class_catalog["course"] if class_group else None,
         "subjects": subjects,
-        "subj_to_lects": subj_to_lects,
+        "subj_to_lects": {s["id"]: s["lecturers"] for s in subjects},
     })
\ No newline at end of file